@@ -0,0 +1,431 @@
+"""
+Aggregate queries behind the admin statistics endpoints.
+
+Each entity is scanned once: the week/month/type/approval buckets are
+produced as `count(*) FILTER (WHERE ...)` columns of a single GROUP BY query
+instead of one `count()` round trip per bucket.
+
+The endpoints read the daily rollup tables maintained by app/rollups.py
+(the `*_from_rollups` functions), so their cost no longer grows with history.
+Rollups have day granularity: window bounds are rounded to whole days.
+compute_detailed_statistics() scans the source tables and is kept for
+benchmarking and spot checks.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, text
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def _month_windows(today: datetime) -> list[tuple[datetime, datetime]]:
+    """The 12 rolling 30-day windows the admin charts use, oldest first."""
+    windows = []
+    for i in range(11, -1, -1):
+        month_start = today.replace(day=1) - timedelta(days=30 * i)
+        windows.append((month_start, month_start + timedelta(days=30)))
+    return windows
+
+
+def _day_windows(today: datetime) -> list[tuple[datetime, datetime]]:
+    """The last 7 calendar days (inclusive bounds), oldest first."""
+    windows = []
+    for i in range(6, -1, -1):
+        day = today - timedelta(days=i)
+        windows.append((
+            day.replace(hour=0, minute=0, second=0, microsecond=0),
+            day.replace(hour=23, minute=59, second=59, microsecond=999999),
+        ))
+    return windows
+
+
+def _count_if(*conditions):
+    return func.count().filter(and_(*conditions))
+
+
+def _sum_if(column, *conditions):
+    return func.coalesce(func.sum(column).filter(and_(*conditions)), 0)
+
+
+def _pct(part: int, total: int) -> float:
+    return round((part / total * 100) if total > 0 else 0, 1)
+
+
+def compute_detailed_statistics(db: Session, today: datetime = None) -> dict:
+    """Build the /admin/statistics/detailed payload with one query per entity."""
+    today = today or datetime.now()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+    months = _month_windows(today)
+    days = _day_windows(today)
+
+    # --- Accounts: grouped by type, everything else as FILTER columns ---
+    Account = models.Account
+    account_rows = db.query(
+        Account.account_type,
+        func.count(Account.id),
+        _count_if(Account.created_at >= week_ago),
+        _count_if(Account.created_at >= month_ago),
+        _count_if(Account.status == "active"),
+        *[_count_if(Account.created_at >= start, Account.created_at <= end) for start, end in days],
+        *[_count_if(Account.created_at >= start, Account.created_at < end) for start, end in months],
+    ).group_by(Account.account_type).all()
+
+    account_totals = [sum(column) for column in zip(*[row[1:] for row in account_rows])] or [0] * (4 + len(days) + len(months))
+    total_accounts_req, accounts_this_week, accounts_this_month, approved_accounts = account_totals[:4]
+    daily_account_counts = account_totals[4:4 + len(days)]
+    monthly_account_counts = account_totals[4 + len(days):]
+
+    # --- Loans: approved buckets and principal bands ---
+    Loan = models.Loan
+    approved_loan = Loan.approval_status == "approved"
+    loan_row = db.query(
+        func.count(Loan.id),
+        _count_if(approved_loan),
+        _count_if(approved_loan, Loan.created_at >= week_ago),
+        _count_if(approved_loan, Loan.created_at >= month_ago),
+        _count_if(approved_loan, Loan.principal <= 50000),
+        _count_if(approved_loan, Loan.principal > 50000, Loan.principal <= 200000),
+        _count_if(approved_loan, Loan.principal > 200000),
+        *[_count_if(approved_loan, Loan.created_at >= start, Loan.created_at < end) for start, end in months],
+    ).one()
+    total_loans_req, approved_loans, loans_this_week, loans_this_month, personal_loans, auto_loans, home_loans = loan_row[:7]
+    monthly_loan_counts = loan_row[7:]
+
+    # --- Cards: grouped by type ---
+    Card = models.Card
+    approved_card = Card.approval_status == "approved"
+    card_rows = db.query(
+        Card.card_type,
+        func.count(Card.id),
+        _count_if(approved_card),
+        _count_if(approved_card, Card.created_at >= week_ago),
+        _count_if(approved_card, Card.created_at >= month_ago),
+        *[_count_if(approved_card, Card.created_at >= start, Card.created_at < end) for start, end in months],
+    ).group_by(Card.card_type).all()
+
+    card_totals = [sum(column) for column in zip(*[row[1:] for row in card_rows])] or [0] * (4 + len(months))
+    total_cards_req, approved_cards, cards_this_week, cards_this_month = card_totals[:4]
+    monthly_card_counts = card_totals[4:]
+
+    # --- Customers: cumulative growth at the end of each window ---
+    User = models.User
+    user_row = db.query(
+        *[_count_if(User.created_at <= end) for _, end in months],
+        *[_count_if(User.status == "approved", User.created_at <= end) for _, end in months],
+    ).filter(User.role == "customer").one()
+    users_by_month = user_row[:len(months)]
+    active_by_month = user_row[len(months):]
+
+    return {
+        "weeklyStats": {
+            "accounts": accounts_this_week,
+            "loans": loans_this_week,
+            "cards": cards_this_week
+        },
+        "monthlyStats": {
+            "accounts": accounts_this_month,
+            "loans": loans_this_month,
+            "cards": cards_this_month
+        },
+        "accountTypes": [{"name": row[0], "value": row[1]} for row in account_rows],
+        "loanTypes": [
+            {"name": "Personal", "value": personal_loans},
+            {"name": "Auto", "value": auto_loans},
+            {"name": "Home", "value": home_loans}
+        ],
+        "cardTypes": [{"name": row[0], "value": row[1]} for row in card_rows],
+        "approvalRates": {
+            "accounts": {
+                "approved": _pct(approved_accounts, total_accounts_req),
+                "rejected": _pct(total_accounts_req - approved_accounts, total_accounts_req)
+            },
+            "loans": {
+                "approved": _pct(approved_loans, total_loans_req),
+                "rejected": _pct(total_loans_req - approved_loans, total_loans_req)
+            },
+            "cards": {
+                "approved": _pct(approved_cards, total_cards_req),
+                "rejected": _pct(total_cards_req - approved_cards, total_cards_req)
+            }
+        },
+        "userGrowth": [
+            {"month": start.strftime("%b"), "users": users, "active": active}
+            for (start, _), users, active in zip(months, users_by_month, active_by_month)
+        ],
+        "dailyAccounts": [
+            {"day": start.strftime("%a"), "accounts": count}
+            for (start, _), count in zip(days, daily_account_counts)
+        ],
+        "monthlyData": [
+            {"month": start.strftime("%b"), "accounts": accounts, "loans": loans, "cards": cards}
+            for (start, _), accounts, loans, cards in zip(months, monthly_account_counts, monthly_loan_counts, monthly_card_counts)
+        ]
+    }
+
+
+def compute_admin_stats(db: Session) -> dict:
+    """Totals and pending counts for /admin/stats, read from the rollups."""
+    Approvals = models.StatsDailyApprovals
+    entity_rows = db.query(
+        Approvals.entity,
+        func.sum(Approvals.item_count),
+        _sum_if(Approvals.item_count, Approvals.approval_status == "pending"),
+        _sum_if(Approvals.item_count, Approvals.category == "customer"),
+        _sum_if(Approvals.item_count, Approvals.category == "customer", Approvals.approval_status == "pending"),
+    ).group_by(Approvals.entity).all()
+    by_entity = {row[0]: [int(value or 0) for value in row[1:]] for row in entity_rows}
+
+    def entity(name):
+        return by_entity.get(name, [0, 0, 0, 0])
+
+    total_accounts = db.query(func.coalesce(func.sum(models.StatsDailyAccounts.account_count), 0)).scalar()
+    total_transactions = db.query(func.coalesce(func.sum(models.StatsDailyTransactions.txn_count), 0)).scalar()
+    # Balances are current state rather than history; one aggregate over accounts
+    total_balance = db.query(func.sum(models.Account.balance)).scalar() or 0
+
+    return {
+        "total_users": entity("user")[2],
+        "total_accounts": int(total_accounts),
+        "total_balance": float(total_balance),
+        "total_transactions": int(total_transactions),
+        "total_loans": entity("loan")[0],
+        "total_fixed_deposits": entity("fixed_deposit")[0],
+        "total_cards": entity("card")[0],
+        "pending_kyc": entity("user")[3],
+        "pending_cards": entity("card")[1],
+        "pending_loans": entity("loan")[1],
+        "pending_fds": entity("fixed_deposit")[1],
+    }
+
+
+def compute_detailed_statistics_from_rollups(db: Session, today: datetime = None) -> dict:
+    """Build the /admin/statistics/detailed payload from the daily rollups."""
+    today = today or datetime.now()
+    week_ago = (today - timedelta(days=7)).date()
+    month_ago = (today - timedelta(days=30)).date()
+    months = _month_windows(today)
+    days = _day_windows(today)
+
+    # --- Accounts ---
+    Accounts = models.StatsDailyAccounts
+    n = Accounts.account_count
+    account_rows = db.query(
+        Accounts.account_type,
+        func.sum(n),
+        _sum_if(n, Accounts.day >= week_ago),
+        _sum_if(n, Accounts.day >= month_ago),
+        _sum_if(n, Accounts.status == "active"),
+        *[_sum_if(n, Accounts.day == start.date()) for start, _ in days],
+        *[_sum_if(n, Accounts.day >= start.date(), Accounts.day < end.date()) for start, end in months],
+    ).group_by(Accounts.account_type).having(func.sum(n) != 0).all()
+
+    account_totals = [int(sum(column)) for column in zip(*[row[1:] for row in account_rows])] or [0] * (4 + len(days) + len(months))
+    total_accounts_req, accounts_this_week, accounts_this_month, approved_accounts = account_totals[:4]
+    daily_account_counts = account_totals[4:4 + len(days)]
+    monthly_account_counts = account_totals[4 + len(days):]
+
+    Approvals = models.StatsDailyApprovals
+    n = Approvals.item_count
+    approved = Approvals.approval_status == "approved"
+
+    # --- Loans (category holds the principal band) ---
+    loan_row = db.query(
+        func.coalesce(func.sum(n), 0),
+        _sum_if(n, approved),
+        _sum_if(n, approved, Approvals.day >= week_ago),
+        _sum_if(n, approved, Approvals.day >= month_ago),
+        _sum_if(n, approved, Approvals.category == "Personal"),
+        _sum_if(n, approved, Approvals.category == "Auto"),
+        _sum_if(n, approved, Approvals.category == "Home"),
+        *[_sum_if(n, approved, Approvals.day >= start.date(), Approvals.day < end.date()) for start, end in months],
+    ).filter(Approvals.entity == "loan").one()
+    loan_row = [int(value) for value in loan_row]
+    total_loans_req, approved_loans, loans_this_week, loans_this_month, personal_loans, auto_loans, home_loans = loan_row[:7]
+    monthly_loan_counts = loan_row[7:]
+
+    # --- Cards (category holds the card type) ---
+    card_rows = db.query(
+        Approvals.category,
+        func.sum(n),
+        _sum_if(n, approved),
+        _sum_if(n, approved, Approvals.day >= week_ago),
+        _sum_if(n, approved, Approvals.day >= month_ago),
+        *[_sum_if(n, approved, Approvals.day >= start.date(), Approvals.day < end.date()) for start, end in months],
+    ).filter(Approvals.entity == "card").group_by(Approvals.category).having(func.sum(n) != 0).all()
+
+    card_totals = [int(sum(column)) for column in zip(*[row[1:] for row in card_rows])] or [0] * (4 + len(months))
+    total_cards_req, approved_cards, cards_this_week, cards_this_month = card_totals[:4]
+    monthly_card_counts = card_totals[4:]
+
+    # --- Customers: cumulative growth at the end of each window ---
+    user_row = db.query(
+        *[_sum_if(n, Approvals.day <= end.date()) for _, end in months],
+        *[_sum_if(n, Approvals.approval_status == "approved", Approvals.day <= end.date()) for _, end in months],
+    ).filter(Approvals.entity == "user", Approvals.category == "customer").one()
+    users_by_month = [int(value) for value in user_row[:len(months)]]
+    active_by_month = [int(value) for value in user_row[len(months):]]
+
+    return {
+        "weeklyStats": {
+            "accounts": accounts_this_week,
+            "loans": loans_this_week,
+            "cards": cards_this_week
+        },
+        "monthlyStats": {
+            "accounts": accounts_this_month,
+            "loans": loans_this_month,
+            "cards": cards_this_month
+        },
+        "accountTypes": [{"name": row[0] or None, "value": int(row[1])} for row in account_rows],
+        "loanTypes": [
+            {"name": "Personal", "value": personal_loans},
+            {"name": "Auto", "value": auto_loans},
+            {"name": "Home", "value": home_loans}
+        ],
+        "cardTypes": [{"name": row[0] or None, "value": int(row[1])} for row in card_rows],
+        "approvalRates": {
+            "accounts": {
+                "approved": _pct(approved_accounts, total_accounts_req),
+                "rejected": _pct(total_accounts_req - approved_accounts, total_accounts_req)
+            },
+            "loans": {
+                "approved": _pct(approved_loans, total_loans_req),
+                "rejected": _pct(total_loans_req - approved_loans, total_loans_req)
+            },
+            "cards": {
+                "approved": _pct(approved_cards, total_cards_req),
+                "rejected": _pct(total_cards_req - approved_cards, total_cards_req)
+            }
+        },
+        "userGrowth": [
+            {"month": start.strftime("%b"), "users": users, "active": active}
+            for (start, _), users, active in zip(months, users_by_month, active_by_month)
+        ],
+        "dailyAccounts": [
+            {"day": start.strftime("%a"), "accounts": count}
+            for (start, _), count in zip(days, daily_account_counts)
+        ],
+        "monthlyData": [
+            {"month": start.strftime("%b"), "accounts": accounts, "loans": loans, "cards": cards}
+            for (start, _), accounts, loans, cards in zip(months, monthly_account_counts, monthly_loan_counts, monthly_card_counts)
+        ]
+    }
+
+
+# Values of Transaction.status accepted by the status filter
+TRANSACTION_STATUSES = ("PENDING", "SUCCESS", "FAILED")
+
+# granularity -> (series step, label format, longest range in days)
+GRANULARITIES = {
+    "hour": ("1 hour", "%b %d %H:00", 31),
+    "day": ("1 day", "%b %d", 366),
+    "week": ("7 days", "Wk %b %d", 366),
+}
+
+_BUCKETS_FROM_SOURCE = """
+    WITH series AS (
+        SELECT generate_series(CAST(:first AS timestamp), CAST(:last AS timestamp), CAST(:step AS interval)) AS bucket
+    ), totals AS (
+        SELECT date_trunc('hour', timestamp) AS bucket, COUNT(*) AS count, SUM(amount) AS amount
+        FROM transactions
+        WHERE timestamp >= :first AND timestamp < CAST(:last AS timestamp) + CAST(:step AS interval) {status_filter}
+        GROUP BY 1
+    )
+    SELECT series.bucket, COALESCE(totals.count, 0), COALESCE(totals.amount, 0)
+    FROM series LEFT JOIN totals ON totals.bucket = series.bucket
+    ORDER BY series.bucket
+"""
+
+_BUCKETS_FROM_ROLLUP = """
+    WITH series AS (
+        SELECT generate_series(CAST(:first AS timestamp), CAST(:last AS timestamp), CAST(:step AS interval)) AS bucket
+    ), totals AS (
+        SELECT date_trunc(:unit, CAST(day AS timestamp)) AS bucket, SUM(txn_count) AS count, SUM(amount_total) AS amount
+        FROM stats_daily_transactions
+        WHERE day >= CAST(:first AS date) AND day <= CAST(:end AS date) {status_filter}
+        GROUP BY 1
+    )
+    SELECT series.bucket, COALESCE(totals.count, 0), COALESCE(totals.amount, 0)
+    FROM series LEFT JOIN totals ON totals.bucket = series.bucket
+    ORDER BY series.bucket
+"""
+
+
+def transaction_status(status: str = None):
+    """Normalize the optional status filter to upper case; ValueError if it is not a known status."""
+    if not status:
+        return None
+    status = status.upper()
+    if status not in TRANSACTION_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(TRANSACTION_STATUSES)}")
+    return status
+
+
+def compute_transaction_statistics(
+    db: Session,
+    today: datetime = None,
+    days: int = 30,
+    granularity: str = "day",
+    status: str = None,
+) -> dict:
+    """
+    Transaction count/amount per bucket over the last `days` days, gap filled.
+
+    Buckets come from one query whatever their number: hourly buckets are
+    aggregated from the (partitioned) transactions table, daily and weekly
+    ones from the stats_daily_transactions rollup.
+
+    Raises:
+        ValueError: Unknown granularity or status, or a range too long for the granularity
+    """
+    status = transaction_status(status)
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    step, label, max_days = GRANULARITIES[granularity]
+    if not 1 <= days <= max_days:
+        raise ValueError(f"days must be between 1 and {max_days} for {granularity} buckets")
+
+    today = today or datetime.now()
+    params = {"step": step, "status": status}
+    status_filter = "AND status = :status" if status else ""
+
+    if granularity == "hour":
+        params["first"] = (today - timedelta(days=days)).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        params["last"] = today.replace(minute=0, second=0, microsecond=0)
+        sql = _BUCKETS_FROM_SOURCE.format(status_filter=status_filter)
+    else:
+        first_day = (today - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        last_day = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        if granularity == "week":
+            # Weeks start on Monday, as with date_trunc('week', ...)
+            first_day -= timedelta(days=first_day.weekday())
+            last_day -= timedelta(days=last_day.weekday())
+        params.update({"first": first_day, "last": last_day, "end": today.date(), "unit": granularity})
+        sql = _BUCKETS_FROM_ROLLUP.format(status_filter=status_filter)
+
+    buckets = [
+        {"date": bucket.strftime(label), "start": bucket.isoformat(), "count": int(count), "amount": float(amount)}
+        for bucket, count, amount in db.execute(text(sql), params)
+    ]
+
+    # Summary card: last 7 days whatever the chart range, from the rollup
+    Daily = models.StatsDailyTransactions
+    weekly = db.query(
+        func.coalesce(func.sum(Daily.txn_count), 0),
+        func.coalesce(func.sum(Daily.amount_total), 0),
+    ).filter(Daily.day >= (today - timedelta(days=7)).date())
+    if status:
+        weekly = weekly.filter(Daily.status == status)
+    weekly_volume, weekly_amount = weekly.one()
+
+    return {
+        "granularity": granularity,
+        "days": days,
+        "status": status,
+        # Key kept from the daily-only version of this endpoint
+        "dailyTransactions": buckets,
+        "weeklyVolume": int(weekly_volume),
+        "weeklyAmount": float(weekly_amount)
+    }
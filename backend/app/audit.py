@@ -0,0 +1,222 @@
+"""
+Structured audit logging with a buffered background writer.
+
+Most audit records are queued in memory and inserted in batches by a daemon
+thread, which keeps the INSERT out of the request's critical transaction.
+Records for money movements can instead join the caller's DB transaction so
+they commit (or roll back) atomically with the balance change; this is
+controlled by the AUDIT_DURABILITY setting:
+
+    "money" - money movements are written inline, everything else is buffered
+    "all"   - every record is written inline (previous behaviour)
+    "none"  - every record is buffered
+"""
+import atexit
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from . import config
+from .models import AuditLog
+
+_PENDING_KEY = "pending_audit_records"
+
+
+class AuditWriter:
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stats = Counter()
+        self._by_event = Counter()
+
+    def record(
+        self,
+        event_type: str,
+        message: str = None,
+        *,
+        db=None,
+        money_movement: bool = False,
+        actor_id: int = None,
+        subject_user_id: int = None,
+        account_id: int = None,
+        entity_type: str = None,
+        entity_id: int = None,
+        amount: float = None,
+    ):
+        """
+        Record an audit event.
+
+        Args:
+            event_type: Event name, e.g. 'TRANSACTION_SUCCESS'
+            message: Human readable description
+            db: Session of the calling transaction; inline records join it and
+                buffered records are queued only once it commits
+            money_movement: True if the event moves money; such records join
+                `db`'s transaction unless AUDIT_DURABILITY is 'none'
+            actor_id: User who performed the action (admin or customer)
+            subject_user_id: User the action applies to
+            account_id: Account affected
+            entity_type / entity_id: Related entity, e.g. ('loan', 42)
+            amount: Amount moved, if any
+        """
+        row = {
+            "event_type": event_type,
+            "message": message,
+            "timestamp": datetime.utcnow(),
+            "actor_id": actor_id,
+            "subject_user_id": subject_user_id,
+            "account_id": account_id,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "amount": amount,
+        }
+
+        if db is not None and self._is_durable(money_movement):
+            db.add(AuditLog(**row))
+            self._count("inline", event_type)
+            return
+
+        if db is not None:
+            # Queued when the caller's transaction commits, dropped if it rolls back
+            db.info.setdefault(_PENDING_KEY, []).append(row)
+            return
+
+        self.enqueue(row)
+
+    def enqueue(self, row: dict):
+        try:
+            self._queue.put_nowait(row)
+            self._count("buffered", row["event_type"])
+        except queue.Full:
+            # Never drop audit records: fall back to a direct write
+            self._write([row])
+            self._count("direct_overflow", row["event_type"])
+            return
+
+        self._ensure_flusher()
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _is_durable(self, money_movement: bool) -> bool:
+        mode = config.AUDIT_DURABILITY
+        if mode == "all":
+            return True
+        if mode == "none":
+            return False
+        return money_movement
+
+    def _count(self, kind: str, event_type: str):
+        with self._lock:
+            self._stats[kind] += 1
+            self._by_event[(event_type, kind)] += 1
+
+    def _ensure_flusher(self):
+        # Started lazily so Celery prefork children get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Audit flush failed, will retry: {e}")
+                time.sleep(self.flush_interval)
+
+    def flush(self) -> int:
+        """Write every queued record in batches. Returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                try:
+                    self._write(batch)
+                except Exception:
+                    # Put the batch back so the next flush retries it
+                    for row in batch:
+                        self._queue.put(row)
+                    raise
+                written += len(batch)
+                with self._lock:
+                    self._stats["flushed"] += len(batch)
+                    self._stats["batches"] += 1
+
+    def _write(self, rows: list[dict]):
+        from .database import engine
+        with engine.begin() as conn:
+            conn.execute(insert(AuditLog.__table__), rows)
+
+    def stats(self) -> dict:
+        """Counters since process start, used to measure how many inserts left the request path."""
+        with self._lock:
+            stats = dict(self._stats)
+            by_event = dict(self._by_event)
+        batches = stats.get("batches", 0)
+        return {
+            "durability": config.AUDIT_DURABILITY,
+            "inline_inserts": stats.get("inline", 0),
+            "overflow_writes": stats.get("direct_overflow", 0),
+            "buffered_records": stats.get("buffered", 0),
+            "flushed_records": stats.get("flushed", 0),
+            "batches": batches,
+            "avg_batch_size": round(stats.get("flushed", 0) / batches, 2) if batches else 0.0,
+            "pending": self._queue.qsize(),
+            # Every buffered record is one INSERT removed from a request transaction
+            "inserts_removed_from_requests": stats.get("buffered", 0),
+            "by_event": [
+                {"event_type": event_type, "mode": kind, "count": count}
+                for (event_type, kind), count in sorted(by_event.items())
+            ],
+        }
+
+
+audit_writer = AuditWriter(
+    batch_size=config.AUDIT_BATCH_SIZE,
+    flush_interval=config.AUDIT_FLUSH_INTERVAL_SECONDS,
+    max_queue=config.AUDIT_MAX_QUEUE,
+)
+
+record = audit_writer.record
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session):
+    for row in session.info.pop(_PENDING_KEY, []):
+        audit_writer.enqueue(row)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        audit_writer.flush()
+    except Exception as e:
+        print(f"Failed to flush audit records on exit: {e}")
@@ -0,0 +1,123 @@
+"""
+End-of-day balance snapshots per account (account_balance_snapshots).
+
+The `snapshot_balances` Celery beat task runs at 23:59 UTC and writes one
+row per account for every day since the last snapshot, up to today, with one
+INSERT ... SELECT. The balance at the end of day D is the live balance minus
+the net SUCCESS transaction flow after D, so a run that slips past midnight
+still snapshots the right day. Missed nights, and the initial backfill done
+by migrate_create_balance_snapshots.py, use the same statement over a longer
+range.
+
+Balance changes that are not recorded as transactions (EMI auto-debits at
+midnight, FD bookings and payouts, admin adjustments) are only exact on days
+the job ran on time; replayed days attribute them to the day the job ran.
+
+With snapshots in place, the balance of an account on any past day is an
+index lookup on (account_id, day), and so are the dashboard's 30-day deltas
+and the balance-history charts.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .models import Account, AccountBalanceSnapshot
+
+SNAPSHOT_RANGE_SQL = text("""
+    WITH days AS (
+        SELECT generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day')::date AS day
+    ), flows AS (
+        SELECT account_id, timestamp::date AS day, SUM(delta) AS delta
+        FROM (
+            SELECT dest_account AS account_id, timestamp, amount AS delta
+            FROM transactions
+            WHERE status = 'SUCCESS' AND dest_account IS NOT NULL AND timestamp >= :after
+            UNION ALL
+            SELECT src_account, timestamp, -amount
+            FROM transactions
+            WHERE status = 'SUCCESS' AND src_account IS NOT NULL AND timestamp >= :after
+        ) f
+        GROUP BY 1, 2
+    ), later AS (
+        -- Net flow strictly after each snapshot day
+        SELECT a.id AS account_id, d.day,
+               COALESCE(SUM(f.delta) FILTER (WHERE f.day > d.day), 0) AS delta
+        FROM accounts a
+        CROSS JOIN days d
+        LEFT JOIN flows f ON f.account_id = a.id
+        WHERE a.created_at IS NULL OR a.created_at < d.day + 1
+        GROUP BY a.id, d.day
+    )
+    INSERT INTO account_balance_snapshots (account_id, user_id, day, balance, created_at)
+    SELECT a.id, a.user_id, l.day, COALESCE(a.balance, 0) - l.delta, now()
+    FROM later l
+    JOIN accounts a ON a.id = l.account_id
+    ON CONFLICT (account_id, day) DO UPDATE
+    SET balance = EXCLUDED.balance, created_at = EXCLUDED.created_at
+""")
+
+
+def snapshot_range(connection, start: date, end: date) -> int:
+    """Write end-of-day snapshots for every account and day in [start, end]. Returns rows written."""
+    if start > end:
+        return 0
+    result = connection.execute(SNAPSHOT_RANGE_SQL, {
+        "start": start,
+        "end": end,
+        "after": datetime.combine(start + timedelta(days=1), datetime.min.time()),
+    })
+    return result.rowcount
+
+
+def snapshot_missing_days(connection, now: datetime = None, max_days: int = 35) -> dict:
+    """
+    Snapshot every day after the newest existing snapshot, up to the day that
+    is ending: today for the 23:59 run, yesterday if the run was delayed past
+    midnight (the early hours belong to a day that has just started).
+    """
+    now = now or datetime.utcnow()
+    end = now.date() if now.hour >= 12 else now.date() - timedelta(days=1)
+    newest = connection.execute(text("SELECT MAX(day) FROM account_balance_snapshots")).scalar()
+    start = newest + timedelta(days=1) if newest else end
+    start = max(start, end - timedelta(days=max_days - 1))
+    rows = snapshot_range(connection, start, end)
+    return {"start": start.isoformat(), "end": end.isoformat(), "rows": rows}
+
+
+def balance_as_of(db: Session, account: Account, day: date):
+    """End-of-day balance of `account` on `day`: live for today, else the newest snapshot on or before it."""
+    if day >= datetime.utcnow().date():
+        return account.balance or 0.0
+    snapshot = db.query(AccountBalanceSnapshot.balance).filter(
+        AccountBalanceSnapshot.account_id == account.id,
+        AccountBalanceSnapshot.day <= day
+    ).order_by(AccountBalanceSnapshot.day.desc()).first()
+    if snapshot is not None:
+        return snapshot[0]
+    if account.created_at and account.created_at.date() > day:
+        return 0.0  # the account did not exist yet
+    return None  # before the first snapshot
+
+
+def balance_history(db: Session, account_ids: list[int], start: date, end: date) -> list[dict]:
+    """Daily total balance of the given accounts over [start, end], oldest first, carrying gaps forward."""
+    if not account_ids:
+        return []
+    rows = db.execute(text("""
+        WITH days AS (
+            SELECT generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day')::date AS day
+        )
+        SELECT d.day, SUM(s.balance) AS balance
+        FROM days d
+        CROSS JOIN unnest(CAST(:account_ids AS integer[])) AS acc(id)
+        LEFT JOIN LATERAL (
+            SELECT balance FROM account_balance_snapshots
+            WHERE account_id = acc.id AND day <= d.day
+            ORDER BY day DESC
+            LIMIT 1
+        ) s ON true
+        GROUP BY d.day
+        ORDER BY d.day
+    """), {"start": start, "end": end, "account_ids": list(account_ids)}).all()
+    return [{"date": row.day.isoformat(), "balance": float(row.balance) if row.balance is not None else None} for row in rows]
@@ -0,0 +1,279 @@
+"""
+Bulk approve/reject for KYC, cards, loans and fixed deposits.
+
+A batch is handled in one transaction:
+- the requested rows are locked together with one SELECT ... FOR UPDATE in
+  id order, so concurrent batches cannot deadlock;
+- owners, existing accounts and loan disbursal accounts are each fetched with
+  one query for the whole batch;
+- KYC primary accounts, disbursal transactions, audit records and
+  notifications are added to the session and written at the single flush
+  before commit;
+- one change event is published for the batch, then the real-time
+  notifications are sent.
+
+Items that are missing or no longer pending are reported as failures in the
+per-item results; they do not abort the rest of the batch.
+"""
+import random
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import audit, config, models, schemas
+from .cache import publish_change_event
+from .routers.notification_router import add_notifications, send_real_time_notifications
+
+ACTIONS = {"approve": "approved", "reject": "rejected"}
+
+
+def _validate(request: schemas.BulkApprovalRequest) -> tuple[str, list[int]]:
+    action = request.action.lower()
+    if action not in ACTIONS:
+        raise HTTPException(status_code=400, detail="Action must be 'approve' or 'reject'")
+    item_ids = sorted(set(request.item_ids))
+    if not item_ids:
+        raise HTTPException(status_code=400, detail="item_ids must not be empty")
+    if len(item_ids) > config.BULK_APPROVAL_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.BULK_APPROVAL_MAX_ITEMS} items can be processed per request"
+        )
+    return action, item_ids
+
+
+def _lock(db: Session, model, item_ids: list[int], *conditions) -> dict:
+    rows = db.query(model).filter(model.id.in_(item_ids), *conditions).order_by(model.id).with_for_update().all()
+    return {row.id: row for row in rows}
+
+
+def _usernames(db: Session, user_ids) -> dict:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    return dict(db.query(models.User.id, models.User.username).filter(models.User.id.in_(user_ids)).all())
+
+
+def _result(item_ids: list[int], action: str, outcomes: dict) -> schemas.BulkApprovalResult:
+    results = []
+    for item_id in item_ids:
+        status, error = outcomes.get(item_id, (None, "Not found"))
+        results.append(schemas.BulkApprovalItemResult(item_id=item_id, success=error is None, status=status, error=error))
+    succeeded = sum(1 for r in results if r.success)
+    return schemas.BulkApprovalResult(
+        action=action,
+        processed=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+
+async def _finish(db: Session, entity: str, decided: list, notifications: list) -> None:
+    """Flush everything, commit once, then publish and notify."""
+    payloads = add_notifications(db, notifications) if notifications else []
+    db.commit()
+    if decided:
+        # Cache invalidation only: no user_id, so listeners deliver it to nobody; each
+        # user hears about their decision through the notifications below
+        publish_change_event({"type": f"approval.{entity}.bulk", "count": len(decided)})
+    await send_real_time_notifications(payloads)
+
+
+def _reason(request) -> str:
+    return request.reason or "No reason provided"
+
+
+async def bulk_kyc(db: Session, admin_user: models.User, request: schemas.BulkApprovalRequest):
+    action, user_ids = _validate(request)
+    users = _lock(db, models.User, user_ids)
+    outcomes = {}
+    decided = []
+
+    has_account = set()
+    if action == "approve":
+        has_account = {
+            row[0] for row in db.query(models.Account.user_id).filter(models.Account.user_id.in_(list(users))).distinct()
+        }
+
+    new_accounts = []
+    for user in users.values():
+        if user.role != "customer":
+            outcomes[user.id] = (user.status, "Can only approve KYC for customer accounts")
+            continue
+        if user.status != "pending":
+            outcomes[user.id] = (user.status, f"KYC already {user.status}")
+            continue
+
+        user.status = ACTIONS[action]
+        user.kyc_approved = action == "approve"
+        if action == "approve" and user.id not in has_account:
+            new_accounts.append(models.Account(
+                account_number=''.join([str(random.randint(0, 9)) for _ in range(16)]),
+                account_type="savings",
+                balance=0.0,
+                user_id=user.id
+            ))
+        audit.record(
+            "KYC_APPROVAL",
+            f"Admin {admin_user.username} {action}d KYC for user {user.username} (bulk). Reason: {_reason(request)}",
+            db=db,
+            actor_id=admin_user.id,
+            subject_user_id=user.id,
+            entity_type="user",
+            entity_id=user.id
+        )
+        outcomes[user.id] = (user.status, None)
+        decided.append(user.id)
+
+    db.add_all(new_accounts)
+    await _finish(db, "kyc", decided, [])
+    return _result(user_ids, action, outcomes)
+
+
+async def bulk_cards(db: Session, admin_user: models.User, request: schemas.BulkApprovalRequest):
+    action, card_ids = _validate(request)
+    cards = _lock(db, models.Card, card_ids)
+    names = _usernames(db, (card.user_id for card in cards.values()))
+    outcomes = {}
+    decided = []
+    notifications = []
+
+    for card in cards.values():
+        if card.approval_status != "pending":
+            outcomes[card.id] = (card.approval_status, f"Card already {card.approval_status}")
+            continue
+
+        card.approval_status = ACTIONS[action]
+        card.status = "active" if action == "approve" else "rejected"
+        audit.record(
+            "CARD_APPROVAL",
+            f"Admin {admin_user.username} {action}d card application for user {names.get(card.user_id)} (bulk). Reason: {_reason(request)}",
+            db=db,
+            actor_id=admin_user.id,
+            subject_user_id=card.user_id,
+            entity_type="card",
+            entity_id=card.id
+        )
+        if action == "approve":
+            title = "Card Application Approved"
+            message = f"Congratulations! Your {card.card_type} card application has been approved and is now active with credit limit ${card.credit_limit:,.2f}."
+        else:
+            title = "Card Application Rejected"
+            message = f"Your {card.card_type} card application has been rejected. Reason: {request.reason or 'No specific reason provided'}"
+        notifications.append(schemas.NotificationCreate(
+            user_id=card.user_id,
+            title=title,
+            message=message,
+            type=f"card_{'approval' if action == 'approve' else 'rejection'}",
+            related_id=card.id,
+            from_user_id=admin_user.id
+        ))
+        outcomes[card.id] = (card.approval_status, None)
+        decided.append(card.id)
+
+    await _finish(db, "card", decided, notifications)
+    return _result(card_ids, action, outcomes)
+
+
+async def bulk_loans(db: Session, admin_user: models.User, request: schemas.BulkApprovalRequest):
+    action, loan_ids = _validate(request)
+    loans = _lock(db, models.Loan, loan_ids)
+    names = _usernames(db, (loan.user_id for loan in loans.values()))
+    outcomes = {}
+    decided = []
+    notifications = []
+
+    # Disbursal account per borrower (their first account), locked in id order
+    accounts_by_user = {}
+    if action == "approve":
+        borrowers = {loan.user_id for loan in loans.values() if loan.approval_status == "pending"}
+        first_accounts = db.query(func.min(models.Account.id)).filter(
+            models.Account.user_id.in_(borrowers)
+        ).group_by(models.Account.user_id).all() if borrowers else []
+        locked = _lock(db, models.Account, [row[0] for row in first_accounts])
+        accounts_by_user = {account.user_id: account for account in locked.values()}
+
+    for loan in loans.values():
+        if loan.approval_status != "pending":
+            outcomes[loan.id] = (loan.approval_status, f"Loan already {loan.approval_status}")
+            continue
+
+        loan.approval_status = ACTIONS[action]
+        loan.status = "active" if action == "approve" else "rejected"
+        account = accounts_by_user.get(loan.user_id)
+        if action == "approve" and account:
+            old_balance = account.balance
+            account.balance += loan.principal
+            db.add(models.Transaction(dest_account=account.id, amount=loan.principal, status="SUCCESS"))
+            audit.record(
+                "LOAN_DISBURSAL",
+                f"Loan amount ${loan.principal} disbursed to account {account.account_number}. Balance: ${old_balance} -> ${account.balance}",
+                db=db,
+                money_movement=True,
+                actor_id=admin_user.id,
+                subject_user_id=loan.user_id,
+                account_id=account.id,
+                entity_type="loan",
+                entity_id=loan.id,
+                amount=loan.principal
+            )
+        audit.record(
+            "LOAN_APPROVAL",
+            f"Admin {admin_user.username} {action}d loan application for user {names.get(loan.user_id)} (bulk). Reason: {_reason(request)}",
+            db=db,
+            actor_id=admin_user.id,
+            subject_user_id=loan.user_id,
+            entity_type="loan",
+            entity_id=loan.id
+        )
+        if action == "approve":
+            title = "Loan Application Approved"
+            message = f"Congratulations! Your {loan.loan_type} loan application for ${loan.principal:,.2f} has been approved. The amount has been disbursed to your account."
+        else:
+            title = "Loan Application Rejected"
+            message = f"Your {loan.loan_type} loan application for ${loan.principal:,.2f} has been rejected. Reason: {request.reason or 'No specific reason provided'}"
+        notifications.append(schemas.NotificationCreate(
+            user_id=loan.user_id,
+            title=title,
+            message=message,
+            type=f"loan_{'approval' if action == 'approve' else 'rejection'}",
+            related_id=loan.id,
+            from_user_id=admin_user.id
+        ))
+        outcomes[loan.id] = (loan.approval_status, None)
+        decided.append(loan.id)
+
+    await _finish(db, "loan", decided, notifications)
+    return _result(loan_ids, action, outcomes)
+
+
+async def bulk_fixed_deposits(db: Session, admin_user: models.User, request: schemas.BulkApprovalRequest):
+    action, fd_ids = _validate(request)
+    fds = _lock(db, models.FixedDeposit, fd_ids)
+    names = _usernames(db, (fd.user_id for fd in fds.values()))
+    outcomes = {}
+    decided = []
+
+    for fd in fds.values():
+        if fd.approval_status != "pending":
+            outcomes[fd.id] = (fd.approval_status, f"Fixed deposit already {fd.approval_status}")
+            continue
+
+        fd.approval_status = ACTIONS[action]
+        fd.status = "active" if action == "approve" else "rejected"
+        audit.record(
+            "FD_APPROVAL",
+            f"Admin {admin_user.username} {action}d fixed deposit application for user {names.get(fd.user_id)} (bulk). Reason: {_reason(request)}",
+            db=db,
+            actor_id=admin_user.id,
+            subject_user_id=fd.user_id,
+            entity_type="fixed_deposit",
+            entity_id=fd.id
+        )
+        outcomes[fd.id] = (fd.approval_status, None)
+        decided.append(fd.id)
+
+    await _finish(db, "fixed_deposit", decided, [])
+    return _result(fd_ids, action, outcomes)
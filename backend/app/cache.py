@@ -0,0 +1,195 @@
+"""
+Small in-process TTL cache for expensive API responses (admin stats, user
+dashboards, rendered charts).
+
+- Fresh entries (younger than `ttl`) are returned directly.
+- Stale entries (younger than `ttl + stale`) are returned immediately while a
+  single background refresh recomputes them (stale-while-revalidate).
+- Concurrent misses for the same key are coalesced: one computation runs and
+  every waiter receives its result.
+- Entries carry tags; `invalidate(tag)` drops them and `discard(key)` drops
+  single entries. The ws_events listener calls `invalidate_for_event()` so a
+  settled transaction or an approval refreshes the numbers without waiting
+  for the TTL.
+
+`compute` callables run in the threadpool and must open their own DB session:
+a background refresh outlives the request that triggered it.
+"""
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from starlette.concurrency import run_in_threadpool
+
+from . import config
+
+
+class _Entry:
+    __slots__ = ("value", "created", "tags")
+
+    def __init__(self, value, tags):
+        self.value = value
+        self.created = time.monotonic()
+        self.tags = tags
+
+
+class TTLCache:
+    def __init__(self, ttl: float, stale: float, max_entries: int = None):
+        self.ttl = ttl
+        self.stale = stale
+        # Least recently used entries are evicted beyond this many (None: unbounded)
+        self.max_entries = max_entries
+        self._entries = {}
+        self._inflight = {}
+        # Tags of the computations in _inflight, so invalidation reaches them too
+        self._inflight_tags = {}
+        # Bumped on invalidation so computations started earlier are not stored
+        self._generation = Counter()
+        # Invalidation arrives from the RabbitMQ listener thread
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    async def get_or_compute(self, key: str, compute, tags=()):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.max_entries is not None:
+                # Move to the end: eviction drops the least recently used first
+                self._entries[key] = self._entries.pop(key)
+        if entry is not None:
+            age = time.monotonic() - entry.created
+            if age < self.ttl:
+                self._stats["hits"] += 1
+                return entry.value
+            if age < self.ttl + self.stale:
+                self._stats["stale_hits"] += 1
+                if key not in self._inflight:
+                    self._start(key, compute, tags).add_done_callback(_consume_exception)
+                return entry.value
+
+        self._stats["misses"] += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._start(key, compute, tags)
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(future)
+
+    def _start(self, key, compute, tags) -> asyncio.Future:
+        with self._lock:
+            generation = self._generation[key]
+            self._inflight_tags[key] = frozenset(tags)
+        future = asyncio.ensure_future(self._compute(key, compute, tags, generation))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._finish(key))
+        return future
+
+    def _finish(self, key):
+        self._inflight.pop(key, None)
+        with self._lock:
+            self._inflight_tags.pop(key, None)
+
+    async def _compute(self, key, compute, tags, generation):
+        self._stats["computations"] += 1
+        value = await run_in_threadpool(compute)
+        with self._lock:
+            if self._generation[key] == generation:
+                # Re-insert so dict order is least recently used first
+                self._entries.pop(key, None)
+                self._entries[key] = _Entry(value, frozenset(tags))
+                if self.max_entries is not None:
+                    while len(self._entries) > self.max_entries:
+                        self._entries.pop(next(iter(self._entries)))
+                        self._stats["evictions"] += 1
+        return value
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying one of `tags`. Returns the number dropped."""
+        tags = set(tags)
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.tags & tags]
+            for key in keys:
+                del self._entries[key]
+                self._generation[key] += 1
+            # A computation still running may have read the data before the change
+            for key, inflight_tags in self._inflight_tags.items():
+                if inflight_tags & tags and key not in keys:
+                    self._generation[key] += 1
+        self._stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def discard(self, *keys: str) -> int:
+        """Drop the entries stored under `keys`. Returns the number dropped."""
+        dropped = 0
+        with self._lock:
+            for key in keys:
+                # Also stops computations already running for the key from storing their result
+                self._generation[key] += 1
+                if self._entries.pop(key, None) is not None:
+                    dropped += 1
+        self._stats["invalidations"] += dropped
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._generation[key] += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {"entries": size, **dict(self._stats)}
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header value matches `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _consume_exception(future: asyncio.Future):
+    # Background refresh errors are logged, the stale value stays in place
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Cache refresh failed: {future.exception()}")
+
+
+admin_cache = TTLCache(
+    ttl=config.ADMIN_STATS_CACHE_TTL_SECONDS,
+    stale=config.ADMIN_STATS_CACHE_STALE_SECONDS,
+)
+
+# ws_events type prefix -> cache tags it invalidates
+EVENT_TAGS = {
+    "transaction.": ("admin:stats", "admin:transactions"),
+    "loan.": ("admin:stats", "admin:detailed"),
+    "approval.": ("admin:stats", "admin:detailed"),
+    "account.": ("admin:stats", "admin:detailed"),
+    "user.": ("admin:stats", "admin:detailed"),
+}
+
+
+def invalidate_for_event(event: dict) -> int:
+    event_type = event.get("type") or ""
+    tags = set()
+    for prefix, prefix_tags in EVENT_TAGS.items():
+        if event_type.startswith(prefix):
+            tags.update(prefix_tags)
+    return admin_cache.invalidate(*tags) if tags else 0
+
+
+def publish_change_event(event: dict):
+    """
+    Invalidate this process's cached stats for `event` right away and queue
+    it for ws_events so the other API workers invalidate theirs. Publishing
+    happens on a background thread; the caller never waits on RabbitMQ.
+
+    The event is marked cache_only: listeners never broadcast it to WebSocket
+    clients, only the affected user (its user_id, if any) receives it.
+    """
+    from .rabbitmq import ws_event_publisher
+
+    invalidate_for_event(event)
+    ws_event_publisher.publish({**event, "cache_only": True})
@@ -13,7 +13,18 @@ celery_app = Celery(
 # causing the worker (listening only on 'celery') to never receive tasks.
 celery_app.conf.task_routes = {
     "process_transaction": {"queue": "celery"},
-    "auto_debit_loan_emi": {"queue": "celery"}
+    "flush_payment_digest": {"queue": "celery"},
+    "auto_debit_loan_emi": {"queue": "celery"},
+    "maintain_partitions": {"queue": "celery"},
+    "compact_rollups": {"queue": "celery"},
+    "broadcast_notification": {"queue": "celery"},
+    "reconcile_notification_counters": {"queue": "celery"},
+    "purge_notifications": {"queue": "celery"},
+    "deliver_push": {"queue": "celery"},
+    "snapshot_balances": {"queue": "celery"},
+    "roll_financial_summaries": {"queue": "celery"},
+    # Starts render processes: consumed by a --pool=solo worker (see app/qr_batch.py)
+    "render_qr_batch": {"queue": "qr_batch"}
 }
 
 # Schedule periodic tasks
@@ -22,6 +33,30 @@ celery_app.conf.beat_schedule = {
         'task': 'auto_debit_loan_emi',
         'schedule': crontab(hour=0, minute=0),  # Run daily at midnight
     },
+    'roll-financial-summaries-daily': {
+        'task': 'roll_financial_summaries',
+        'schedule': crontab(hour=0, minute=5),  # Move user_financial_summary rows to the new 30-day window
+    },
+    'maintain-partitions-daily': {
+        'task': 'maintain_partitions',
+        'schedule': crontab(hour=1, minute=0),  # Create upcoming / archive expired monthly partitions
+    },
+    'compact-rollups-nightly': {
+        'task': 'compact_rollups',
+        'schedule': crontab(hour=2, minute=0),  # Fold old days into months and verify against source tables
+    },
+    'reconcile-notification-counters-nightly': {
+        'task': 'reconcile_notification_counters',
+        'schedule': crontab(hour=3, minute=0),  # Recompute badge counters from the notifications table
+    },
+    'purge-notifications-nightly': {
+        'task': 'purge_notifications',
+        'schedule': crontab(hour=4, minute=0),  # Summarise and delete read notifications past retention
+    },
+    'snapshot-balances-daily': {
+        'task': 'snapshot_balances',
+        'schedule': crontab(hour=23, minute=59),  # End-of-day balances, before the midnight EMI debits
+    },
 }
 
 celery_app.conf.timezone = 'UTC'
\ No newline at end of file
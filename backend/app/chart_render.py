@@ -0,0 +1,98 @@
+"""
+matplotlib drawing for the chart service (app/charts.py).
+
+Everything here runs inside the chart worker processes, so this module only
+imports matplotlib, never the rest of the app (workers are spawned, not
+forked, and import just this module). `warm_up` is the pool initializer: it
+loads matplotlib with the Agg backend and draws one throwaway figure so the
+font cache and the backends are ready before the first real request.
+
+A chart is described by a JSON-serializable spec:
+- {"kind": "breakdown", "title", "unit", "labels", "values"}: pie and bar
+  side by side (shares of a total, e.g. spending by recipient);
+- {"kind": "trend", "title", "unit", "labels", "series": [{"name", "values"}]}:
+  one line per series over the labels (e.g. months or days).
+"""
+import io
+
+# Bump when the drawing code changes, so cached charts and their ETags are not reused
+RENDER_VERSION = 1
+
+COLORS = ['#4c9f70', '#d95f02', '#7570b3', '#1b9e77', '#e7298a', '#66a61e', '#e6ab02', '#a6761d']
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+_plt = None
+
+
+def warm_up():
+    """Pool initializer: import matplotlib and render once."""
+    global _plt
+    import matplotlib
+    matplotlib.use('Agg')
+    # Stable element ids in SVG output, so identical specs give identical files
+    matplotlib.rcParams['svg.hashsalt'] = 'nyord'
+    import matplotlib.pyplot as plt
+    _plt = plt
+    render({"kind": "breakdown", "title": "", "unit": "", "labels": ["a"], "values": [1]}, "png")
+
+
+def ping() -> bool:
+    return _plt is not None
+
+
+def _breakdown(plt, spec):
+    labels, values = spec["labels"], spec["values"]
+    colors = [COLORS[i % len(COLORS)] for i in range(len(labels))]
+    fig, axs = plt.subplots(1, 2, figsize=(8, 3))
+    if any(values):
+        axs[0].pie(values, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
+    else:
+        axs[0].text(0.5, 0.5, 'No data', ha='center', va='center')
+        axs[0].axis('off')
+    axs[0].set_title(spec["title"])
+
+    x = range(len(labels))
+    axs[1].bar(x, values, color=colors)
+    axs[1].set_xticks(list(x))
+    axs[1].set_xticklabels(labels, rotation=45, ha='right')
+    axs[1].set_title(f'{spec["title"]} ({spec["unit"]})' if spec.get("unit") else spec["title"])
+    return fig
+
+
+def _trend(plt, spec):
+    labels = spec["labels"]
+    fig, ax = plt.subplots(figsize=(8, 3))
+    for i, series in enumerate(spec["series"]):
+        ax.plot(range(len(labels)), series["values"], marker='o', markersize=3,
+                color=COLORS[i % len(COLORS)], label=series["name"])
+    # Thin out the tick labels on long ranges
+    step = max(1, len(labels) // 12)
+    ax.set_xticks(list(range(0, len(labels), step)))
+    ax.set_xticklabels(labels[::step], rotation=45, ha='right')
+    ax.set_title(spec["title"])
+    if spec.get("unit"):
+        ax.set_ylabel(spec["unit"])
+    if len(spec["series"]) > 1:
+        ax.legend()
+    ax.grid(alpha=0.3)
+    return fig
+
+
+_KINDS = {"breakdown": _breakdown, "trend": _trend}
+
+
+def render(spec: dict, fmt: str) -> bytes:
+    """Draw `spec` and return the PNG or SVG bytes."""
+    if _plt is None:
+        warm_up()
+    plt = _plt
+    fig = _KINDS[spec["kind"]](plt, spec)
+    try:
+        fig.tight_layout()
+        buf = io.BytesIO()
+        # No creation date in the file, so re-rendering gives the same bytes
+        metadata = {"Date": None} if fmt == "svg" else {}
+        fig.savefig(buf, format=fmt, dpi=100, metadata=metadata)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
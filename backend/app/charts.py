@@ -0,0 +1,223 @@
+"""
+Server-side chart service behind /stats/charts/*.
+
+- Rendering runs in a pool of CHART_RENDER_WORKERS spawned processes with
+  matplotlib preloaded (app/chart_render.py), so a chart never imports
+  matplotlib or draws on the API process, and several charts render in
+  parallel. `start()` launches the workers at API startup.
+- Output is content-addressed: the key is a SHA-256 of the chart spec (its
+  data included), the format and the renderer version. PNG and SVG bytes are
+  kept in `chart_cache`, an LRU bounded by CHART_CACHE_MAX_ENTRIES, and
+  concurrent requests for the same chart share one render.
+- The key doubles as the ETag, so a client revalidating an unchanged chart
+  gets a 304 before anything is looked up or rendered.
+
+The data behind the charts comes from the database on every request (these
+are small aggregates); only the drawing is cached.
+"""
+import hashlib
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as RenderTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import admin_stats, chart_render, config
+from .cache import TTLCache, etag_matches
+
+TOP_RECIPIENTS = 6
+
+chart_cache = TTLCache(
+    ttl=config.CHART_CACHE_TTL_SECONDS,
+    stale=0,
+    max_entries=config.CHART_CACHE_MAX_ENTRIES,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=config.CHART_RENDER_WORKERS,
+                # The API process runs threads (RabbitMQ listener); do not fork it
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=chart_render.warm_up,
+            )
+        return _pool
+
+
+def start():
+    """Spawn the render workers now, so the first chart does not wait for them."""
+    executor = _executor()
+    for _ in range(config.CHART_RENDER_WORKERS):
+        executor.submit(chart_render.ping)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _result(executor: ProcessPoolExecutor, spec: dict, fmt: str) -> bytes:
+    future = executor.submit(chart_render.render, spec, fmt)
+    try:
+        return future.result(timeout=config.CHART_RENDER_TIMEOUT_SECONDS)
+    except RenderTimeout:
+        # Still queued behind busy workers: don't render it for nobody
+        future.cancel()
+        raise
+
+
+def render(spec: dict, fmt: str) -> bytes:
+    """
+    Render in the pool (blocking the calling thread); a crashed pool is replaced once.
+
+    Raises:
+        concurrent.futures.TimeoutError: No result within CHART_RENDER_TIMEOUT_SECONDS
+    """
+    global _pool
+    executor = _executor()
+    try:
+        return _result(executor, spec, fmt)
+    except BrokenProcessPool:
+        with _pool_lock:
+            if _pool is executor:
+                _pool = None
+        return _result(_executor(), spec, fmt)
+
+
+def chart_key(spec: dict, fmt: str) -> str:
+    payload = json.dumps(
+        {"version": chart_render.RENDER_VERSION, "format": fmt, "spec": spec},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def chart_response(spec: dict, fmt: str, if_none_match: str = None) -> Response:
+    """The chart as a response with its ETag, or an empty 304 if the client already has it."""
+    if fmt not in chart_render.FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown chart format: {fmt}")
+    key = chart_key(spec, fmt)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    try:
+        body = await chart_cache.get_or_compute(key, lambda: render(spec, fmt))
+    except BrokenProcessPool:
+        # Workers die at startup when matplotlib is not installed
+        raise HTTPException(status_code=503, detail="Chart rendering is unavailable")
+    except RenderTimeout:
+        raise HTTPException(status_code=503, detail="Chart rendering timed out, try again shortly")
+    return Response(content=body, media_type=chart_render.FORMATS[fmt], headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# Chart data
+# ---------------------------------------------------------------------------
+
+SPENDING_BY_RECIPIENT_SQL = text("""
+    SELECT COALESCE(NULLIF(u.full_name, ''), u.username, 'Account ' || t.dest_account) AS recipient,
+           SUM(t.amount) AS total
+    FROM transactions t
+    LEFT JOIN accounts a ON a.id = t.dest_account
+    LEFT JOIN users u ON u.id = a.user_id
+    WHERE t.src_account IN (SELECT id FROM accounts WHERE user_id = :user_id)
+      AND t.status = 'SUCCESS' AND t.timestamp >= :since
+      AND (a.user_id IS NULL OR a.user_id <> :user_id)
+    GROUP BY 1
+    ORDER BY total DESC, recipient
+""")
+
+MONTHLY_CASHFLOW_SQL = text("""
+    WITH acc AS (
+        SELECT id FROM accounts WHERE user_id = :user_id
+    ), months AS (
+        SELECT generate_series(CAST(:first AS timestamp), CAST(:last AS timestamp), interval '1 month') AS month
+    ), flows AS (
+        SELECT date_trunc('month', t.timestamp) AS month,
+               SUM(t.amount) FILTER (WHERE t.dest_account IN (SELECT id FROM acc)) AS income,
+               SUM(t.amount) FILTER (WHERE t.src_account IN (SELECT id FROM acc)) AS expenses
+        FROM transactions t
+        WHERE t.status = 'SUCCESS' AND t.timestamp >= :first
+          AND (t.src_account IN (SELECT id FROM acc) OR t.dest_account IN (SELECT id FROM acc))
+        GROUP BY 1
+    )
+    SELECT months.month, COALESCE(flows.income, 0) AS income, COALESCE(flows.expenses, 0) AS expenses
+    FROM months LEFT JOIN flows ON flows.month = months.month
+    ORDER BY months.month
+""")
+
+
+def spending_breakdown(db: Session, user_id: int, days: int = 90, now: datetime = None) -> dict:
+    """Money sent to other users over the last `days` days: the top recipients, the rest as "Other"."""
+    now = now or datetime.utcnow()
+    rows = db.execute(SPENDING_BY_RECIPIENT_SQL, {"user_id": user_id, "since": now - timedelta(days=days)}).all()
+    top, rest = rows[:TOP_RECIPIENTS], rows[TOP_RECIPIENTS:]
+    labels = [row.recipient for row in top]
+    values = [round(float(row.total), 2) for row in top]
+    if rest:
+        labels.append("Other")
+        values.append(round(sum(float(row.total) for row in rest), 2))
+    return {
+        "kind": "breakdown",
+        "title": f"Spending, last {days} days",
+        "unit": "USD",
+        "labels": labels,
+        "values": values,
+    }
+
+
+def monthly_cashflow(db: Session, user_id: int, months: int = 12, now: datetime = None) -> dict:
+    """Income and expenses per calendar month, the current month included."""
+    now = now or datetime.utcnow()
+    last = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    first = last
+    for _ in range(months - 1):
+        first = (first - timedelta(days=1)).replace(day=1)
+    rows = db.execute(MONTHLY_CASHFLOW_SQL, {"user_id": user_id, "first": first, "last": last}).all()
+    return {
+        "kind": "trend",
+        "title": f"Income and expenses, last {months} months",
+        "unit": "USD",
+        "labels": [row.month.strftime("%b %Y") for row in rows],
+        "series": [
+            {"name": "Income", "values": [round(float(row.income), 2) for row in rows]},
+            {"name": "Expenses", "values": [round(float(row.expenses), 2) for row in rows]},
+        ],
+    }
+
+
+def admin_transactions(db: Session, days: int = 30, granularity: str = "day", status: str = None) -> dict:
+    """
+    Bank-wide transaction counts and amounts per bucket, from the same
+    query as /admin/statistics/transactions.
+
+    Raises:
+        ValueError: Unknown granularity or a range too long for it
+    """
+    stats = admin_stats.compute_transaction_statistics(db, days=days, granularity=granularity, status=status)
+    buckets = stats["dailyTransactions"]
+    title = f"Transactions per {granularity}, last {days} days"
+    return {
+        "kind": "trend",
+        "title": f"{title} ({stats['status']})" if stats["status"] else title,
+        "unit": "",
+        "labels": [bucket["date"] for bucket in buckets],
+        "series": [
+            {"name": "Count", "values": [bucket["count"] for bucket in buckets]},
+            {"name": "Amount (USD, thousands)", "values": [round(bucket["amount"] / 1000, 2) for bucket in buckets]},
+        ],
+    }
@@ -25,3 +25,114 @@ def get_cors_origins() -> list[str]:
 
 
 
+
+# Partitioning / archival of the transactions and auditlogs tables
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(__file__), "..", "archive"))
+# Partitions older than this many months are detached and exported to ARCHIVE_DIR
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "24"))
+# How many future monthly partitions to keep created ahead of time
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+
+# Audit logging: "money" writes money-movement records inside the DB transaction
+# and buffers the rest, "all" writes everything inline, "none" buffers everything
+AUDIT_DURABILITY = os.getenv("AUDIT_DURABILITY", "money").lower()
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+AUDIT_MAX_QUEUE = int(os.getenv("AUDIT_MAX_QUEUE", "50000"))
+
+# Admin analytics rollups (app/rollups.py)
+# Number of rows each rollup key is spread over to avoid lock contention
+ROLLUP_SHARDS = int(os.getenv("ROLLUP_SHARDS", "8"))
+# Daily rows older than this are folded into one row per month
+ROLLUP_DAILY_RETENTION_DAYS = int(os.getenv("ROLLUP_DAILY_RETENTION_DAYS", "400"))
+# Nightly verification re-derives this many recent days of transaction rollups
+ROLLUP_VERIFY_DAYS = int(os.getenv("ROLLUP_VERIFY_DAYS", "35"))
+
+# Cache invalidation events are published on ws_events by a background thread (app/rabbitmq.py):
+# events waiting to be sent, and how long a connect or publish may take before it is abandoned
+WS_EVENT_PUBLISH_MAX_QUEUE = int(os.getenv("WS_EVENT_PUBLISH_MAX_QUEUE", "10000"))
+RABBITMQ_PUBLISH_TIMEOUT_SECONDS = float(os.getenv("RABBITMQ_PUBLISH_TIMEOUT_SECONDS", "5"))
+
+# Admin statistics response cache (app/cache.py): entries are fresh for the TTL,
+# then served stale for up to STALE seconds while one refresh runs in the background
+ADMIN_STATS_CACHE_TTL_SECONDS = float(os.getenv("ADMIN_STATS_CACHE_TTL_SECONDS", "15"))
+ADMIN_STATS_CACHE_STALE_SECONDS = float(os.getenv("ADMIN_STATS_CACHE_STALE_SECONDS", "60"))
+
+# Largest id list accepted by the bulk approval endpoints
+BULK_APPROVAL_MAX_ITEMS = int(os.getenv("BULK_APPROVAL_MAX_ITEMS", "500"))
+
+# Broadcast notifications are inserted with INSERT ... SELECT in chunks of this many recipients
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "5000"))
+# A failed broadcast task is retried this many times, this many seconds apart, resuming after its last chunk
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "5"))
+BROADCAST_RETRY_DELAY_SECONDS = int(os.getenv("BROADCAST_RETRY_DELAY_SECONDS", "30"))
+
+# Notification badge counters are cached in memory for this long before being re-read
+NOTIFICATION_COUNTER_TTL_SECONDS = float(os.getenv("NOTIFICATION_COUNTER_TTL_SECONDS", "300"))
+
+# Incoming payments within this many seconds are coalesced into one digest notification (0 disables)
+NOTIFICATION_DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "60"))
+
+# A growing digest is pushed over the WebSocket at most once per this many seconds
+NOTIFICATION_DIGEST_PUSH_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_DIGEST_PUSH_INTERVAL_SECONDS", "5"))
+
+# Read notifications older than this are compacted into notification_history_summaries and deleted
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+
+# Rows deleted per retention batch (one short transaction each)
+NOTIFICATION_RETENTION_BATCH_SIZE = int(os.getenv("NOTIFICATION_RETENTION_BATCH_SIZE", "1000"))
+
+# A retention batch gives up on a lock after this long instead of queueing behind live writes
+NOTIFICATION_RETENTION_LOCK_TIMEOUT_MS = int(os.getenv("NOTIFICATION_RETENTION_LOCK_TIMEOUT_MS", "2000"))
+
+# Pause between retention batches, and the total time one run may take before it stops
+NOTIFICATION_RETENTION_PAUSE_SECONDS = float(os.getenv("NOTIFICATION_RETENTION_PAUSE_SECONDS", "0.1"))
+NOTIFICATION_RETENTION_MAX_RUNTIME_SECONDS = float(os.getenv("NOTIFICATION_RETENTION_MAX_RUNTIME_SECONDS", "900"))
+
+# Web Push delivery (app/push_delivery.py)
+PUSH_DELIVERY_CONCURRENCY = int(os.getenv("PUSH_DELIVERY_CONCURRENCY", "50"))
+PUSH_DELIVERY_MAX_RETRIES = int(os.getenv("PUSH_DELIVERY_MAX_RETRIES", "3"))
+PUSH_DELIVERY_BACKOFF_SECONDS = float(os.getenv("PUSH_DELIVERY_BACKOFF_SECONDS", "0.5"))
+PUSH_DELIVERY_TIMEOUT_SECONDS = float(os.getenv("PUSH_DELIVERY_TIMEOUT_SECONDS", "10"))
+PUSH_DELIVERY_TTL_SECONDS = int(os.getenv("PUSH_DELIVERY_TTL_SECONDS", "86400"))
+# Subscriptions failing this many deliveries in a row are removed (404/410 remove them at once)
+PUSH_SUBSCRIPTION_MAX_FAILURES = int(os.getenv("PUSH_SUBSCRIPTION_MAX_FAILURES", "10"))
+# VAPID credentials; without them (or without pywebpush installed) push delivery is skipped
+PUSH_VAPID_PRIVATE_KEY = os.getenv("PUSH_VAPID_PRIVATE_KEY", "")
+PUSH_VAPID_SUBJECT = os.getenv("PUSH_VAPID_SUBJECT", "mailto:admin@nyord.local")
+
+# /users/search backend: "memory" (in-process prefix index) or "trigram" (pg_trgm query per search)
+USER_SEARCH_BACKEND = os.getenv("USER_SEARCH_BACKEND", "memory").lower()
+# The memory index is rebuilt from the users table this often, on top of incremental updates
+USER_SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("USER_SEARCH_INDEX_REFRESH_SECONDS", "600"))
+
+# Per-user /dashboard/summary cache; entries are dropped when the user's accounts, loans, FDs or cards change
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "10000"))
+
+# Users recomputed per transaction by the nightly user_financial_summary roll
+FINANCIAL_SUMMARY_ROLL_BATCH_SIZE = int(os.getenv("FINANCIAL_SUMMARY_ROLL_BATCH_SIZE", "1000"))
+
+# /stats/charts rendering (app/charts.py): worker processes, per-chart time limit,
+# and the content-addressed cache of rendered PNG/SVG output
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "2"))
+CHART_RENDER_TIMEOUT_SECONDS = float(os.getenv("CHART_RENDER_TIMEOUT_SECONDS", "30"))
+CHART_CACHE_TTL_SECONDS = float(os.getenv("CHART_CACHE_TTL_SECONDS", "86400"))
+CHART_CACHE_MAX_ENTRIES = int(os.getenv("CHART_CACHE_MAX_ENTRIES", "500"))
+
+# Per-user transaction histories loaded for /stats/analytics; dropped when the user's transactions change
+SPENDING_ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("SPENDING_ANALYTICS_CACHE_TTL_SECONDS", "3600"))
+SPENDING_ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("SPENDING_ANALYTICS_CACHE_MAX_ENTRIES", "1000"))
+
+# Rendered QR images (app/qr_cache.py): in-memory LRU size, and the shared on-disk
+# tier (set QR_CACHE_DIR to an empty string to disable it)
+QR_CACHE_MAX_ENTRIES = int(os.getenv("QR_CACHE_MAX_ENTRIES", "2048"))
+QR_CACHE_DIR = os.getenv("QR_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", "qr_cache"))
+
+# Admin QR batch exports (app/qr_batch.py): render processes, QR codes per work
+# item sent to a process, progress write interval, largest batch, output directory
+QR_BATCH_WORKERS = int(os.getenv("QR_BATCH_WORKERS", str(os.cpu_count() or 2)))
+QR_BATCH_CHUNK_SIZE = int(os.getenv("QR_BATCH_CHUNK_SIZE", "25"))
+QR_BATCH_PROGRESS_INTERVAL_SECONDS = float(os.getenv("QR_BATCH_PROGRESS_INTERVAL_SECONDS", "1"))
+QR_BATCH_MAX_ITEMS = int(os.getenv("QR_BATCH_MAX_ITEMS", "100000"))
+QR_BATCH_DIR = os.getenv("QR_BATCH_DIR", os.path.join(os.path.dirname(__file__), "..", "qr_batches"))
@@ -0,0 +1,242 @@
+"""
+Queries behind /dashboard/summary.
+
+The summary takes two round trips:
+- SUMMARY_SQL: the user's user_financial_summary row (balances, income and
+  expenses of this and the previous 30 days, the balance before the window,
+  FD, loan and card totals; see app/financial_summary.py) with the user's
+  accounts as JSON;
+- RECENT_TRANSACTIONS_SQL: the latest transactions touching the user's
+  accounts, with both counterparties' account numbers and names joined in.
+  The newest rows are taken separately from the (src_account, timestamp)
+  and (dest_account, timestamp) indexes and merged, instead of one OR
+  filter that cannot use either index for the ordering.
+
+Rendered summaries are cached per user (`dashboard_cache`) together with an
+ETag derived from the JSON body, so a client revalidating with
+If-None-Match gets a 304 without any summary query. Session hooks drop a
+user's entry once a commit touches their accounts, transactions, loans, FDs
+or cards, and publish `dashboard.invalidate` on ws_events so the other API
+processes drop theirs; a transaction settled by the Celery worker reaches
+the API this way. The same invalidation drops the user's cached spending
+analytics history (app/spending_analytics.py).
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from . import config, financial_summary, spending_analytics
+from .cache import TTLCache
+from .models import Account, Card, FixedDeposit, Loan, Transaction
+
+RECENT_TRANSACTIONS = 10
+_USERS_KEY = "dashboard_users"
+
+SUMMARY_SQL = text("""
+    SELECT s.*,
+           (SELECT COALESCE(json_agg(json_build_object(
+               'id', id, 'account_number', account_number, 'balance', COALESCE(balance, 0),
+               'account_type', COALESCE(account_type, 'savings')
+           ) ORDER BY id), '[]') FROM accounts WHERE user_id = :user_id) AS accounts
+    FROM user_financial_summary s
+    WHERE s.user_id = :user_id
+""")
+
+RECENT_TRANSACTIONS_SQL = text("""
+    WITH acc AS (
+        SELECT id FROM accounts WHERE user_id = :user_id
+    ), recent AS (
+        SELECT * FROM (
+            (SELECT id, src_account, dest_account, amount, status, timestamp
+             FROM transactions WHERE src_account IN (SELECT id FROM acc)
+             ORDER BY timestamp DESC, id DESC LIMIT :limit)
+            UNION
+            (SELECT id, src_account, dest_account, amount, status, timestamp
+             FROM transactions WHERE dest_account IN (SELECT id FROM acc)
+             ORDER BY timestamp DESC, id DESC LIMIT :limit)
+        ) merged
+        ORDER BY timestamp DESC, id DESC
+        LIMIT :limit
+    )
+    SELECT r.id, r.amount, r.status, r.timestamp,
+           r.src_account IN (SELECT id FROM acc) AS is_debit,
+           sa.account_number AS src_account_number,
+           da.account_number AS dest_account_number,
+           COALESCE(NULLIF(su.full_name, ''), su.username) AS src_user_name,
+           COALESCE(NULLIF(du.full_name, ''), du.username) AS dest_user_name
+    FROM recent r
+    LEFT JOIN accounts sa ON sa.id = r.src_account
+    LEFT JOIN users su ON su.id = sa.user_id
+    LEFT JOIN accounts da ON da.id = r.dest_account
+    LEFT JOIN users du ON du.id = da.user_id
+    ORDER BY r.timestamp DESC, r.id DESC
+""")
+
+
+def _recent_transaction(row) -> dict:
+    is_debit = bool(row.is_debit)
+    if is_debit and row.dest_user_name:
+        description = row.dest_user_name
+    elif not is_debit and row.src_user_name:
+        description = row.src_user_name
+    else:
+        description = "Transfer"
+    return {
+        "id": row.id,
+        "amount": float(row.amount),
+        "type": "debit" if is_debit else "credit",
+        "status": row.status,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "src_account_number": row.src_account_number,
+        "dest_account_number": row.dest_account_number,
+        "src_user_name": row.src_user_name or "Unknown",
+        "dest_user_name": row.dest_user_name or "Unknown",
+        "description": description,
+    }
+
+
+def _change_percent(current: float, previous: float) -> float:
+    """Percent change from `previous` to `current`; 100% when growing from zero."""
+    if previous == 0:
+        return 0.0 if current == 0 else 100.0
+    return round((current - previous) / abs(previous) * 100, 2)
+
+
+def _read_summary(db: Session, user_id: int, today):
+    summary = db.execute(SUMMARY_SQL, {"user_id": user_id}).one_or_none()
+    if summary is None or summary.window_start != financial_summary.window(today)[0]:
+        # No row yet, or the nightly roll has not moved it to today's window
+        financial_summary.refresh(db.connection(), [user_id], today)
+        db.commit()
+        summary = db.execute(SUMMARY_SQL, {"user_id": user_id}).one()
+    return summary
+
+
+def _money(value) -> float:
+    # Rows accumulate float deltas; drop the rounding noise
+    return round(float(value), 2)
+
+
+def compute_dashboard_summary(db: Session, user_id: int, now: datetime = None) -> dict:
+    now = now or datetime.utcnow()
+    summary = _read_summary(db, user_id, now.date())
+    accounts = [
+        {**account, "balance": float(account["balance"])}
+        for account in summary.accounts
+    ]
+    recent = db.execute(
+        RECENT_TRANSACTIONS_SQL, {"user_id": user_id, "limit": RECENT_TRANSACTIONS}
+    ).all() if accounts else []
+
+    total_balance = _money(summary.total_balance)
+    monthly_income = _money(summary.income_30d)
+    monthly_expenses = _money(summary.expenses_30d)
+    # Without a snapshot before the window there is nothing to compare against yet
+    balance_change_percent = (
+        _change_percent(total_balance, float(summary.baseline_balance))
+        if summary.baseline_balance is not None else 0.0
+    )
+    income_change_percent = _change_percent(monthly_income, float(summary.previous_income_30d))
+    expense_change_percent = _change_percent(monthly_expenses, float(summary.previous_expenses_30d))
+
+    return {
+        "total_balance": total_balance,
+        "balance_change_percent": balance_change_percent,
+        "monthly_income": monthly_income,
+        "income_change_percent": income_change_percent,
+        "monthly_expenses": monthly_expenses,
+        "expense_change_percent": expense_change_percent,
+        "accounts": accounts,
+        "accounts_count": len(accounts),
+        "recent_transactions": [_recent_transaction(row) for row in recent],
+        "fixed_deposits": {
+            "count": summary.fd_count,
+            "total_investment": _money(summary.fd_total_investment),
+            "total_maturity": _money(summary.fd_total_maturity),
+            "avg_rate": float(summary.fd_rate_total) / summary.fd_count if summary.fd_count else 0.0,
+        },
+        "loans": {
+            "count": summary.loan_count,
+            "active_count": summary.loan_active_count,
+            "total_borrowed": _money(summary.loan_total_borrowed),
+            "total_outstanding": _money(summary.loan_outstanding),
+        },
+        "cards": {
+            "count": summary.card_count,
+            "active_count": summary.card_active_count,
+            "total_credit_limit": _money(summary.card_total_credit_limit),
+            "total_available": _money(summary.card_total_available),
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# Per-user cache
+# ---------------------------------------------------------------------------
+
+dashboard_cache = TTLCache(
+    ttl=config.DASHBOARD_CACHE_TTL_SECONDS,
+    stale=0,
+    max_entries=config.DASHBOARD_CACHE_MAX_ENTRIES,
+)
+
+
+def cache_key(user_id: int) -> str:
+    return f"dashboard:{user_id}"
+
+
+def render_dashboard_summary(db: Session, user_id: int) -> tuple[str, bytes]:
+    """(ETag, JSON body) of the user's summary; the ETag only changes with the content."""
+    body = json.dumps(compute_dashboard_summary(db, user_id), separators=(",", ":")).encode()
+    return f'"{hashlib.sha1(body).hexdigest()}"', body
+
+
+def invalidate_dashboards(user_ids) -> int:
+    """Drop the users' cached dashboards, and their spending analytics histories with them."""
+    spending_analytics.invalidate(user_ids)
+    return dashboard_cache.discard(*(cache_key(user_id) for user_id in user_ids))
+
+
+# ---------------------------------------------------------------------------
+# Invalidation
+# ---------------------------------------------------------------------------
+
+_OWNED = (Account, Loan, FixedDeposit, Card)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_users(session, flush_context):
+    user_ids = set()
+    account_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _OWNED):
+            if obj.user_id is not None:
+                user_ids.add(obj.user_id)
+        elif isinstance(obj, Transaction):
+            account_ids.update(a for a in (obj.src_account, obj.dest_account) if a is not None)
+
+    if account_ids:
+        user_ids.update(financial_summary.account_owners(session, account_ids).values())
+
+    if user_ids:
+        session.info.setdefault(_USERS_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    user_ids = session.info.pop(_USERS_KEY, None)
+    if not user_ids:
+        return
+    invalidate_dashboards(user_ids)
+
+    # Queued for the publisher thread: a commit never waits on RabbitMQ
+    from .rabbitmq import ws_event_publisher
+    ws_event_publisher.publish({"type": "dashboard.invalidate", "user_ids": sorted(user_ids)})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_USERS_KEY, None)
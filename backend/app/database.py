@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from contextlib import contextmanager
 import os
 
 load_dotenv()
@@ -19,4 +20,26 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@contextmanager
+def count_queries(bind=None):
+    """Count SQL statements executed on `bind` (default: the app engine) inside the block.
+
+    Usage:
+        with count_queries() as counter:
+            ...
+        print(counter["count"])
+    """
+    bind = bind or engine
+    counter = {"count": 0}
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", _before_cursor_execute)
@@ -0,0 +1,354 @@
+"""
+Denormalized per-user financial summary (user_financial_summary).
+
+One row per user holds everything /dashboard/summary aggregates: total
+balance and account count, FD, loan and card totals, and income / expenses
+of the current and previous 30-day windows. It is kept in step by an
+`after_flush` hook: whenever a flush inserts, updates or deletes an Account,
+FixedDeposit, Loan, Card or Transaction, the owners' rows are upserted with
+the deltas in the same DB transaction, so the summary commits or rolls back
+together with the write. Rows are upserted in user id order, so two
+settlements touching the same users lock them in the same order.
+
+The windows are calendar days: the current one is today and the 29 days
+before it (from `window_start`), the previous one the 30 days before that,
+and `baseline_balance` is the total balance at the end of the day before
+the window (from app/balance_snapshots.py). Deltas only ever add to the
+current window. The nightly `roll_financial_summaries` task moves every row
+to the new window by recomputing it from the source tables, which also
+repairs drift from bulk `query.update()` / `query.delete()` calls (they
+bypass the hook). A row read with an outdated window_start, or one first
+created by a delta, is recomputed on the spot.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .models import Account, Card, FixedDeposit, Loan, Transaction, UserFinancialSummary
+
+WINDOW_DAYS = 30
+
+_TABLE = UserFinancialSummary.__table__
+MEASURES = [
+    c.name for c in _TABLE.columns
+    if c.name not in ("user_id", "baseline_balance", "window_start", "updated_at")
+]
+
+
+def window(today: date) -> tuple[date, date]:
+    """(first day of the current 30-day window, first day of the previous one)."""
+    start = today - timedelta(days=WINDOW_DAYS - 1)
+    return start, start - timedelta(days=WINDOW_DAYS)
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+def _active(status) -> bool:
+    return status == "ACTIVE"
+
+
+# model: (watched columns, measures of one row given its column values)
+_OWNED = {
+    Account: (
+        ["user_id", "balance"],
+        lambda v: {"accounts_count": 1, "total_balance": v["balance"] or 0.0},
+    ),
+    FixedDeposit: (
+        ["user_id", "principal", "maturity_amount", "rate"],
+        lambda v: {
+            "fd_count": 1,
+            "fd_total_investment": v["principal"] or 0.0,
+            "fd_total_maturity": v["maturity_amount"] or 0.0,
+            "fd_rate_total": v["rate"] or 0.0,
+        },
+    ),
+    Loan: (
+        ["user_id", "principal", "outstanding", "status"],
+        lambda v: {
+            "loan_count": 1,
+            "loan_active_count": 1 if _active(v["status"]) else 0,
+            "loan_total_borrowed": v["principal"] or 0.0,
+            "loan_outstanding": (v["outstanding"] or 0.0) if _active(v["status"]) else 0.0,
+        },
+    ),
+    Card: (
+        ["user_id", "credit_limit", "available_credit", "status"],
+        lambda v: {
+            "card_count": 1,
+            "card_active_count": 1 if _active(v["status"]) else 0,
+            "card_total_credit_limit": v["credit_limit"] or 0.0,
+            "card_total_available": (v["available_credit"] or 0.0) if _active(v["status"]) else 0.0,
+        },
+    ),
+}
+_TRANSACTION_WATCHED = ["src_account", "dest_account", "amount", "status", "timestamp"]
+
+
+def _values(state, columns, old: bool) -> dict:
+    values = {}
+    for column in columns:
+        history = state.attrs[column].history
+        if old and history.deleted:
+            values[column] = history.deleted[0]
+        else:
+            values[column] = state.attrs[column].value
+    return values
+
+
+def _add(deltas: dict, user_id, measures: dict, sign: int):
+    if user_id is None:
+        return
+    bucket = deltas.setdefault(user_id, {})
+    for name, amount in measures.items():
+        bucket[name] = bucket.get(name, 0) + sign * amount
+
+
+def account_owners(session, account_ids) -> dict:
+    """{account_id: user_id}, from the session's identity map where possible, else one query."""
+    owners = {}
+    unknown = set()
+    for account_id in account_ids:
+        account = session.identity_map.get(session.identity_key(Account, account_id))
+        if account is not None and account.user_id is not None:
+            owners[account_id] = account.user_id
+        else:
+            unknown.add(account_id)
+    if unknown:
+        owners.update(
+            (row[0], row[1]) for row in session.connection().execute(
+                select(Account.id, Account.user_id).where(Account.id.in_(unknown))
+            ) if row[1] is not None
+        )
+    return owners
+
+
+def collect_deltas(session, today: date = None) -> dict:
+    """{user_id: {measure: delta}} for everything the current flush inserted, updated or deleted."""
+    deltas = {}
+    # (transaction values, sign) to apply once the account owners are known
+    flows = []
+
+    def visit(obj, old_and_new: bool, sign: int):
+        if isinstance(obj, Transaction):
+            watched, measures = _TRANSACTION_WATCHED, None
+        elif type(obj) in _OWNED:
+            watched, measures = _OWNED[type(obj)]
+        else:
+            return
+        state = inspect(obj)
+        if old_and_new and not any(state.attrs[c].history.has_changes() for c in watched):
+            return
+        changes = [(_values(state, watched, old=True), -1), (_values(state, watched, old=False), +1)] \
+            if old_and_new else [(_values(state, watched, old=sign < 0), sign)]
+        for values, value_sign in changes:
+            if measures is None:
+                flows.append((values, value_sign))
+            else:
+                _add(deltas, values["user_id"], measures(values), value_sign)
+
+    for obj in session.new:
+        visit(obj, False, +1)
+    for obj in session.dirty:
+        visit(obj, True, 0)
+    for obj in session.deleted:
+        visit(obj, False, -1)
+
+    if flows:
+        window_start = datetime.combine(window(today or datetime.utcnow().date())[0], datetime.min.time())
+        counted = [
+            (values, sign) for values, sign in flows
+            if values["status"] == "SUCCESS" and values["timestamp"] and values["timestamp"] >= window_start
+        ]
+        owners = account_owners(session, {
+            account_id for values, _ in counted
+            for account_id in (values["src_account"], values["dest_account"]) if account_id is not None
+        }) if counted else {}
+        for values, sign in counted:
+            amount = values["amount"] or 0.0
+            _add(deltas, owners.get(values["dest_account"]), {"income_30d": amount}, sign)
+            _add(deltas, owners.get(values["src_account"]), {"expenses_30d": amount}, sign)
+
+    return {user_id: measures for user_id, measures in deltas.items() if any(measures.values())}
+
+
+def apply_deltas(connection, deltas: dict):
+    """
+    Add the deltas to the users' rows. A missing row is created from the
+    deltas alone with a NULL window_start, which marks it for a recompute.
+    """
+    rows = [
+        {"user_id": user_id, **{m: 0 for m in MEASURES}, **measures, "window_start": None}
+        for user_id, measures in sorted(deltas.items())
+    ]
+    stmt = insert(_TABLE).values(rows)
+    updates = {m: _TABLE.c[m] + stmt.excluded[m] for m in MEASURES}
+    updates["updated_at"] = func.now()
+    connection.execute(stmt.on_conflict_do_update(index_elements=["user_id"], set_=updates))
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_summaries(session, flush_context):
+    deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+# ---------------------------------------------------------------------------
+# Recomputation
+# ---------------------------------------------------------------------------
+
+ENSURE_ROWS_SQL = text(f"""
+    INSERT INTO user_financial_summary (user_id, {", ".join(MEASURES)})
+    SELECT id, {", ".join("0" for _ in MEASURES)}
+    FROM unnest(CAST(:user_ids AS integer[])) AS id
+    ON CONFLICT (user_id) DO NOTHING
+""")
+
+LOCK_ROWS_SQL = text("""
+    SELECT user_id FROM user_financial_summary
+    WHERE user_id = ANY(CAST(:user_ids AS integer[]))
+    ORDER BY user_id
+    FOR UPDATE
+""")
+
+REFRESH_SQL = text("""
+    WITH target AS (
+        SELECT unnest(CAST(:user_ids AS integer[])) AS user_id
+    ), acc AS (
+        SELECT a.user_id, COUNT(*) AS accounts_count, COALESCE(SUM(a.balance), 0) AS total_balance
+        FROM accounts a JOIN target USING (user_id)
+        GROUP BY a.user_id
+    ), income AS (
+        SELECT a.user_id,
+               COALESCE(SUM(t.amount) FILTER (WHERE t.timestamp >= :window_start), 0) AS current,
+               COALESCE(SUM(t.amount) FILTER (WHERE t.timestamp < :window_start), 0) AS previous
+        FROM transactions t
+        JOIN accounts a ON a.id = t.dest_account
+        JOIN target USING (user_id)
+        WHERE t.status = 'SUCCESS' AND t.timestamp >= :previous_start
+        GROUP BY a.user_id
+    ), expenses AS (
+        SELECT a.user_id,
+               COALESCE(SUM(t.amount) FILTER (WHERE t.timestamp >= :window_start), 0) AS current,
+               COALESCE(SUM(t.amount) FILTER (WHERE t.timestamp < :window_start), 0) AS previous
+        FROM transactions t
+        JOIN accounts a ON a.id = t.src_account
+        JOIN target USING (user_id)
+        WHERE t.status = 'SUCCESS' AND t.timestamp >= :previous_start
+        GROUP BY a.user_id
+    ), baseline AS (
+        -- Each account's newest snapshot up to the day before the window
+        SELECT a.user_id, SUM(s.balance) AS balance
+        FROM accounts a
+        JOIN target USING (user_id)
+        JOIN LATERAL (
+            SELECT balance FROM account_balance_snapshots
+            WHERE account_id = a.id AND day <= :baseline_day
+            ORDER BY day DESC
+            LIMIT 1
+        ) s ON true
+        GROUP BY a.user_id
+    ), fd AS (
+        SELECT f.user_id, COUNT(*) AS count,
+               COALESCE(SUM(f.principal), 0) AS total_investment,
+               COALESCE(SUM(f.maturity_amount), 0) AS total_maturity,
+               COALESCE(SUM(f.rate), 0) AS rate_total
+        FROM fixed_deposits f JOIN target USING (user_id)
+        GROUP BY f.user_id
+    ), loan AS (
+        SELECT l.user_id, COUNT(*) AS count,
+               COUNT(*) FILTER (WHERE l.status = 'ACTIVE') AS active_count,
+               COALESCE(SUM(l.principal), 0) AS total_borrowed,
+               COALESCE(SUM(l.outstanding) FILTER (WHERE l.status = 'ACTIVE'), 0) AS outstanding
+        FROM loans l JOIN target USING (user_id)
+        GROUP BY l.user_id
+    ), card AS (
+        SELECT c.user_id, COUNT(*) AS count,
+               COUNT(*) FILTER (WHERE c.status = 'ACTIVE') AS active_count,
+               COALESCE(SUM(c.credit_limit), 0) AS total_credit_limit,
+               COALESCE(SUM(c.available_credit) FILTER (WHERE c.status = 'ACTIVE'), 0) AS total_available
+        FROM cards c JOIN target USING (user_id)
+        GROUP BY c.user_id
+    )
+    UPDATE user_financial_summary s
+    SET accounts_count = COALESCE(acc.accounts_count, 0),
+        total_balance = COALESCE(acc.total_balance, 0),
+        income_30d = COALESCE(income.current, 0),
+        expenses_30d = COALESCE(expenses.current, 0),
+        previous_income_30d = COALESCE(income.previous, 0),
+        previous_expenses_30d = COALESCE(expenses.previous, 0),
+        baseline_balance = baseline.balance,
+        window_start = CAST(:window_start AS date),
+        fd_count = COALESCE(fd.count, 0),
+        fd_total_investment = COALESCE(fd.total_investment, 0),
+        fd_total_maturity = COALESCE(fd.total_maturity, 0),
+        fd_rate_total = COALESCE(fd.rate_total, 0),
+        loan_count = COALESCE(loan.count, 0),
+        loan_active_count = COALESCE(loan.active_count, 0),
+        loan_total_borrowed = COALESCE(loan.total_borrowed, 0),
+        loan_outstanding = COALESCE(loan.outstanding, 0),
+        card_count = COALESCE(card.count, 0),
+        card_active_count = COALESCE(card.active_count, 0),
+        card_total_credit_limit = COALESCE(card.total_credit_limit, 0),
+        card_total_available = COALESCE(card.total_available, 0),
+        updated_at = now()
+    FROM target
+    LEFT JOIN acc USING (user_id)
+    LEFT JOIN income USING (user_id)
+    LEFT JOIN expenses USING (user_id)
+    LEFT JOIN baseline USING (user_id)
+    LEFT JOIN fd USING (user_id)
+    LEFT JOIN loan USING (user_id)
+    LEFT JOIN card USING (user_id)
+    WHERE s.user_id = target.user_id
+""")
+
+
+def refresh(connection, user_ids, today: date = None) -> int:
+    """
+    Recompute the rows of `user_ids` from the source tables for the window
+    ending `today`. Returns the number of rows written.
+
+    The rows are created if needed and locked before the recompute, so a
+    concurrent writer either committed before it (and is counted) or adds its
+    delta on top of the recomputed row afterwards.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return 0
+    window_start, previous_start = window(today or datetime.utcnow().date())
+    connection.execute(ENSURE_ROWS_SQL, {"user_ids": user_ids})
+    connection.execute(LOCK_ROWS_SQL, {"user_ids": user_ids})
+    result = connection.execute(REFRESH_SQL, {
+        "user_ids": user_ids,
+        "window_start": datetime.combine(window_start, datetime.min.time()),
+        "previous_start": datetime.combine(previous_start, datetime.min.time()),
+        "baseline_day": window_start - timedelta(days=1),
+    })
+    return result.rowcount
+
+
+def roll(engine, batch_size: int, today: date = None) -> dict:
+    """
+    Recompute every user's row for today's window, `batch_size` users per
+    transaction so no run holds many row locks at once.
+    """
+    today = today or datetime.utcnow().date()
+    after = 0
+    users = batches = 0
+    while True:
+        with engine.begin() as conn:
+            user_ids = [row[0] for row in conn.execute(
+                text("SELECT id FROM users WHERE id > :after ORDER BY id LIMIT :limit"),
+                {"after": after, "limit": batch_size},
+            )]
+            if not user_ids:
+                break
+            users += refresh(conn, user_ids, today)
+        batches += 1
+        after = user_ids[-1]
+    return {"window_start": window(today)[0].isoformat(), "users": users, "batches": batches}
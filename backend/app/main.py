@@ -22,7 +22,11 @@ import json
 import os
 from dotenv import load_dotenv
 from .rabbitmq_ws_listener import rabbitmq_ws_listener
-from . import config
+from . import charts, config, qr_utils
+from .pagination import PAGINATION_HEADERS
+from . import rollups  # registers the rollup maintenance hook on Session flushes
+from . import user_search  # registers the user search index hooks
+from . import financial_summary  # registers the user_financial_summary maintenance hook
 
 load_dotenv()
 
@@ -42,6 +46,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser read the admin list pagination headers
+    expose_headers=PAGINATION_HEADERS,
 )
 
 app.include_router(auth_router.router)
@@ -72,5 +78,16 @@ async def start_background_tasks():
         daemon=True
     )
     thread.start()
+
+    # Chart render workers take a few seconds to spawn and import matplotlib
+    charts.start()
+
+    # Load the QR logo now rather than on the first QR request
+    qr_utils.load_logo()
     
-    # stock streamer removed
\ No newline at end of file
+    # stock streamer removed
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    charts.shutdown()
\ No newline at end of file
@@ -73,7 +73,8 @@ class Transaction(Base):
     dest_account = Column(Integer, ForeignKey("accounts.id"))
     amount = Column(Float, nullable=False)
     status = Column(String, default="PENDING")  # PENDING, SUCCESS, FAILED
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    # Partition key once migrate_partition_tables.py has been run
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     
     # Card-based transaction support - UNCOMMENT AFTER RUNNING fix_transactions_table.sql
     # src_card_id = Column(Integer, ForeignKey("cards.id"), nullable=True)  # Source card for card-to-account transfers
@@ -94,7 +95,16 @@ class AuditLog(Base):
     id = Column(Integer, primary_key=True, index=True)
     event_type = Column(String, index=True)
     message = Column(Text)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    # Partition key once migrate_partition_tables.py has been run
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Structured fields (no foreign keys so audit rows outlive deleted users/accounts)
+    actor_id = Column(Integer, nullable=True, index=True)  # user who performed the action
+    subject_user_id = Column(Integer, nullable=True, index=True)  # user the action applies to
+    account_id = Column(Integer, nullable=True, index=True)
+    entity_type = Column(String, nullable=True)  # 'transaction', 'loan', 'card', 'fixed_deposit', 'user', 'account'
+    entity_id = Column(Integer, nullable=True)
+    amount = Column(Float, nullable=True)
 
 
 class FixedDeposit(Base):
@@ -206,6 +216,168 @@ class Notification(Base):
     
     # For admin notifications
     from_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    # Coalesced digests (app/notification_digests.py): events with the same
+    # group_key inside the digest window update one row instead of adding rows
+    group_key = Column(String, nullable=True, index=True)
+    group_count = Column(Integer, default=1)
+    group_amount = Column(Float, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    pushed_at = Column(DateTime, nullable=True)  # last WebSocket push for this row
     
     user = relationship("User", foreign_keys=[user_id])
-    from_user = relationship("User", foreign_keys=[from_user_id])
\ No newline at end of file
+    from_user = relationship("User", foreign_keys=[from_user_id])
+
+
+
+class NotificationCounter(Base):
+    """Total / unread notification counts per user, maintained by app/notification_counters.py"""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_count = Column(Integer, default=0, nullable=False)
+    unread_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class AccountBalanceSnapshot(Base):
+    """End-of-day balance of an account, written by app/balance_snapshots.py"""
+    __tablename__ = "account_balance_snapshots"
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    balance = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class UserFinancialSummary(Base):
+    """
+    Dashboard aggregates of one user, maintained by app/financial_summary.py.
+    The 30-day windows start on window_start (NULL until first computed).
+    """
+    __tablename__ = "user_financial_summary"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    accounts_count = Column(Integer, default=0, nullable=False)
+    total_balance = Column(Float, default=0.0, nullable=False)
+    income_30d = Column(Float, default=0.0, nullable=False)
+    expenses_30d = Column(Float, default=0.0, nullable=False)
+    previous_income_30d = Column(Float, default=0.0, nullable=False)
+    previous_expenses_30d = Column(Float, default=0.0, nullable=False)
+    baseline_balance = Column(Float, nullable=True)  # total balance the day before the window; NULL without snapshots
+    window_start = Column(Date, nullable=True)
+    fd_count = Column(Integer, default=0, nullable=False)
+    fd_total_investment = Column(Float, default=0.0, nullable=False)
+    fd_total_maturity = Column(Float, default=0.0, nullable=False)
+    fd_rate_total = Column(Float, default=0.0, nullable=False)  # sum of rates, for the average
+    loan_count = Column(Integer, default=0, nullable=False)
+    loan_active_count = Column(Integer, default=0, nullable=False)
+    loan_total_borrowed = Column(Float, default=0.0, nullable=False)
+    loan_outstanding = Column(Float, default=0.0, nullable=False)  # active loans only
+    card_count = Column(Integer, default=0, nullable=False)
+    card_active_count = Column(Integer, default=0, nullable=False)
+    card_total_credit_limit = Column(Float, default=0.0, nullable=False)
+    card_total_available = Column(Float, default=0.0, nullable=False)  # active cards only
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class NotificationHistorySummary(Base):
+    """
+    Compacted history of notifications removed by the retention job
+    (app/notification_retention.py): one row per user, month and type.
+    """
+    __tablename__ = "notification_history_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    type = Column(String, primary_key=True)
+    notification_count = Column(Integer, default=0, nullable=False)
+    event_count = Column(Integer, default=0, nullable=False)  # digests count every event folded into them
+    amount_total = Column(Float, default=0.0, nullable=False)
+    first_at = Column(DateTime, nullable=True)
+    last_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class PushSubscription(Base):
+    """Web Push subscription of one browser; a user may have several"""
+    __tablename__ = "push_subscriptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    endpoint = Column(Text, nullable=False, unique=True)
+    p256dh = Column(String, nullable=True)
+    auth = Column(String, nullable=True)
+    expiration_time = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_success_at = Column(DateTime, nullable=True)
+    failure_count = Column(Integer, default=0, nullable=False)  # consecutive failed deliveries
+
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    type = Column(String, nullable=False, default="general")
+    from_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    status = Column(String, default="queued", nullable=False)  # 'queued', 'running', 'completed', 'failed'
+    total_recipients = Column(Integer, default=0)
+    delivered = Column(Integer, default=0)  # notification rows inserted so far
+    last_user_id = Column(Integer, default=0)  # resume point if the task is retried
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+# Admin batch export of printable QR codes (app/qr_batch.py)
+class QRBatchJob(Base):
+    __tablename__ = "qr_batch_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # 'accounts', 'users'
+    output_format = Column(String, nullable=False, default="zip")  # 'zip', 'pdf'
+    ids = Column(Text, nullable=True)  # JSON list of account / user ids, NULL for all of them
+    requested_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    status = Column(String, default="queued", nullable=False)  # 'queued', 'running', 'completed', 'failed'
+    total = Column(Integer, default=0)
+    rendered = Column(Integer, default=0)  # QR codes written to the output so far
+    codes_per_second = Column(Float, nullable=True)
+    file_path = Column(String, nullable=True)
+    file_size = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+# Daily rollups for the admin analytics endpoints, maintained by app/rollups.py.
+# `shard` spreads concurrent writers over several rows; readers sum over it.
+# Days older than ROLLUP_DAILY_RETENTION_DAYS are folded into the 1st of their month.
+class StatsDailyTransactions(Base):
+    __tablename__ = "stats_daily_transactions"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    txn_count = Column(Integer, default=0, nullable=False)
+    amount_total = Column(Float, default=0.0, nullable=False)
+
+
+class StatsDailyAccounts(Base):
+    __tablename__ = "stats_daily_accounts"
+
+    day = Column(Date, primary_key=True)  # Account.created_at
+    account_type = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    account_count = Column(Integer, default=0, nullable=False)
+
+
+class StatsDailyApprovals(Base):
+    __tablename__ = "stats_daily_approvals"
+
+    day = Column(Date, primary_key=True)  # created_at (start_date for fixed deposits)
+    entity = Column(String, primary_key=True)  # 'user', 'loan', 'card', 'fixed_deposit'
+    category = Column(String, primary_key=True)  # user role / loan band / card type / ''
+    approval_status = Column(String, primary_key=True)  # status for users
+    shard = Column(Integer, primary_key=True, default=0)
+    item_count = Column(Integer, default=0, nullable=False)
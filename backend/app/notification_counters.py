@@ -0,0 +1,243 @@
+"""
+Per-user notification counters (total / unread) for the notification badge.
+
+notification_counters holds one row per user and is kept in step with the
+notifications table:
+- ORM inserts, deletes and is_read changes are picked up by an `after_flush`
+  hook, which upserts the deltas in the same transaction (RETURNING the new
+  absolute values);
+- set-based writes (mark-all-read, broadcasts, retention) update the row
+  explicitly with the helpers below.
+
+Committed values are kept in a per-process memory cache that serves
+/api/notifications/stats, and are pushed to the user's WebSocket as a
+`notification.counts` message. A process without WebSocket connections (a
+Celery worker) publishes one `notification.counts.batch` event per commit on
+ws_events instead, and the API's listener updates its cache and routes each
+user's counts to that user only.
+
+The nightly `reconcile_notification_counters` task recomputes every row from
+the notifications table and fixes any drift.
+"""
+import asyncio
+import threading
+import time
+
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from . import config
+from .models import Notification, NotificationCounter
+
+_DELTAS_KEY = "notification_counter_values"
+
+
+class CounterCache:
+    """Committed counter values by user id, refreshed from the DB after a TTL."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        with self._lock:
+            entry = self._values.get(user_id)
+        if entry and time.monotonic() - entry[2] < self.ttl:
+            return entry[0], entry[1]
+        return None
+
+    def set(self, user_id: int, total: int, unread: int):
+        with self._lock:
+            self._values[user_id] = (total, unread, time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+counter_cache = CounterCache(ttl=config.NOTIFICATION_COUNTER_TTL_SECONDS)
+
+
+def get_counts(db: Session, user_id: int) -> tuple[int, int]:
+    """(total, unread) for a user: memory, then the counter row, then a recount."""
+    cached = counter_cache.get(user_id)
+    if cached:
+        return cached
+
+    row = db.query(NotificationCounter).filter(NotificationCounter.user_id == user_id).first()
+    if row:
+        counts = (row.total_count, row.unread_count)
+    else:
+        counts = recount_user(db, user_id)
+        db.commit()
+    counter_cache.set(user_id, *counts)
+    return counts
+
+
+def recount_user(db: Session, user_id: int) -> tuple[int, int]:
+    """Recompute one user's counters from the notifications table and store them."""
+    total, unread = db.query(
+        func.count(Notification.id),
+        func.count(Notification.id).filter(Notification.is_read.isnot(True)),
+    ).filter(Notification.user_id == user_id).one()
+    _upsert(db.connection(), [{"user_id": user_id, "total_count": total, "unread_count": unread}], absolute=True)
+    return total, unread
+
+
+def _upsert(connection, rows: list[dict], absolute: bool = False) -> dict:
+    """Add (or with absolute=True, set) counter values; returns {user_id: (total, unread)}."""
+    table = NotificationCounter.__table__
+    stmt = insert(table).values(rows)
+    if absolute:
+        updates = {"total_count": stmt.excluded.total_count, "unread_count": stmt.excluded.unread_count}
+    else:
+        updates = {
+            "total_count": table.c.total_count + stmt.excluded.total_count,
+            "unread_count": table.c.unread_count + stmt.excluded.unread_count,
+        }
+    updates["updated_at"] = func.now()
+    stmt = stmt.on_conflict_do_update(index_elements=["user_id"], set_=updates).returning(
+        table.c.user_id, table.c.total_count, table.c.unread_count
+    )
+    return {row[0]: (row[1], row[2]) for row in connection.execute(stmt)}
+
+
+def _remember(session: Session, values: dict):
+    """Queue new absolute values to be cached and pushed once the session commits."""
+    session.info.setdefault(_DELTAS_KEY, {}).update(values)
+
+
+def mark_all_read(db: Session, user_id: int):
+    """Counter update for the bulk mark-all-read UPDATE (same transaction)."""
+    result = db.execute(text(
+        "UPDATE notification_counters SET unread_count = 0, updated_at = now() "
+        "WHERE user_id = :user_id RETURNING total_count"
+    ), {"user_id": user_id}).first()
+    if result:
+        _remember(db, {user_id: (result[0], 0)})
+    else:
+        _remember(db, {user_id: recount_user(db, user_id)})
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+def _collect_deltas(session) -> dict:
+    deltas = {}
+
+    def add(user_id, total, unread):
+        if user_id is None:
+            return
+        current = deltas.setdefault(user_id, [0, 0])
+        current[0] += total
+        current[1] += unread
+
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            add(obj.user_id, 1, 0 if obj.is_read else 1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Notification):
+            history = inspect(obj).attrs.is_read.history
+            if history.has_changes():
+                was_read = bool(history.deleted[0]) if history.deleted else False
+                if was_read != bool(obj.is_read):
+                    add(obj.user_id, 0, 1 if was_read else -1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            add(obj.user_id, -1, 0 if obj.is_read else -1)
+
+    return {user_id: d for user_id, d in deltas.items() if d != [0, 0]}
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_counters(session, flush_context):
+    deltas = _collect_deltas(session)
+    if not deltas:
+        return
+    rows = [
+        {"user_id": user_id, "total_count": total, "unread_count": unread}
+        for user_id, (total, unread) in sorted(deltas.items())
+    ]
+    _remember(session, _upsert(session.connection(), rows))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    values = session.info.pop(_DELTAS_KEY, None)
+    if values:
+        publish_counts(values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_DELTAS_KEY, None)
+
+
+# ---------------------------------------------------------------------------
+# Delivery
+# ---------------------------------------------------------------------------
+
+def counts_message(user_id: int, total: int, unread: int) -> dict:
+    return {"type": "notification.counts", "user_id": user_id, "total_count": total, "unread_count": unread}
+
+
+def publish_counts(values: dict):
+    """Cache committed counter values and push them to their users."""
+    for user_id, (total, unread) in values.items():
+        counter_cache.set(user_id, total, unread)
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is not None:
+        # API process: send straight to the user's sockets
+        from .websocket_manager import manager
+        for user_id, (total, unread) in values.items():
+            loop.create_task(manager.send_personal_message(counts_message(user_id, total, unread), user_id))
+        return
+
+    # Worker process: one event for every user of the commit, queued for the
+    # publisher thread; the API's ws_events listener routes each user their own
+    from .rabbitmq import ws_event_publisher
+    ws_event_publisher.publish({
+        "type": "notification.counts.batch",
+        "counts": [counts_message(user_id, total, unread) for user_id, (total, unread) in values.items()],
+    })
+
+
+# ---------------------------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------------------------
+
+def reconcile(connection) -> int:
+    """
+    Recompute every counter row from the notifications table, fixing only the
+    rows that drifted. Returns the number of rows changed.
+    """
+    fixed = connection.execute(text("""
+        INSERT INTO notification_counters (user_id, total_count, unread_count, updated_at)
+        SELECT u.id,
+               COALESCE(n.total_count, 0),
+               COALESCE(n.unread_count, 0),
+               now()
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id, COUNT(*) AS total_count, COUNT(*) FILTER (WHERE is_read IS NOT TRUE) AS unread_count
+            FROM notifications
+            GROUP BY user_id
+        ) n ON n.user_id = u.id
+        ON CONFLICT (user_id) DO UPDATE
+        SET total_count = EXCLUDED.total_count,
+            unread_count = EXCLUDED.unread_count,
+            updated_at = now()
+        WHERE notification_counters.total_count IS DISTINCT FROM EXCLUDED.total_count
+           OR notification_counters.unread_count IS DISTINCT FROM EXCLUDED.unread_count
+    """))
+    return fixed.rowcount
@@ -0,0 +1,184 @@
+"""
+Coalescing of high-frequency "payment received" notifications.
+
+Instead of one Notification row and one WebSocket message per incoming
+transfer, payments received by a user within NOTIFICATION_DIGEST_WINDOW_SECONDS
+are folded into a single unread digest row ("You received 37 payments
+totalling $X"). The row keeps the running count and amount, and spans
+[created_at, updated_at], so the individual transactions can be listed on
+demand (see transactions_for_digest).
+
+WebSocket pushes for a digest that keeps growing are throttled to one per
+NOTIFICATION_DIGEST_PUSH_INTERVAL_SECONDS. The first update suppressed after a
+push schedules a trailing `flush_payment_digest` task for the end of the
+interval, which pushes the digest's latest state, so the client never keeps an
+outdated count after a burst.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from . import config
+from .models import Account, Notification, Transaction
+
+PAYMENTS_RECEIVED = "payments_received"
+_TRAILING_KEY = "payment_digest_trailing_pushes"
+
+
+def _lock_user_digest(db: Session, user_id: int):
+    # Serialize digest updates per user across workers for this transaction
+    db.execute(func.pg_advisory_xact_lock(func.hashtext(f"{PAYMENTS_RECEIVED}:{user_id}")))
+
+
+def record_payment_received(
+    db: Session,
+    user_id: int,
+    amount: float,
+    balance: float,
+    txn_id: int,
+    from_user_id: int = None,
+    from_name: str = None,
+    now: datetime = None,
+) -> tuple[Notification, bool]:
+    """
+    Add an incoming payment to the user's open digest, or start a new one.
+
+    `now` should be the transaction's settlement timestamp, so that the digest's
+    [created_at, updated_at] span covers exactly the transfers folded into it.
+
+    Returns:
+        (notification, push) where push says whether a WebSocket update is due
+    """
+    now = now or datetime.utcnow()
+    window = config.NOTIFICATION_DIGEST_WINDOW_SECONDS
+
+    digest = None
+    if window > 0:
+        _lock_user_digest(db, user_id)
+        digest = db.query(Notification).filter(
+            Notification.user_id == user_id,
+            Notification.group_key == PAYMENTS_RECEIVED,
+            Notification.is_read == False,
+            Notification.created_at >= now - timedelta(seconds=window)
+        ).order_by(Notification.created_at.desc()).with_for_update().first()
+
+    if digest is None:
+        notification = Notification(
+            user_id=user_id,
+            title="Transaction Received",
+            message=f"You received ${amount:,.2f} from {from_name}. Your new balance is ${balance:,.2f}.",
+            type="transaction",
+            related_id=txn_id,
+            from_user_id=from_user_id,
+            group_key=PAYMENTS_RECEIVED if window > 0 else None,
+            group_count=1,
+            group_amount=amount,
+            created_at=now,
+            updated_at=now,
+            pushed_at=now,
+        )
+        db.add(notification)
+        return notification, True
+
+    # Updates after the last push are already waiting for a trailing push
+    trailing_scheduled = digest.pushed_at is not None and digest.updated_at is not None and digest.updated_at > digest.pushed_at
+
+    digest.group_count = (digest.group_count or 1) + 1
+    digest.group_amount = (digest.group_amount or 0) + amount
+    digest.title = "Payments Received"
+    digest.message = (
+        f"You received {digest.group_count} payments totalling ${digest.group_amount:,.2f}. "
+        f"Your new balance is ${balance:,.2f}."
+    )
+    # The latest payment; the digest's sender is only meaningful for a single payment
+    digest.related_id = txn_id
+    digest.from_user_id = None
+    digest.updated_at = now
+
+    interval = config.NOTIFICATION_DIGEST_PUSH_INTERVAL_SECONDS
+    push = digest.pushed_at is None or (now - digest.pushed_at).total_seconds() >= interval
+    if push:
+        digest.pushed_at = now
+    elif not trailing_scheduled:
+        # Scheduled once the transaction commits (see _schedule_trailing_pushes)
+        delay = interval - (now - digest.pushed_at).total_seconds()
+        db.info.setdefault(_TRAILING_KEY, {})[digest.id] = delay
+    return digest, push
+
+
+def take_trailing_push(db: Session, notification_id: int):
+    """
+    Mark a digest as pushed if it changed since its last push, under the same
+    per-user lock as record_payment_received. Returns the digest, or None if
+    there is nothing to push (caller commits, then sends push_message()).
+    """
+    digest = db.query(Notification).filter(Notification.id == notification_id).first()
+    if digest is None:
+        return None
+    _lock_user_digest(db, digest.user_id)
+    db.refresh(digest, with_for_update=True)
+    if digest.is_read or digest.pushed_at is None or digest.updated_at is None or digest.updated_at <= digest.pushed_at:
+        return None
+    digest.pushed_at = max(datetime.utcnow(), digest.updated_at)
+    return digest
+
+
+def push_message(notification: Notification, from_user_name: str = None) -> dict:
+    """The WebSocket message for a payment notification; later updates of a digest replace it in place."""
+    is_update = (notification.group_count or 1) > 1
+    return {
+        "type": "notification.updated" if is_update else "notification",
+        "data": {
+            "id": notification.id,
+            "user_id": notification.user_id,
+            "title": notification.title,
+            "message": notification.message,
+            "type": notification.type,
+            "related_id": notification.related_id,
+            "is_read": False,
+            "created_at": notification.created_at.isoformat(),
+            "read_at": None,
+            "from_user_id": notification.from_user_id,
+            "from_user_name": from_user_name if notification.from_user_id else None,
+            "group_key": notification.group_key,
+            "group_count": notification.group_count,
+            "group_amount": notification.group_amount,
+            "updated_at": notification.updated_at.isoformat() if notification.updated_at else None
+        }
+    }
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_trailing_pushes(session):
+    pending = session.info.pop(_TRAILING_KEY, None)
+    if not pending:
+        return
+    from .tasks import flush_payment_digest
+    for notification_id, delay in pending.items():
+        try:
+            flush_payment_digest.apply_async(args=[notification_id], countdown=max(delay, 0))
+        except Exception as e:
+            print(f"Failed to schedule trailing push for digest {notification_id}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_TRAILING_KEY, None)
+
+
+def transactions_for_digest(db: Session, notification: Notification) -> list:
+    """The incoming transfers folded into a digest notification."""
+    account_ids = [row[0] for row in db.query(Account.id).filter(Account.user_id == notification.user_id)]
+    if not account_ids:
+        return []
+    # process_transaction stamps the digest with each transfer's settlement time
+    end = notification.updated_at or notification.created_at
+    return db.query(Transaction).filter(
+        Transaction.dest_account.in_(account_ids),
+        Transaction.src_account.isnot(None),
+        ~Transaction.src_account.in_(account_ids),
+        Transaction.status == "SUCCESS",
+        Transaction.timestamp >= notification.created_at,
+        Transaction.timestamp <= end,
+    ).order_by(Transaction.timestamp.desc()).all()
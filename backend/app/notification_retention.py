@@ -0,0 +1,138 @@
+"""
+Retention for the notifications table.
+
+Read notifications older than NOTIFICATION_RETENTION_DAYS are removed by the
+nightly `purge_notifications` Celery beat task. Before they are deleted, they
+are folded into notification_history_summaries (one row per user, month and
+type), so a user's history can still be summarised.
+
+The work is done in small batches, each in its own short transaction:
+- candidate rows are claimed with FOR UPDATE SKIP LOCKED, so rows a live
+  request is touching are skipped and picked up by a later run;
+- `SET LOCAL lock_timeout` bounds any other wait (e.g. a counter row held by
+  a transaction in flight); a batch that hits it is rolled back and retried
+  after a back-off;
+- the delete, the summary upsert and the notification_counters adjustment
+  are one statement (data-modifying CTEs), so they commit or fail together.
+
+Batch size, lock timeout, pause between batches and total runtime are
+tunable in config.
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from . import config
+
+PURGE_BATCH_SQL = text("""
+    WITH doomed AS (
+        SELECT id FROM notifications
+        WHERE is_read IS TRUE AND created_at < :cutoff
+        ORDER BY created_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ), deleted AS (
+        DELETE FROM notifications n
+        USING doomed d
+        WHERE n.id = d.id
+        RETURNING n.user_id, n.type, n.created_at, n.group_count, n.group_amount
+    ), summarised AS (
+        INSERT INTO notification_history_summaries AS s
+            (user_id, month, type, notification_count, event_count, amount_total, first_at, last_at, updated_at)
+        SELECT user_id,
+               date_trunc('month', created_at)::date,
+               type,
+               COUNT(*),
+               SUM(COALESCE(group_count, 1)),
+               SUM(COALESCE(group_amount, 0)),
+               MIN(created_at),
+               MAX(created_at),
+               now()
+        FROM deleted
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, month, type) DO UPDATE
+        SET notification_count = s.notification_count + EXCLUDED.notification_count,
+            event_count = s.event_count + EXCLUDED.event_count,
+            amount_total = s.amount_total + EXCLUDED.amount_total,
+            first_at = LEAST(s.first_at, EXCLUDED.first_at),
+            last_at = GREATEST(s.last_at, EXCLUDED.last_at),
+            updated_at = now()
+        RETURNING 1
+    ), counted AS (
+        -- Only read rows are deleted, so unread counts are unchanged
+        UPDATE notification_counters c
+        SET total_count = GREATEST(c.total_count - d.removed, 0),
+            updated_at = now()
+        FROM (SELECT user_id, COUNT(*) AS removed FROM deleted GROUP BY user_id) d
+        WHERE c.user_id = d.user_id
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM deleted) AS deleted,
+           (SELECT COUNT(*) FROM summarised) AS summarised,
+           (SELECT COUNT(*) FROM counted) AS counters
+""")
+
+
+def purge_batch(connection, cutoff: datetime, batch_size: int, lock_timeout_ms: int) -> dict:
+    """Delete and summarise one batch inside the caller's transaction."""
+    # SET LOCAL does not take bind parameters; the value is an int from config
+    connection.execute(text(f"SET LOCAL lock_timeout = '{int(lock_timeout_ms)}ms'"))
+    row = connection.execute(PURGE_BATCH_SQL, {"cutoff": cutoff, "batch_size": batch_size}).one()
+    return {"deleted": row.deleted, "summarised": row.summarised, "counters": row.counters}
+
+
+def purge(
+    engine,
+    now: datetime = None,
+    retention_days: int = None,
+    batch_size: int = None,
+    lock_timeout_ms: int = None,
+    pause_seconds: float = None,
+    max_runtime_seconds: float = None,
+    max_lock_retries: int = 5,
+) -> dict:
+    """
+    Run batches until nothing is left to purge, the runtime budget is spent or
+    locks keep timing out. Returns a report of what was done.
+    """
+    now = now or datetime.utcnow()
+    retention_days = config.NOTIFICATION_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or config.NOTIFICATION_RETENTION_BATCH_SIZE
+    lock_timeout_ms = lock_timeout_ms or config.NOTIFICATION_RETENTION_LOCK_TIMEOUT_MS
+    pause_seconds = config.NOTIFICATION_RETENTION_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    max_runtime_seconds = max_runtime_seconds or config.NOTIFICATION_RETENTION_MAX_RUNTIME_SECONDS
+
+    cutoff = now - timedelta(days=retention_days)
+    report = {"cutoff": cutoff.isoformat(), "batches": 0, "deleted": 0, "lock_timeouts": 0, "stopped": "done"}
+    started = time.monotonic()
+    retries = 0
+
+    while True:
+        if time.monotonic() - started >= max_runtime_seconds:
+            report["stopped"] = "runtime budget"
+            break
+
+        try:
+            with engine.begin() as conn:
+                result = purge_batch(conn, cutoff, batch_size, lock_timeout_ms)
+        except OperationalError as e:
+            # lock_timeout: back off and let the live writers finish
+            report["lock_timeouts"] += 1
+            retries += 1
+            if retries > max_lock_retries:
+                report["stopped"] = f"lock timeouts: {e.orig}"
+                break
+            time.sleep(pause_seconds * (2 ** retries))
+            continue
+
+        retries = 0
+        report["batches"] += 1
+        report["deleted"] += result["deleted"]
+        if result["deleted"] < batch_size:
+            break
+        time.sleep(pause_seconds)
+
+    report["elapsed_seconds"] = round(time.monotonic() - started, 2)
+    return report
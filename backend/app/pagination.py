@@ -0,0 +1,131 @@
+"""
+Keyset (cursor) pagination and cheap totals for the admin list endpoints.
+
+Pages are selected with `WHERE (sort_column, id) > (last_value, last_id)`
+instead of OFFSET, so page N costs the same as page 1 when an index on
+(sort_column, id) exists. The cursor is an opaque base64 token holding the
+last row's sort value and id; it is returned in the X-Next-Cursor header so
+the response body stays a plain list.
+
+Totals come from the planner's row estimate (EXPLAIN) unless the caller
+asks for an exact count, and are returned in X-Total-Count together with
+X-Total-Exact.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query
+
+MAX_PAGE_SIZE = 1000
+PAGINATION_HEADERS = ["X-Next-Cursor", "X-Total-Count", "X-Total-Exact"]
+
+
+def encode_cursor(sort: str, order: str, value, row_id: int) -> str:
+    kind = None
+    if isinstance(value, datetime):
+        kind, value = "datetime", value.isoformat()
+    elif isinstance(value, date):
+        kind, value = "date", value.isoformat()
+    payload = {"s": sort, "o": order, "v": value, "t": kind, "id": row_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: str, order: str):
+    """Returns (sort value, id). Raises HTTPException 400 for malformed or mismatched cursors."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = payload["v"]
+        if payload.get("t") == "datetime":
+            value = datetime.fromisoformat(value)
+        elif payload.get("t") == "date":
+            value = date.fromisoformat(value)
+        row_id = int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("s") != sort or payload.get("o") != order:
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order")
+    return value, row_id
+
+
+def estimate_count(query: Query) -> int:
+    """Planner row estimate for `query` (no rows are read)."""
+    statement = query.order_by(None).statement
+    connection = query.session.connection()
+    compiled = statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def paginate(
+    query: Query,
+    model,
+    response: Response,
+    sort_keys: dict,
+    sort: str,
+    order: str = "desc",
+    cursor: str = None,
+    limit: int = 100,
+    skip: int = 0,
+    exact_total: bool = False,
+) -> list:
+    """
+    Apply keyset pagination to a filtered query and set the pagination headers.
+
+    Args:
+        query: Query with the endpoint's filters applied
+        model: Mapped class; its `id` column breaks ties between equal sort values
+        response: Response whose headers receive the cursor and total
+        sort_keys: Allowed sort names -> columns (each should be indexed with id)
+        sort / order: Requested sort key and 'asc' or 'desc'
+        cursor: X-Next-Cursor value from the previous page
+        limit: Page size, capped at MAX_PAGE_SIZE
+        skip: Legacy offset, only honoured when no cursor is given
+        exact_total: Run COUNT(*) instead of using the planner estimate
+
+    Raises:
+        HTTPException: 400 for unknown sort keys/orders or bad cursors
+    """
+    if sort not in sort_keys:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(sort_keys)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if exact_total:
+        total = query.order_by(None).with_entities(func.count()).scalar()
+    else:
+        total = estimate_count(query)
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Exact"] = "true" if exact_total else "false"
+
+    column = sort_keys[sort]
+    id_column = model.id
+    descending = order == "desc"
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort, order)
+        if column is id_column:
+            query = query.filter(id_column < row_id if descending else id_column > row_id)
+        else:
+            key = tuple_(column, id_column)
+            query = query.filter(key < tuple_(value, row_id) if descending else key > tuple_(value, row_id))
+    elif skip:
+        query = query.offset(skip)
+
+    if column is id_column:
+        ordering = [id_column.desc() if descending else id_column.asc()]
+    else:
+        ordering = [column.desc(), id_column.desc()] if descending else [column.asc(), id_column.asc()]
+
+    # One extra row tells us whether there is a next page
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(sort, order, getattr(last, column.key), last.id)
+    return rows
@@ -0,0 +1,197 @@
+"""
+Monthly range partitioning for the append-only `transactions` and `auditlogs`
+tables, plus archival of old partitions to gzip-compressed CSV files.
+
+The parent tables are converted once by `migrate_partition_tables.py`; after
+that the `maintain_partitions` Celery beat task keeps a few months of future
+partitions ready and detaches/exports partitions that fall out of retention.
+"""
+import csv
+import glob
+import gzip
+import os
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from . import config
+from .models import AuditLog, Transaction
+
+# table name -> (partition key column, model used to type archived rows)
+PARTITIONED_TABLES = {
+    "transactions": ("timestamp", Transaction),
+    "auditlogs": ("timestamp", AuditLog),
+}
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table: str, start: date) -> str:
+    return f"{table}_y{start.year:04d}m{start.month:02d}"
+
+
+def _check_table(table: str):
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"Table {table} is not partitioned")
+
+
+def create_month_partition(conn, table: str, start: date):
+    """Create the partition covering the month starting at `start` if missing."""
+    _check_table(table)
+    start = month_start(start)
+    end = add_months(start, 1)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, start)} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+def ensure_partitions(conn, table: str, first_month: date, months_ahead: int = None):
+    """Create monthly partitions from `first_month` up to `months_ahead` months past today."""
+    months_ahead = config.PARTITION_PREMAKE_MONTHS if months_ahead is None else months_ahead
+    current = month_start(first_month)
+    last = add_months(month_start(date.today()), months_ahead)
+    while current <= last:
+        create_month_partition(conn, table, current)
+        current = add_months(current, 1)
+
+
+def list_partitions(conn, table: str) -> list[tuple[str, date]]:
+    """Return (partition_name, month_start) for every monthly partition of `table`, oldest first."""
+    _check_table(table)
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": table}).scalars().all()
+
+    partitions = []
+    prefix = f"{table}_y"
+    for name in rows:
+        # Skip the DEFAULT partition and anything not created by us
+        if not name.startswith(prefix):
+            continue
+        try:
+            year, month = name[len(prefix):].split("m")
+            partitions.append((name, date(int(year), int(month), 1)))
+        except ValueError:
+            continue
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def archive_path(table: str, start: date) -> str:
+    return os.path.join(config.ARCHIVE_DIR, table, f"{partition_name(table, start)}.csv.gz")
+
+
+def archive_partition(engine, table: str, name: str, start: date) -> str:
+    """
+    Detach a monthly partition, export it to a gzip CSV file and drop it.
+
+    Everything runs in one transaction on a raw psycopg2 connection, so if the
+    export fails the partition stays attached and no data is lost.
+
+    Returns:
+        Path of the written archive file
+    """
+    _check_table(table)
+    path = archive_path(table, start)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        with gzip.open(tmp_path, "wt", newline="") as fh:
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH CSV HEADER", fh)
+        os.replace(tmp_path, path)
+        cursor.execute(f"DROP TABLE {name}")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        raw.close()
+
+    return path
+
+
+def archive_expired_partitions(engine, table: str, retention_months: int = None) -> list[str]:
+    """Archive every partition of `table` older than the retention window."""
+    retention_months = config.PARTITION_RETENTION_MONTHS if retention_months is None else retention_months
+    cutoff = add_months(month_start(date.today()), -retention_months)
+
+    with engine.connect() as conn:
+        expired = [(name, start) for name, start in list_partitions(conn, table) if start < cutoff]
+
+    return [archive_partition(engine, table, name, start) for name, start in expired]
+
+
+def _parse_value(column, raw_value):
+    if raw_value == "":
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(raw_value)
+    if python_type is bool:
+        return raw_value in ("t", "true", "True", "1")
+    return python_type(raw_value)
+
+
+def read_archived_rows(table: str, start: datetime, end: datetime, filters: dict = None):
+    """
+    Yield archived rows of `table` whose partition key lies in [start, end).
+
+    Only archive files for the months overlapping the range are opened, so a
+    lookup costs one sequential read per archived month.
+
+    Args:
+        table: One of PARTITIONED_TABLES
+        start, end: Range on the partition key
+        filters: Optional {column: value} equality filters; a tuple of columns
+            as key matches if any of them equals the value (e.g. src or dest account)
+    """
+    _check_table(table)
+    key, model = PARTITIONED_TABLES[table]
+    columns = model.__table__.columns
+    filters = filters or {}
+
+    current = month_start(start.date())
+    last = month_start(end.date())
+    while current <= last:
+        path = archive_path(table, current)
+        if os.path.exists(path):
+            with gzip.open(path, "rt", newline="") as fh:
+                for raw_row in csv.DictReader(fh):
+                    row = {
+                        name: _parse_value(columns[name], value) if name in columns else value
+                        for name, value in raw_row.items()
+                    }
+                    if row[key] is None or not (start <= row[key] < end):
+                        continue
+                    if all(_matches(row, column, value) for column, value in filters.items()):
+                        yield row
+        current = add_months(current, 1)
+
+
+def _matches(row: dict, column, value) -> bool:
+    # ("src_account", "dest_account") -> either column may match
+    if isinstance(column, tuple):
+        return any(row.get(c) == value for c in column)
+    return row.get(column) == value
+
+
+def archived_months(table: str) -> list[str]:
+    """List archive files available for `table`."""
+    _check_table(table)
+    return sorted(os.path.basename(p) for p in glob.glob(os.path.join(config.ARCHIVE_DIR, table, "*.csv.gz")))
@@ -0,0 +1,281 @@
+"""
+Web Push delivery to the subscriptions stored in push_subscriptions.
+
+`deliver()` sends one payload to many subscriptions concurrently:
+- at most PUSH_DELIVERY_CONCURRENCY requests are in flight (an asyncio
+  semaphore in front of a thread pool of the same size, since the HTTP
+  clients used here are blocking);
+- timeouts, connection errors, 429 and 5xx responses are retried up to
+  PUSH_DELIVERY_MAX_RETRIES times with exponential backoff and jitter,
+  honouring Retry-After; a subscription waiting to retry does not hold a slot;
+- 404 / 410 mean the browser dropped the subscription, so it is pruned;
+- 401 / 403 mean the push service rejected our VAPID credentials. That is a
+  sender-side problem, so it is reported as 'unauthorized' and never counted
+  against the subscription.
+
+`apply_results()` writes the outcome back in a few set-based statements:
+dead subscriptions are deleted, delivered ones reset their failure count,
+and subscriptions that keep failing are deleted after
+PUSH_SUBSCRIPTION_MAX_FAILURES consecutive failures.
+
+Payloads are encrypted and signed with VAPID through pywebpush. Without
+PUSH_VAPID_PRIVATE_KEY or the package, delivery is skipped with a single
+warning: real push services reject unsigned requests, and a plain JSON body
+would hand the notification text to a third party. JsonTransport is only for
+the local stand-in endpoint in bench_push_delivery.py, which passes it
+explicitly.
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy.orm import Session
+
+from . import config
+from .models import PushSubscription
+
+DEAD_STATUSES = {404, 410}
+AUTH_STATUSES = {401, 403}
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+MAX_RETRY_AFTER_SECONDS = 60
+
+
+class JsonTransport:
+    """POSTs the payload as plain JSON; only for local stand-in endpoints (benchmarks)."""
+
+    def __init__(self, timeout: float = None, pool_size: int = None, ttl: int = None):
+        self.timeout = timeout or config.PUSH_DELIVERY_TIMEOUT_SECONDS
+        self.ttl = ttl or config.PUSH_DELIVERY_TTL_SECONDS
+        pool_size = pool_size or config.PUSH_DELIVERY_CONCURRENCY
+        # Keep-alive connections shared by the worker threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def send(self, subscription: dict, body: str):
+        response = self.session.post(
+            subscription["endpoint"],
+            data=body,
+            headers={"Content-Type": "application/json", "TTL": str(self.ttl)},
+            timeout=self.timeout,
+        )
+        return response.status_code, response.headers
+
+
+class WebPushTransport:
+    """Encrypted Web Push with VAPID, via the optional pywebpush package."""
+
+    def __init__(self, private_key: str, subject: str, timeout: float = None, ttl: int = None):
+        from pywebpush import WebPushException, webpush  # optional dependency
+
+        self._webpush = webpush
+        self._error = WebPushException
+        self.private_key = private_key
+        self.claims = {"sub": subject}
+        self.timeout = timeout or config.PUSH_DELIVERY_TIMEOUT_SECONDS
+        self.ttl = ttl or config.PUSH_DELIVERY_TTL_SECONDS
+
+    def send(self, subscription: dict, body: str):
+        try:
+            response = self._webpush(
+                subscription_info={
+                    "endpoint": subscription["endpoint"],
+                    "keys": {"p256dh": subscription["p256dh"], "auth": subscription["auth"]},
+                },
+                data=body,
+                vapid_private_key=self.private_key,
+                vapid_claims=dict(self.claims),
+                ttl=self.ttl,
+                timeout=self.timeout,
+            )
+        except self._error as e:
+            if e.response is not None:
+                return e.response.status_code, e.response.headers
+            raise
+        return response.status_code, response.headers
+
+
+_disabled_warning_shown = False
+
+
+def default_transport():
+    """WebPushTransport, or None (warning once per process) when VAPID or pywebpush is missing."""
+    global _disabled_warning_shown
+    if config.PUSH_VAPID_PRIVATE_KEY:
+        try:
+            return WebPushTransport(config.PUSH_VAPID_PRIVATE_KEY, config.PUSH_VAPID_SUBJECT)
+        except ImportError:
+            reason = "PUSH_VAPID_PRIVATE_KEY is set but pywebpush is not installed"
+    else:
+        reason = "PUSH_VAPID_PRIVATE_KEY is not set"
+    if not _disabled_warning_shown:
+        _disabled_warning_shown = True
+        print(f"Web Push disabled: {reason}; push notifications are not sent")
+    return None
+
+
+class DeliveryResult:
+    """Outcome of delivering to one subscription: 'delivered', 'dead', 'unauthorized' or 'failed'."""
+    __slots__ = ("subscription_id", "outcome", "status", "attempts", "latency", "error")
+
+    def __init__(self, subscription_id, outcome, status, attempts, latency, error=None):
+        self.subscription_id = subscription_id
+        self.outcome = outcome
+        self.status = status
+        self.attempts = attempts
+        self.latency = latency
+        self.error = error
+
+
+def build_payload(user_id: int, title: str, body: str, category: str = "general", data: dict = None) -> dict:
+    """The JSON shown by the service worker (same shape the frontend expects)."""
+    return {
+        "title": title,
+        "body": body,
+        "icon": "/favicon.ico",
+        "badge": "/favicon.ico",
+        "tag": f"nyord-{category}-{user_id}",
+        "data": {
+            "category": category,
+            "user_id": user_id,
+            **(data or {})
+        },
+        "requireInteraction": category in ["loan", "kyc"],
+        "actions": []
+    }
+
+
+def _retry_delay(attempt: int, backoff: float, headers) -> float:
+    retry_after = (headers or {}).get("Retry-After")
+    if retry_after and str(retry_after).isdigit():
+        return min(float(retry_after), MAX_RETRY_AFTER_SECONDS)
+    # Exponential backoff with jitter so retries against one push service spread out
+    return backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+
+async def deliver(
+    subscriptions: list[dict],
+    payload: dict,
+    transport=None,
+    concurrency: int = None,
+    max_retries: int = None,
+    backoff: float = None,
+) -> list[DeliveryResult]:
+    """
+    Send `payload` to every subscription ({id, endpoint, p256dh, auth} dicts).
+
+    Never raises for a single subscription; failures are reported in the results.
+    Returns no results when Web Push is not configured (see default_transport).
+    """
+    transport = transport or default_transport()
+    if transport is None:
+        return []
+    concurrency = concurrency or config.PUSH_DELIVERY_CONCURRENCY
+    max_retries = config.PUSH_DELIVERY_MAX_RETRIES if max_retries is None else max_retries
+    backoff = config.PUSH_DELIVERY_BACKOFF_SECONDS if backoff is None else backoff
+
+    body = json.dumps(payload)
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="push") as executor:
+
+        async def deliver_one(subscription: dict) -> DeliveryResult:
+            started = time.perf_counter()
+            attempt = 0
+            while True:
+                attempt += 1
+                error = None
+                async with slots:
+                    try:
+                        status, headers = await loop.run_in_executor(executor, transport.send, subscription, body)
+                    except Exception as e:  # timeouts, refused connections, TLS errors
+                        status, headers, error = None, None, str(e)
+
+                if status is not None and 200 <= status < 300:
+                    outcome = "delivered"
+                elif status in DEAD_STATUSES:
+                    outcome = "dead"
+                elif status in AUTH_STATUSES:
+                    # Our VAPID credentials were rejected; not the subscription's fault
+                    outcome = "unauthorized"
+                    error = f"HTTP {status}"
+                elif (status is None or status in RETRY_STATUSES) and attempt <= max_retries:
+                    await asyncio.sleep(_retry_delay(attempt, backoff, headers))
+                    continue
+                else:
+                    outcome = "failed"
+                    error = error or f"HTTP {status}"
+                return DeliveryResult(
+                    subscription["id"], outcome, status, attempt, time.perf_counter() - started, error
+                )
+
+        return await asyncio.gather(*(deliver_one(s) for s in subscriptions))
+
+
+def apply_results(db: Session, results: list[DeliveryResult]) -> dict:
+    """Record delivery outcomes on push_subscriptions (caller commits)."""
+    delivered = [r.subscription_id for r in results if r.outcome == "delivered"]
+    dead = [r.subscription_id for r in results if r.outcome == "dead"]
+    failed = [r.subscription_id for r in results if r.outcome == "failed"]
+
+    if delivered:
+        db.query(PushSubscription).filter(PushSubscription.id.in_(delivered)).update(
+            {"last_success_at": datetime.utcnow(), "failure_count": 0}, synchronize_session=False
+        )
+    if failed:
+        db.query(PushSubscription).filter(PushSubscription.id.in_(failed)).update(
+            {"failure_count": PushSubscription.failure_count + 1}, synchronize_session=False
+        )
+        dead += [
+            row[0] for row in db.query(PushSubscription.id).filter(
+                PushSubscription.id.in_(failed),
+                PushSubscription.failure_count >= config.PUSH_SUBSCRIPTION_MAX_FAILURES
+            )
+        ]
+    pruned = 0
+    if dead:
+        pruned = db.query(PushSubscription).filter(PushSubscription.id.in_(dead)).delete(synchronize_session=False)
+    return {"pruned": pruned}
+
+
+def summarize(results: list[DeliveryResult]) -> dict:
+    latencies = sorted(r.latency * 1000 for r in results)
+    summary = {
+        "sent": len(results),
+        "delivered": sum(1 for r in results if r.outcome == "delivered"),
+        "dead": sum(1 for r in results if r.outcome == "dead"),
+        "unauthorized": sum(1 for r in results if r.outcome == "unauthorized"),
+        "failed": sum(1 for r in results if r.outcome == "failed"),
+        "retries": sum(r.attempts - 1 for r in results),
+    }
+    if latencies:
+        summary["p50_ms"] = round(statistics.median(latencies), 2)
+        summary["p95_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2)
+    return summary
+
+
+async def send_to_users(db: Session, user_ids: list[int], payload: dict, transport=None) -> dict:
+    """Deliver a payload to every subscription of the given users and record the outcome."""
+    transport = transport or default_transport()
+    if transport is None:
+        return {**summarize([]), "skipped": True}
+
+    rows = db.query(
+        PushSubscription.id, PushSubscription.endpoint, PushSubscription.p256dh, PushSubscription.auth
+    ).filter(PushSubscription.user_id.in_(user_ids)).all()
+    if not rows:
+        return summarize([])
+
+    results = await deliver([row._asdict() for row in rows], payload, transport)
+    summary = summarize(results)
+    summary.update(apply_results(db, results))
+    db.commit()
+    return summary
@@ -0,0 +1,333 @@
+"""
+Admin batch export of printable QR codes (/qr/admin/batches).
+
+Branches print QR standees for merchants, so an admin can export the QR
+codes of every approved account (or every customer, or a given list of ids)
+in one job:
+- "zip": one PNG per QR code plus manifest.csv (id, name, details, file,
+  payment URL);
+- "pdf": A4 sheets with COLUMNS x ROWS QR codes per page, each with its
+  label and a dashed cut line.
+
+The `render_qr_batch` Celery task runs the job (`run_job`). QR codes are
+rendered in chunks of QR_BATCH_CHUNK_SIZE across QR_BATCH_WORKERS spawned
+processes, through the shared QR image cache (app/qr_cache.py), so images
+rendered before are reused and the batch warms the cache for the API. Results
+come back in order and are appended to the output file as they arrive; the
+PDF writer below writes each page as soon as it is full, so memory does not
+grow with the batch. Progress (rendered count and codes per second) is
+written to the QRBatchJob row every QR_BATCH_PROGRESS_INTERVAL_SECONDS.
+
+Celery's prefork workers are daemonic processes and cannot start a process
+pool, so the task is routed to its own "qr_batch" queue, consumed by a worker
+started with --pool=solo (see cmds.md). In a daemonic process the job still
+runs, rendering in that one process.
+"""
+import csv
+import io
+import json
+import multiprocessing
+import os
+import re
+import struct
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import config, qr_utils
+from .models import QRBatchJob
+
+KINDS = ("accounts", "users")
+FORMATS = {"zip": "application/zip", "pdf": "application/pdf"}
+
+QRItem = namedtuple("QRItem", "id content filename title subtitle")
+
+ACCOUNTS_SQL = text("""
+    SELECT a.id, a.account_number, a.account_type, u.full_name, u.username
+    FROM accounts a
+    JOIN users u ON u.id = a.user_id
+    WHERE a.status = 'approved'
+      AND (CAST(:ids AS integer[]) IS NULL OR a.id = ANY(CAST(:ids AS integer[])))
+    ORDER BY a.id
+""")
+
+USERS_SQL = text("""
+    SELECT id, full_name, username
+    FROM users
+    WHERE (CAST(:ids AS integer[]) IS NULL AND role = 'customer') OR id = ANY(CAST(:ids AS integer[]))
+    ORDER BY id
+""")
+
+
+def _safe_filename(value) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(value or "")).strip("_")
+
+
+def load_items(db: Session, kind: str, ids: list[int] = None) -> list[QRItem]:
+    """The QR codes of a batch, in id order, built exactly as the QR endpoints build them."""
+    if kind == "accounts":
+        rows = db.execute(ACCOUNTS_SQL, {"ids": ids}).all()
+        # The row carries both the account and the owner fields
+        return [
+            QRItem(
+                row.id,
+                qr_utils.account_qr_content_for(row, row),
+                f"account-{row.id}-{_safe_filename(row.account_number)}.png",
+                row.full_name or row.username,
+                f"{row.account_type} · {row.account_number}",
+            )
+            for row in rows
+        ]
+    if kind == "users":
+        rows = db.execute(USERS_SQL, {"ids": ids}).all()
+        return [
+            QRItem(
+                row.id,
+                qr_utils.user_qr_content_for(row),
+                f"user-{row.id}-{_safe_filename(row.username)}.png",
+                row.full_name or row.username,
+                f"@{row.username}",
+            )
+            for row in rows
+        ]
+    raise ValueError(f"Unknown QR batch kind: {kind}")
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _warm_up():
+    """Pool initializer: load the logo once per render process."""
+    qr_utils.load_logo()
+
+
+def render_chunk(contents: list[str]) -> list[bytes]:
+    return [qr_utils.qr_image(content, "png")[1] for content in contents]
+
+
+def render_all(items: list[QRItem], workers: int = None):
+    """Yield the PNG of every item, in order, rendered across `workers` processes."""
+    workers = workers or config.QR_BATCH_WORKERS
+    size = max(1, config.QR_BATCH_CHUNK_SIZE)
+    chunks = [[item.content for item in items[i:i + size]] for i in range(0, len(items), size)]
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        if workers > 1:
+            print("QR batch: daemonic worker process, rendering without a process pool (use --pool=solo)")
+        for chunk in chunks:
+            yield from render_chunk(chunk)
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_warm_up,
+    ) as pool:
+        for pngs in pool.map(render_chunk, chunks):
+            yield from pngs
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+class ZipWriter:
+    """One PNG per QR code (stored, PNG is already compressed) and a manifest.csv at the end."""
+
+    def __init__(self, f):
+        self.archive = zipfile.ZipFile(f, "w", zipfile.ZIP_STORED)
+        self.manifest = io.StringIO()
+        self.rows = csv.writer(self.manifest)
+        self.rows.writerow(["id", "name", "details", "file", "payment_url"])
+
+    def add(self, item: QRItem, png: bytes):
+        self.archive.writestr(item.filename, png)
+        self.rows.writerow([item.id, item.title, item.subtitle, item.filename, item.content])
+
+    def close(self):
+        self.archive.writestr("manifest.csv", self.manifest.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+        self.archive.close()
+
+
+def png_image_stream(png: bytes) -> tuple[int, int, int, bytes]:
+    """
+    (width, height, colors, zlib data) of an 8-bit, non-interlaced grey or
+    RGB PNG. The IDAT data is a valid PDF /FlateDecode stream with PNG
+    predictors, so images are embedded without decoding them.
+    """
+    if png[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("Not a PNG image")
+    pos, idat, header = 8, [], None
+    while pos < len(png):
+        length, chunk_type = struct.unpack(">I4s", png[pos:pos + 8])
+        data = png[pos + 8:pos + 8 + length]
+        pos += length + 12
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", data)
+        elif chunk_type == b"IDAT":
+            idat.append(data)
+        elif chunk_type == b"IEND":
+            break
+    if header is None:
+        raise ValueError("PNG without IHDR")
+    width, height, depth, color_type, _, _, interlace = header
+    if depth != 8 or interlace or color_type not in (0, 2):
+        raise ValueError(f"Unsupported PNG for PDF embedding (depth {depth}, color type {color_type})")
+    return width, height, 1 if color_type == 0 else 3, b"".join(idat)
+
+
+def _pdf_string(value: str, limit: int = 40) -> bytes:
+    value = value if len(value) <= limit else value[:limit - 1] + "…"
+    data = value.encode("cp1252", "replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class PdfSheetWriter:
+    """
+    Printable A4 sheets of QR codes, written as a minimal PDF one page at a
+    time: each QR code becomes an image object as it arrives, and the page is
+    written once COLUMNS x ROWS of them are in. Only object offsets are kept
+    until the cross-reference table at the end.
+    """
+
+    PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89  # A4 in points
+    MARGIN = 36
+    COLUMNS, ROWS = 3, 4
+    LABEL_HEIGHT = 30
+    PADDING = 12
+
+    # Fixed object ids; images, contents and pages are numbered from 4
+    CATALOG, PAGES, FONT = 1, 2, 3
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.page_ids = []
+        self.pending = []  # (image id, item) on the current page
+        self.next_id = 4
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _new_id(self) -> int:
+        self.next_id += 1
+        return self.next_id - 1
+
+    def _write(self, obj_id: int, body: bytes, stream: bytes = None):
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % obj_id)
+        if stream is None:
+            self.f.write(body + b"\nendobj\n")
+        else:
+            self.f.write(body[:-2] + b" /Length %d >>\nstream\n" % len(stream))
+            self.f.write(stream + b"\nendstream\nendobj\n")
+
+    def add(self, item: QRItem, png: bytes):
+        width, height, colors, data = png_image_stream(png)
+        image_id = self._new_id()
+        self._write(image_id, (
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /%s /BitsPerComponent 8 "
+            b"/Filter /FlateDecode /DecodeParms << /Predictor 15 /Colors %d /BitsPerComponent 8 /Columns %d >> >>"
+        ) % (width, height, b"DeviceRGB" if colors == 3 else b"DeviceGray", colors, width), data)
+        self.pending.append((image_id, item))
+        if len(self.pending) == self.COLUMNS * self.ROWS:
+            self._write_page()
+
+    def _write_page(self):
+        cell_width = (self.PAGE_WIDTH - 2 * self.MARGIN) / self.COLUMNS
+        cell_height = (self.PAGE_HEIGHT - 2 * self.MARGIN) / self.ROWS
+        size = min(cell_width, cell_height - self.LABEL_HEIGHT) - 2 * self.PADDING
+        ops, images = [], []
+        for index, (image_id, item) in enumerate(self.pending):
+            column, row = index % self.COLUMNS, index // self.COLUMNS
+            x = self.MARGIN + column * cell_width
+            y = self.PAGE_HEIGHT - self.MARGIN - (row + 1) * cell_height
+            qr_x = x + (cell_width - size) / 2
+            qr_y = y + self.LABEL_HEIGHT + (cell_height - self.LABEL_HEIGHT - size) / 2
+            ops.append(b"q 0.7 G 0.5 w [3 3] 0 d %.2f %.2f %.2f %.2f re S Q" % (x, y, cell_width, cell_height))
+            ops.append(b"q %.2f 0 0 %.2f %.2f %.2f cm /Im%d Do Q" % (size, size, qr_x, qr_y, image_id))
+            ops.append(b"BT /F1 10 Tf %.2f %.2f Td %s Tj ET" % (qr_x, y + 18, _pdf_string(item.title)))
+            ops.append(b"BT /F1 8 Tf %.2f %.2f Td %s Tj ET" % (qr_x, y + 7, _pdf_string(item.subtitle, 48)))
+            images.append(b"/Im%d %d 0 R" % (image_id, image_id))
+
+        contents_id, page_id = self._new_id(), self._new_id()
+        self._write(contents_id, b"<< >>", b"\n".join(ops))
+        self._write(page_id, (
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << /Font << /F1 %d 0 R >> /XObject << %s >> >> /Contents %d 0 R >>"
+        ) % (self.PAGES, self.PAGE_WIDTH, self.PAGE_HEIGHT, self.FONT, b" ".join(images), contents_id))
+        self.page_ids.append(page_id)
+        self.pending = []
+
+    def close(self):
+        if self.pending or not self.page_ids:
+            self._write_page()
+        self._write(self.FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._write(self.PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+        self._write(self.CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES)
+
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % self.next_id)
+        for obj_id in range(1, self.next_id):
+            self.f.write(b"%010d 00000 n \n" % self.offsets[obj_id])
+        self.f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self.next_id, self.CATALOG, xref))
+
+
+WRITERS = {"zip": ZipWriter, "pdf": PdfSheetWriter}
+
+
+def output_path(job: QRBatchJob) -> str:
+    return os.path.join(config.QR_BATCH_DIR, f"qr-batch-{job.id}.{job.output_format}")
+
+
+def run_job(db: Session, job: QRBatchJob) -> dict:
+    """
+    Render the job's QR codes into its output file, committing progress on
+    the job as it goes. The file is written under a temporary name and only
+    renamed into place once complete.
+    """
+    if job.output_format not in WRITERS:
+        raise ValueError(f"Unknown QR batch format: {job.output_format}")
+    items = load_items(db, job.kind, json.loads(job.ids) if job.ids else None)
+    if len(items) > config.QR_BATCH_MAX_ITEMS:
+        raise ValueError(f"Batch of {len(items)} QR codes exceeds QR_BATCH_MAX_ITEMS ({config.QR_BATCH_MAX_ITEMS})")
+    job.total = len(items)
+    job.rendered = 0
+    db.commit()
+
+    os.makedirs(config.QR_BATCH_DIR, exist_ok=True)
+    path = output_path(job)
+    partial = f"{path}.part"
+    started = last_report = time.monotonic()
+    with open(partial, "wb") as f:
+        writer = WRITERS[job.output_format](f)
+        for done, (item, png) in enumerate(zip(items, render_all(items)), 1):
+            writer.add(item, png)
+            now = time.monotonic()
+            if now - last_report >= config.QR_BATCH_PROGRESS_INTERVAL_SECONDS:
+                job.rendered = done
+                job.codes_per_second = round(done / (now - started), 1)
+                db.commit()
+                last_report = now
+        writer.close()
+    os.replace(partial, path)
+
+    elapsed = time.monotonic() - started
+    job.rendered = len(items)
+    job.codes_per_second = round(len(items) / elapsed, 1) if elapsed > 0 else None
+    job.file_path = path
+    job.file_size = os.path.getsize(path)
+    job.status = "completed"
+    job.finished_at = datetime.utcnow()
+    db.commit()
+    return {"job_id": job.id, "codes": len(items), "seconds": round(elapsed, 2), "codes_per_second": job.codes_per_second}
+
+
+def eta_seconds(job: QRBatchJob):
+    """Seconds left for a running job at its current throughput, or None."""
+    if job.status != "running" or not job.codes_per_second or not job.total:
+        return None
+    return round(max(0, job.total - (job.rendered or 0)) / job.codes_per_second, 1)
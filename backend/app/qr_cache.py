@@ -0,0 +1,94 @@
+"""
+Two-tier cache of rendered QR images (app/qr_utils.py).
+
+QR images are content-addressed: the key is a SHA-256 of everything that
+goes into the picture (payload, QR options, logo, renderer version), so an
+entry never goes stale and needs no invalidation. A changed display name
+simply hashes to a new key.
+
+- Memory: an LRU of the most recent QR_CACHE_MAX_ENTRIES images per process.
+- Disk: QR_CACHE_DIR/<key[:2]>/<key>.<format>, shared by all API workers and kept
+  across restarts. Files are written to a temporary name and renamed into
+  place, so readers never see a partial image. The directory can be deleted
+  at any time; images are re-rendered on demand. Unset QR_CACHE_DIR to keep
+  the cache in memory only.
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from . import config
+
+
+class QRImageCache:
+    def __init__(self, directory: str = None, max_entries: int = 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name[:2], name)
+
+    def _remember(self, name: str, data: bytes):
+        with self._lock:
+            self._entries[name] = data
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, name: str):
+        """The cached bytes for `name` ("<key>.<format>"), from memory or disk, or None."""
+        with self._lock:
+            data = self._entries.get(name)
+            if data is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return data
+        if self.directory:
+            try:
+                with open(self._path(name), "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data:
+                self.disk_hits += 1
+                self._remember(name, data)
+                return data
+        self.misses += 1
+        return None
+
+    def put(self, name: str, data: bytes):
+        self._remember(name, data)
+        if not self.directory:
+            return
+        path = self._path(name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            # A read-only or full disk only costs re-rendering
+            print(f"QR cache write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {"entries": entries, "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+qr_image_cache = QRImageCache(config.QR_CACHE_DIR or None, config.QR_CACHE_MAX_ENTRIES)
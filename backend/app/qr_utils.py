@@ -5,11 +5,105 @@ from typing import Union
 import hashlib
 import json
 from PIL import Image, ImageDraw
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 import os
+import threading
+from .cache import etag_matches
+from .qr_cache import qr_image_cache
+
+LOGO_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "public", "logo.png")
+
+# Bump when the rendering below changes, so cached images and their ETags are not reused
+QR_RENDER_VERSION = 1
+
+# Every QR code uses HIGH error correction (30% damage tolerance) for the logo
+QR_OPTIONS = {
+    "version": 1,  # Controls size, 1 is smallest (grows to fit the data)
+    "error_correction": qrcode.constants.ERROR_CORRECT_H,
+    "box_size": 10,  # Size of each box in pixels
+    "border": 4,  # Border size in boxes
+}
+
+# The logo as loaded by load_logo (None until then, False if missing or unreadable),
+# and the padded tile pasted onto QR codes of each pixel width
+_logo = None
+_logo_tiles = {}
+_logo_lock = threading.Lock()
+LOGO_FINGERPRINT = None
+
+def load_logo(path: str = None) -> bool:
+    """
+    Read the logo into memory once (API startup, or the first QR rendered).
+    Tiles built from a previously loaded logo are dropped.
+    
+    Args:
+        path: Logo file, LOGO_PATH by default
+    
+    Returns:
+        True if a logo is available
+    """
+    global _logo, LOGO_FINGERPRINT
+    path = path or LOGO_PATH
+    logo, fingerprint = False, None
+    if os.path.exists(path):
+        try:
+            with Image.open(path) as image:
+                image.load()
+                logo = image.copy()
+            stat = os.stat(path)
+            fingerprint = [stat.st_size, stat.st_mtime_ns]
+        except Exception as e:
+            print(f"Error loading QR logo: {e}")
+    with _logo_lock:
+        _logo = logo
+        _logo_tiles.clear()
+        # Part of the QR cache keys: a replaced logo renders new images
+        LOGO_FINGERPRINT = fingerprint
+    return logo is not False
+
+def _build_logo_tile(logo: Image.Image, qr_width: int) -> Image.Image:
+    # Calculate logo size (15% of QR code size for better scanning)
+    logo_max_size = int(qr_width * 0.15)  # 15% of QR size (reduced from 20%)
+    
+    # Resize logo maintaining aspect ratio
+    logo = logo.copy()
+    logo.thumbnail((logo_max_size, logo_max_size), Image.Resampling.LANCZOS)
+    
+    # Create a white background with padding (adds white border around logo)
+    logo_width, logo_height = logo.size
+    padding = int(logo_max_size * 0.20)  # 20% padding (increased from 15%)
+    
+    background_size = logo_width + (padding * 2)
+    background = Image.new('RGB', (background_size, background_size), 'white')
+    
+    # Paste logo onto white background
+    logo_pos = (padding, padding)
+    if logo.mode == 'RGBA':
+        background.paste(logo, logo_pos, logo)
+    else:
+        background.paste(logo, logo_pos)
+    return background
+
+def logo_tile(qr_width: int):
+    """The opaque padded logo for a QR code `qr_width` pixels wide, or None without a logo."""
+    if _logo is None:
+        load_logo()
+    tile = _logo_tiles.get(qr_width)
+    if tile is None:
+        with _logo_lock:
+            logo = _logo
+            tile = _logo_tiles.get(qr_width)
+            if tile is None and logo:
+                # QR widths come from a handful of versions, so this stays small
+                tile = _logo_tiles[qr_width] = _build_logo_tile(logo, qr_width)
+    return tile
 
 def add_logo_to_qr(qr_image: Image.Image) -> Image.Image:
     """
     Add logo to the center of QR code with proper sizing and padding.
+    The padded logo is built once per QR size (logo_tile) and pasted as is.
     
     Args:
         qr_image: The QR code PIL Image
@@ -17,46 +111,20 @@ def add_logo_to_qr(qr_image: Image.Image) -> Image.Image:
     Returns:
         QR code with logo embedded
     """
-    # Get logo path (adjust based on your project structure)
-    logo_path = os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "public", "logo.png")
-    
-    # Check if logo exists
-    if not os.path.exists(logo_path):
-        return qr_image  # Return original QR if logo not found
-    
     try:
-        # Open logo
-        logo = Image.open(logo_path)
-        
-        # Calculate logo size (15% of QR code size for better scanning)
         qr_width, qr_height = qr_image.size
-        logo_max_size = int(qr_width * 0.15)  # 15% of QR size (reduced from 20%)
-        
-        # Resize logo maintaining aspect ratio
-        logo.thumbnail((logo_max_size, logo_max_size), Image.Resampling.LANCZOS)
-        
-        # Create a white background with padding (adds white border around logo)
-        logo_width, logo_height = logo.size
-        padding = int(logo_max_size * 0.20)  # 20% padding (increased from 15%)
-        
-        background_size = logo_width + (padding * 2)
-        background = Image.new('RGB', (background_size, background_size), 'white')
-        
-        # Paste logo onto white background
-        logo_pos = (padding, padding)
-        if logo.mode == 'RGBA':
-            background.paste(logo, logo_pos, logo)
-        else:
-            background.paste(logo, logo_pos)
+        tile = logo_tile(qr_width)
+        if tile is None:
+            return qr_image  # Return original QR if logo not found
         
         # Calculate position to center the logo (avoiding the 3 corner squares)
         logo_position = (
-            (qr_width - background_size) // 2,
-            (qr_height - background_size) // 2
+            (qr_width - tile.width) // 2,
+            (qr_height - tile.height) // 2
         )
         
         # Paste logo with background onto QR code
-        qr_image.paste(background, logo_position)
+        qr_image.paste(tile, logo_position)
         
         return qr_image
         
@@ -64,9 +132,188 @@ def add_logo_to_qr(qr_image: Image.Image) -> Image.Image:
         print(f"Error adding logo to QR: {e}")
         return qr_image  # Return original QR if error occurs
 
-def generate_user_qr_code(user_id: int, user_data: dict = None, base_url: str = "http://localhost:3000") -> str:
+def _qr_matrix(qr_content: str) -> qrcode.QRCode:
+    qr = qrcode.QRCode(**QR_OPTIONS)
+    qr.add_data(qr_content)
+    qr.make(fit=True)
+    return qr
+
+def render_qr_png(qr_content: str) -> bytes:
     """
-    Generate a unique QR code for a user that contains a payment URL.
+    Render a QR code for `qr_content` with the logo in the center.
+    
+    Args:
+        qr_content: The text to encode (a payment URL)
+    
+    Returns:
+        PNG image bytes
+    """
+    qr = _qr_matrix(qr_content)
+    
+    # Create image with specific colors for consistency
+    qr_image = qr.make_image(
+        fill_color="black",
+        back_color="white"
+    ).convert('RGB')
+    
+    # Add logo to center of QR code
+    qr_image = add_logo_to_qr(qr_image)
+    
+    img_buffer = io.BytesIO()
+    qr_image.save(img_buffer, format='PNG')
+    return img_buffer.getvalue()
+
+def render_qr_svg(qr_content: str) -> bytes:
+    """
+    Render the same QR code as `render_qr_png` as SVG: one stroked path in
+    module units, a horizontal line per run of dark modules with relative
+    moves along each row, scaled to the PNG's pixel size, with the padded
+    logo tile embedded as a small PNG.
+    
+    Args:
+        qr_content: The text to encode (a payment URL)
+    
+    Returns:
+        SVG document bytes
+    """
+    matrix = _qr_matrix(qr_content).get_matrix()
+    modules = len(matrix)
+    box_size = QR_OPTIONS["box_size"]
+    pixels = modules * box_size
+    
+    path = []
+    for y, row in enumerate(matrix):
+        x, pen = 0, None
+        while x < modules:
+            if not row[x]:
+                x += 1
+                continue
+            run = 1
+            while x + run < modules and row[x + run]:
+                run += 1
+            # The stroke is one module wide, centered on the middle of the row
+            path.append(f"M{x} {y}.5h{run}" if pen is None else f"m{x - pen} 0h{run}")
+            x += run
+            pen = x
+    
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">',
+        f'<rect width="{modules}" height="{modules}" fill="#fff"/>',
+        f'<path d="{"".join(path)}" stroke="#000"/>',
+    ]
+    tile = logo_tile(pixels)
+    if tile is not None:
+        tile_buffer = io.BytesIO()
+        tile.save(tile_buffer, format='PNG')
+        # Same placement as the PNG, converted from pixels to modules
+        parts.append(
+            f'<image x="{(pixels - tile.width) // 2 / box_size:g}" y="{(pixels - tile.height) // 2 / box_size:g}" '
+            f'width="{tile.width / box_size:g}" height="{tile.height / box_size:g}" '
+            f'href="data:image/png;base64,{base64.b64encode(tile_buffer.getvalue()).decode()}"/>'
+        )
+    parts.append('</svg>')
+    return "".join(parts).encode()
+
+def qr_image_key(qr_content: str) -> str:
+    """Content hash of the QR image for `qr_content`: same key, same PNG."""
+    if _logo is None:
+        load_logo()
+    payload = json.dumps({
+        "version": QR_RENDER_VERSION,
+        "content": qr_content,
+        "options": QR_OPTIONS,
+        "logo": LOGO_FINGERPRINT,
+    }, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+QR_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+_RENDERERS = {"png": render_qr_png, "svg": render_qr_svg}
+
+def qr_image(qr_content: str, fmt: str = "png") -> tuple[str, bytes]:
+    """(key, image bytes) of the QR code for `qr_content` in `fmt`, rendered only on a cache miss."""
+    key = qr_image_key(qr_content)
+    name = f"{key}.{fmt}"
+    data = qr_image_cache.get(name)
+    if data is None:
+        data = _RENDERERS[fmt](qr_content)
+        qr_image_cache.put(name, data)
+    return key, data
+
+def qr_png(qr_content: str) -> tuple[str, bytes]:
+    return qr_image(qr_content, "png")
+
+def png_data_url(png: bytes) -> str:
+    return f"data:image/png;base64,{base64.b64encode(png).decode('utf-8')}"
+
+def qr_image_links(kind: str, object_id: int, qr_content: str) -> dict:
+    """
+    JSON fields pointing at the QR image endpoints (/qr/images/...) instead of
+    inlining the image. The URLs carry the image key, so they change exactly
+    when the image does and the browser can cache them for good.
+    
+    Args:
+        kind: "account" or "user"
+        object_id: The account or user ID
+        qr_content: The encoded payment URL
+    """
+    key = qr_image_key(qr_content)
+    path = f"/qr/images/{kind}/{object_id}"
+    return {
+        "qr_image_hash": key,
+        "qr_code_url": f"{path}.png?v={key}",
+        "qr_code_svg_url": f"{path}.svg?v={key}",
+    }
+
+def qr_json_response(body: dict, if_none_match: str = None) -> Response:
+    """JSON response with an ETag of its content; a matching If-None-Match gets an empty 304."""
+    content = jsonable_encoder(body)
+    fingerprint = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    etag = f'"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
+def qr_image_response(qr_content: str, fmt: str, version: str = None, if_none_match: str = None) -> Response:
+    """
+    The QR image itself as PNG or SVG, with the image key as its ETag.
+    
+    Requested with the current key as `version` (the URLs from
+    qr_image_links), the response never changes and is cacheable for a
+    year; otherwise the client revalidates, which is a 304 for an unchanged
+    image.
+    """
+    if fmt not in QR_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown QR image format: {fmt}")
+    key = qr_image_key(qr_content)
+    headers = {
+        "ETag": f'"{key}.{fmt}"',
+        "Cache-Control": "private, max-age=31536000, immutable" if version == key else "private, no-cache",
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    _, data = qr_image(qr_content, fmt)
+    return Response(content=data, media_type=QR_FORMATS[fmt], headers=headers)
+
+def user_qr_content_for(user) -> str:
+    """The payment URL of a User's QR code, as every QR endpoint builds it."""
+    return user_qr_content(user.id, {
+        "full_name": user.full_name,
+        "username": user.username
+    }, "http://localhost:3000")
+
+def account_qr_content_for(account, owner) -> str:
+    """The payment URL of an Account's QR code, as every QR endpoint builds it."""
+    return account_qr_content(account.id, {
+        "account_number": account.account_number,
+        "account_type": account.account_type,
+        "user_name": owner.full_name or owner.username
+    }, "http://localhost:3000")
+
+def user_qr_content(user_id: int, user_data: dict = None, base_url: str = "http://localhost:3000") -> str:
+    """
+    The payment URL encoded in a user's QR code.
     When scanned, it redirects to the payment page.
     
     Args:
@@ -75,7 +322,7 @@ def generate_user_qr_code(user_id: int, user_data: dict = None, base_url: str =
         base_url: Base URL of the frontend application
     
     Returns:
-        Base64 encoded PNG image of the QR code
+        Payment URL string
     """
     # Generate secure hash for the user
     user_hash = generate_user_qr_hash(user_id)
@@ -90,38 +337,23 @@ def generate_user_qr_code(user_id: int, user_data: dict = None, base_url: str =
         if user_data.get("full_name"):
             payment_url += f"&name={user_data['full_name'].replace(' ', '%20')}"
     
-    # QR content is now a simple URL
-    qr_content = payment_url
-    
-    # Create QR code with HIGH error correction for logo embedding
-    qr = qrcode.QRCode(
-        version=1,  # Controls size, 1 is smallest
-        error_correction=qrcode.constants.ERROR_CORRECT_H,  # HIGH error correction (30% damage tolerance)
-        box_size=10,  # Size of each box in pixels
-        border=4,  # Border size in boxes
-    )
-    
-    qr.add_data(qr_content)
-    qr.make(fit=True)
-    
-    # Create image with specific colors for consistency
-    qr_image = qr.make_image(
-        fill_color="black",
-        back_color="white"
-    ).convert('RGB')
-    
-    # Add logo to center of QR code
-    qr_image = add_logo_to_qr(qr_image)
-    
-    # Convert to base64 string
-    img_buffer = io.BytesIO()
-    qr_image.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
+    return payment_url
+
+def generate_user_qr_code(user_id: int, user_data: dict = None, base_url: str = "http://localhost:3000") -> str:
+    """
+    Generate a unique QR code for a user that contains a payment URL.
+    When scanned, it redirects to the payment page.
     
-    # Encode to base64
-    img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+    Args:
+        user_id: The user's unique ID
+        user_data: Optional dictionary with user info like name, email etc.
+        base_url: Base URL of the frontend application
     
-    return f"data:image/png;base64,{img_base64}"
+    Returns:
+        Base64 encoded PNG image of the QR code
+    """
+    _, png = qr_png(user_qr_content(user_id, user_data, base_url))
+    return png_data_url(png)
 
 def generate_user_qr_hash(user_id: int) -> str:
     """
@@ -157,10 +389,9 @@ def verify_qr_code(qr_data: str, expected_user_id: int) -> bool:
     except (json.JSONDecodeError, KeyError):
         return False
 
-def generate_account_qr_code(account_id: int, account_data: dict = None, base_url: str = "http://localhost:3000") -> str:
+def account_qr_content(account_id: int, account_data: dict = None, base_url: str = "http://localhost:3000") -> str:
     """
-    Generate a unique QR code for a bank account (similar to UPI).
-    Each account gets its own QR code for receiving payments.
+    The payment URL encoded in an account's QR code.
     
     Args:
         account_id: The account's unique ID
@@ -168,7 +399,7 @@ def generate_account_qr_code(account_id: int, account_data: dict = None, base_ur
         base_url: Base URL of the frontend application
     
     Returns:
-        Base64 encoded PNG image of the QR code
+        Payment URL string
     """
     # Generate secure hash for the account
     account_hash = generate_account_qr_hash(account_id)
@@ -185,38 +416,23 @@ def generate_account_qr_code(account_id: int, account_data: dict = None, base_ur
         if account_data.get("account_type"):
             payment_url += f"&type={account_data['account_type']}"
     
-    # QR content is the payment URL
-    qr_content = payment_url
-    
-    # Create QR code with HIGH error correction for logo embedding
-    qr = qrcode.QRCode(
-        version=1,  # Controls size
-        error_correction=qrcode.constants.ERROR_CORRECT_H,  # HIGH error correction (30% damage tolerance)
-        box_size=10,  # Size of each box in pixels
-        border=4,  # Border size in boxes
-    )
-    
-    qr.add_data(qr_content)
-    qr.make(fit=True)
-    
-    # Create image
-    qr_image = qr.make_image(
-        fill_color="black",
-        back_color="white"
-    ).convert('RGB')
-    
-    # Add logo to center of QR code
-    qr_image = add_logo_to_qr(qr_image)
-    
-    # Convert to base64 string
-    img_buffer = io.BytesIO()
-    qr_image.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
+    return payment_url
+
+def generate_account_qr_code(account_id: int, account_data: dict = None, base_url: str = "http://localhost:3000") -> str:
+    """
+    Generate a unique QR code for a bank account (similar to UPI).
+    Each account gets its own QR code for receiving payments.
     
-    # Encode to base64
-    img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+    Args:
+        account_id: The account's unique ID
+        account_data: Optional dictionary with account info
+        base_url: Base URL of the frontend application
     
-    return f"data:image/png;base64,{img_base64}"
+    Returns:
+        Base64 encoded PNG image of the QR code
+    """
+    _, png = qr_png(account_qr_content(account_id, account_data, base_url))
+    return png_data_url(png)
 
 def generate_account_qr_hash(account_id: int) -> str:
     """
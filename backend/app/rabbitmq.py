@@ -1,5 +1,11 @@
-import pika
 import json
+import queue
+import threading
+
+import pika
+
+from . import config
+
 
 def publish_event(queue_name: str, payload: dict):
     connection = pika.BlockingConnection(
@@ -20,4 +26,113 @@ def publish_event(queue_name: str, payload: dict):
         ),
     )
 
-    connection.close()
\ No newline at end of file
+    connection.close()
+
+
+def publish_ws_event(event: dict):
+    """Publish an event on the ws_events fanout exchange (WebSocket clients, cache invalidation)."""
+    connection = pika.BlockingConnection(
+        pika.ConnectionParameters("localhost")
+    )
+    channel = connection.channel()
+
+    channel.exchange_declare(exchange="ws_events", exchange_type="fanout", durable=True)
+
+    channel.basic_publish(
+        exchange="ws_events",
+        routing_key="",
+        body=json.dumps(event)
+    )
+
+    connection.close()
+
+
+class WSEventPublisher:
+    """
+    Publishes ws_events from one daemon thread over a long-lived connection,
+    so request handlers only enqueue and never wait on a RabbitMQ connect.
+
+    Events that cannot be published (broker unreachable after one reconnect,
+    or the queue full) are logged and dropped: they only invalidate caches in
+    the other workers, and those entries expire on their own.
+    """
+
+    def __init__(self, max_queue: int, timeout: float):
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._connection = None
+        self._channel = None
+
+    def publish(self, event: dict) -> bool:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            print(f"ws_events publish queue full, dropping {event.get('type')} event")
+            return False
+        self._ensure_thread()
+        return True
+
+    def _ensure_thread(self):
+        # Started lazily so Celery prefork children get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="ws-events-publisher", daemon=True)
+            self._thread.start()
+
+    def _connect(self):
+        self._connection = pika.BlockingConnection(pika.ConnectionParameters(
+            "localhost",
+            connection_attempts=1,
+            socket_timeout=self.timeout,
+            stack_timeout=self.timeout,
+            blocked_connection_timeout=self.timeout,
+        ))
+        self._channel = self._connection.channel()
+        self._channel.exchange_declare(exchange="ws_events", exchange_type="fanout", durable=True)
+
+    def _disconnect(self):
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = self._channel = None
+
+    def _send(self, event: dict):
+        if self._channel is None or not self._channel.is_open:
+            self._connect()
+        self._channel.basic_publish(exchange="ws_events", routing_key="", body=json.dumps(event))
+
+    def _run(self):
+        while True:
+            try:
+                event = self._queue.get(timeout=10)
+            except queue.Empty:
+                # Idle: answer broker heartbeats so the connection stays up
+                try:
+                    if self._connection is not None and self._connection.is_open:
+                        self._connection.process_data_events(time_limit=0)
+                except Exception:
+                    self._disconnect()
+                continue
+            try:
+                self._send(event)
+            except Exception:
+                # Stale connection: reconnect once, then give up on this event
+                self._disconnect()
+                try:
+                    self._send(event)
+                except Exception as e:
+                    self._disconnect()
+                    print(f"Failed to publish {event.get('type')} event: {e!r}")
+
+
+ws_event_publisher = WSEventPublisher(
+    max_queue=config.WS_EVENT_PUBLISH_MAX_QUEUE,
+    timeout=config.RABBITMQ_PUBLISH_TIMEOUT_SECONDS,
+)
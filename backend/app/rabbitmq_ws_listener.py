@@ -2,6 +2,17 @@ import pika
 import json
 import asyncio
 from .websocket_manager import manager
+from .cache import invalidate_for_event
+from .notification_counters import counter_cache
+from . import user_search
+from .dashboard import invalidate_dashboards
+
+
+async def _send_counts(counts: list):
+    for message in counts:
+        counter_cache.set(message["user_id"], message["total_count"], message["unread_count"])
+        await manager.send_personal_message(message, message["user_id"])
+
 
 def rabbitmq_ws_listener():
     connection = pika.BlockingConnection(
@@ -27,6 +38,34 @@ def rabbitmq_ws_listener():
 
     def callback(ch, method, properties, body):
         event = json.loads(body.decode())
+        # Drop cached admin statistics this event makes outdated
+        invalidate_for_event(event)
+        if event.get("cache_only"):
+            # Admin edits and approvals (publish_change_event): never broadcast, they
+            # carry other users' ids and statuses; the affected user gets their own
+            if event.get("user_id") is not None:
+                asyncio.run(manager.send_personal_message(event, event["user_id"]))
+            return
+        if event.get("type") == "notification.counts.batch":
+            # Counter changes committed by another process: cache them and route each to its user only
+            asyncio.run(_send_counts(event["counts"]))
+            return
+        if event.get("type") == "dashboard.invalidate":
+            invalidate_dashboards(event.get("user_ids", []))
+            return
+        if event.get("type") == "search_index.users":
+            # User changes committed by another process; not for WebSocket clients
+            user_search.apply_event(event)
+            return
+        if event.get("type") == "notification.counts.reset":
+            counter_cache.clear()
+            return
+        if event.get("type") == "notification.broadcast":
+            # Every recipient's counters changed; re-read them from the DB
+            counter_cache.clear()
+            # Broadcast notifications only go to the online users of their audience
+            asyncio.run(manager.broadcast_to_role(event, event.get("audience", "customer")))
+            return
         # Run the async broadcast function from our sync callback
         asyncio.run(manager.broadcast(event))
 
@@ -0,0 +1,364 @@
+"""
+Daily rollup tables for the admin analytics endpoints.
+
+stats_daily_transactions, stats_daily_accounts and stats_daily_approvals hold
+per-day counts keyed by the dimensions the admin charts filter on. They are
+maintained incrementally by an `after_flush` hook: whenever a flush inserts,
+updates or deletes a Transaction, Account, User, Loan, Card or FixedDeposit,
+the matching rollup rows are upserted in the same DB transaction. Covered
+writers include the settlement worker, the approval endpoints and
+registration.
+
+Each rollup row also carries a `shard` column. Writers pick a random shard,
+so concurrent settlements do not serialize on a single "today" row; readers
+sum across shards.
+
+The nightly `compact_rollups` task folds days older than
+ROLLUP_DAILY_RETENTION_DAYS into one row per month, then re-derives the
+buckets from the source tables and repairs any drift. Drift comes from
+bulk `query.update()` / `query.delete()` calls, which bypass the hook.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, cast, event, func, inspect, literal, select, union_all, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import BindParameter
+
+from . import config
+from .models import (
+    Account, Card, FixedDeposit, Loan, Transaction, User,
+    StatsDailyAccounts, StatsDailyApprovals, StatsDailyTransactions,
+)
+
+# Rows with no creation timestamp are bucketed on this day
+EPOCH = date(1970, 1, 1)
+
+
+def _day(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return EPOCH
+
+
+def loan_band(principal) -> str:
+    """Loan type approximation used by the admin charts (by principal)."""
+    principal = principal or 0
+    if principal <= 50000:
+        return "Personal"
+    if principal <= 200000:
+        return "Auto"
+    return "Home"
+
+
+def _sql_day(column):
+    return func.coalesce(cast(column, Date), literal(EPOCH))
+
+
+def _sql_loan_band(column):
+    principal = func.coalesce(column, 0)
+    return case(
+        (principal <= 50000, "Personal"),
+        (principal <= 200000, "Auto"),
+        else_="Home"
+    )
+
+
+class RollupSpec:
+    """
+    How one source model feeds one rollup table.
+
+    keys(values) / measures(values) take a {column: value} dict of the source
+    row and return the rollup key and the amounts to add for it; sql_keys /
+    sql_measures are the equivalent SQL expressions used by compaction.
+    """
+    def __init__(self, model, table, watched, keys, measures, sql_keys, sql_measures, sql_filter=None):
+        self.model = model
+        self.table = table
+        self.watched = watched
+        self.keys = keys
+        self.measures = measures
+        self.sql_keys = sql_keys
+        self.sql_measures = sql_measures
+        self.sql_filter = sql_filter
+
+
+def _approval_spec(model, entity, day_column, category, sql_category, status_column):
+    return RollupSpec(
+        model=model,
+        table=StatsDailyApprovals,
+        watched=[day_column, status_column] + ([category[0]] if category else []),
+        keys=lambda v: {
+            "day": _day(v[day_column]),
+            "entity": entity,
+            "category": (category[1](v[category[0]]) if category else "") or "",
+            "approval_status": v[status_column] or "",
+        },
+        measures=lambda v: {"item_count": 1},
+        sql_keys=lambda: {
+            "day": _sql_day(getattr(model, day_column)),
+            "entity": literal(entity),
+            "category": func.coalesce(sql_category(), "") if category else literal(""),
+            "approval_status": func.coalesce(getattr(model, status_column), ""),
+        },
+        sql_measures=lambda: {"item_count": func.count()},
+        sql_filter=lambda: StatsDailyApprovals.entity == entity,
+    )
+
+
+SPECS = [
+    RollupSpec(
+        model=Transaction,
+        table=StatsDailyTransactions,
+        watched=["timestamp", "status", "amount"],
+        keys=lambda v: {"day": _day(v["timestamp"]), "status": v["status"] or ""},
+        measures=lambda v: {"txn_count": 1, "amount_total": float(v["amount"] or 0.0)},
+        sql_keys=lambda: {"day": _sql_day(Transaction.timestamp), "status": func.coalesce(Transaction.status, "")},
+        sql_measures=lambda: {"txn_count": func.count(), "amount_total": func.coalesce(func.sum(Transaction.amount), 0.0)},
+    ),
+    RollupSpec(
+        model=Account,
+        table=StatsDailyAccounts,
+        watched=["created_at", "account_type", "status"],
+        keys=lambda v: {"day": _day(v["created_at"]), "account_type": v["account_type"] or "", "status": v["status"] or ""},
+        measures=lambda v: {"account_count": 1},
+        sql_keys=lambda: {
+            "day": _sql_day(Account.created_at),
+            "account_type": func.coalesce(Account.account_type, ""),
+            "status": func.coalesce(Account.status, ""),
+        },
+        sql_measures=lambda: {"account_count": func.count()},
+    ),
+    _approval_spec(User, "user", "created_at", ("role", lambda role: role), lambda: User.role, "status"),
+    _approval_spec(Loan, "loan", "created_at", ("principal", loan_band), lambda: _sql_loan_band(Loan.principal), "approval_status"),
+    _approval_spec(Card, "card", "created_at", ("card_type", lambda card_type: card_type), lambda: Card.card_type, "approval_status"),
+    # Fixed deposits have no created_at column; bucket them on their start date
+    _approval_spec(FixedDeposit, "fixed_deposit", "start_date", None, None, "approval_status"),
+]
+
+_SPECS_BY_MODEL = {spec.model: spec for spec in SPECS}
+
+
+def _key_columns(table) -> list[str]:
+    return [c.name for c in table.__table__.primary_key.columns if c.name != "shard"]
+
+
+def _measure_columns(table) -> list[str]:
+    return [c.name for c in table.__table__.columns if not c.primary_key]
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+def _values(state, columns, old: bool) -> dict:
+    values = {}
+    for column in columns:
+        history = state.attrs[column].history
+        if old and history.deleted:
+            values[column] = history.deleted[0]
+        else:
+            values[column] = state.attrs[column].value
+    return values
+
+
+def _add(deltas: dict, table, keys: dict, measures: dict, sign: int):
+    bucket = deltas.setdefault((table, tuple(sorted(keys.items()))), {})
+    for name, amount in measures.items():
+        bucket[name] = bucket.get(name, 0) + sign * amount
+
+
+def collect_deltas(session) -> dict:
+    """Rollup deltas for everything the current flush inserted, updated or deleted."""
+    deltas = {}
+    for obj in session.new:
+        spec = _SPECS_BY_MODEL.get(type(obj))
+        if spec:
+            values = _values(inspect(obj), spec.watched, old=False)
+            _add(deltas, spec.table, spec.keys(values), spec.measures(values), +1)
+
+    for obj in session.dirty:
+        spec = _SPECS_BY_MODEL.get(type(obj))
+        if not spec:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[c].history.has_changes() for c in spec.watched):
+            continue
+        old = _values(state, spec.watched, old=True)
+        new = _values(state, spec.watched, old=False)
+        _add(deltas, spec.table, spec.keys(old), spec.measures(old), -1)
+        _add(deltas, spec.table, spec.keys(new), spec.measures(new), +1)
+
+    for obj in session.deleted:
+        spec = _SPECS_BY_MODEL.get(type(obj))
+        if spec:
+            values = _values(inspect(obj), spec.watched, old=True)
+            _add(deltas, spec.table, spec.keys(values), spec.measures(values), -1)
+
+    return deltas
+
+
+def apply_deltas(connection, deltas: dict, shard: int = None):
+    """Upsert accumulated deltas, one multi-row INSERT ... ON CONFLICT per rollup table."""
+    shard = random.randrange(config.ROLLUP_SHARDS) if shard is None else shard
+    by_table = {}
+    for (table, keys), measures in sorted(deltas.items(), key=lambda item: (item[0][0].__tablename__, item[0][1])):
+        if not any(measures.values()):
+            continue
+        by_table.setdefault(table, []).append({**dict(keys), "shard": shard, **measures})
+
+    for table, rows in by_table.items():
+        measures = _measure_columns(table)
+        # Every row needs every measure column for a multi-row VALUES clause
+        rows = [{**{m: 0 for m in measures}, **row} for row in rows]
+        stmt = insert(table.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.name for c in table.__table__.primary_key.columns],
+            set_={m: table.__table__.c[m] + stmt.excluded[m] for m in measures},
+        )
+        connection.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_rollups(session, flush_context):
+    deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+# ---------------------------------------------------------------------------
+# Compaction / verification
+# ---------------------------------------------------------------------------
+
+def _bucket(day_expr, cutoff: date):
+    """Days before `cutoff` collapse to the first of their month."""
+    return case(
+        (day_expr < cutoff, cast(func.date_trunc("month", day_expr), Date)),
+        else_=day_expr
+    )
+
+
+def fold_old_days(db: Session, spec: RollupSpec, cutoff: date) -> int:
+    """Merge rollup rows older than `cutoff` into one row per month (shard 0)."""
+    table = spec.table
+    keys = _key_columns(table)
+    measures = _measure_columns(table)
+    month = cast(func.date_trunc("month", table.day), Date)
+
+    conditions = [table.day < cutoff]
+    if spec.sql_filter:
+        conditions.append(spec.sql_filter())
+
+    # Only months that still have more than one row per key need folding
+    rows = db.query(
+        month.label("month"),
+        *[getattr(table, k) for k in keys if k != "day"],
+        *[func.sum(getattr(table, m)) for m in measures],
+    ).filter(*conditions).group_by(month, *[getattr(table, k) for k in keys if k != "day"]).having(
+        func.count() > 1
+    ).all()
+
+    for row in rows:
+        key_values = dict(zip([k for k in keys if k != "day"], row[1:1 + len(keys) - 1]))
+        totals = dict(zip(measures, row[len(keys):]))
+        db.query(table).filter(
+            month == row[0],
+            table.day < cutoff,
+            *[getattr(table, k) == v for k, v in key_values.items()]
+        ).delete(synchronize_session=False)
+        db.add(table(day=row[0], shard=0, **key_values, **totals))
+    db.flush()
+    return len(rows)
+
+
+def verify_spec(db: Session, spec: RollupSpec, cutoff: date, since: date = None) -> int:
+    """
+    Recompute a rollup from its source table and repair mismatched buckets.
+
+    The source buckets and the rollup sums are compared in one statement, so
+    both sides come from the same snapshot; the flush hook changes source rows
+    and their rollup rows in the same transaction, so any difference is drift.
+    Repairs are additive upserts of that difference into shard 0 rather than
+    delete + reinsert, so deltas committed concurrently by the flush hook are
+    never overwritten.
+
+    Args:
+        cutoff: Days before this are compared per month (they have been folded)
+        since: Only verify buckets on or after this day (None = all history)
+
+    Returns:
+        Number of repaired buckets
+    """
+    table = spec.table
+    keys = _key_columns(table)
+    measures = _measure_columns(table)
+    other_keys = [k for k in keys if k != "day"]
+
+    sql_keys = spec.sql_keys()
+    sql_measures = spec.sql_measures()
+    source_bucket = _bucket(sql_keys["day"], cutoff)
+    source = select(
+        source_bucket.label("day"),
+        *[sql_keys[k].label(k) for k in other_keys],
+        *[sql_measures[m].label(m) for m in measures],
+    )
+    if since:
+        source = source.where(sql_keys["day"] >= since)
+    # Constant keys (literal entity names) are left out: PostgreSQL rejects constants in GROUP BY
+    source = source.group_by(source_bucket, *[sql_keys[k] for k in other_keys if not isinstance(sql_keys[k], BindParameter)])
+
+    # Rollup rows count negatively: the sum per bucket is expected - actual
+    rollup = select(
+        _bucket(table.day, cutoff).label("day"),
+        *[getattr(table, k).label(k) for k in other_keys],
+        *[(-getattr(table, m)).label(m) for m in measures],
+    )
+    if spec.sql_filter:
+        rollup = rollup.where(spec.sql_filter())
+    if since:
+        rollup = rollup.where(table.day >= since)
+
+    both = union_all(source, rollup).subquery()
+    drift = db.execute(
+        select(
+            *[both.c[k] for k in keys],
+            *[func.sum(both.c[m]) for m in measures],
+        ).group_by(*[both.c[k] for k in keys])
+    ).all()
+
+    width = len(keys)
+    deltas = {}
+    for row in drift:
+        corrections = {m: round(float(v or 0), 2) for m, v in zip(measures, row[width:])}
+        if any(corrections.values()):
+            _add(deltas, table, dict(zip(keys, row[:width])), corrections, +1)
+
+    if deltas:
+        apply_deltas(db.connection(), deltas, shard=0)
+    return len(deltas)
+
+
+def compact(db: Session, full: bool = False) -> dict:
+    """
+    Fold old days into months, then verify every rollup against its source.
+
+    Transactions are only verified for the last ROLLUP_VERIFY_DAYS days (older
+    rows no longer change) unless `full` is set; the smaller entity tables are
+    always verified in full.
+    """
+    cutoff = date.today() - timedelta(days=config.ROLLUP_DAILY_RETENTION_DAYS)
+    recent = date.today() - timedelta(days=config.ROLLUP_VERIFY_DAYS)
+    report = {}
+    for spec in SPECS:
+        folded = fold_old_days(db, spec, cutoff)
+        since = None if full or spec.model is not Transaction else recent
+        repaired = verify_spec(db, spec, cutoff, since=since)
+        # Keys whose increments and decrements cancelled out
+        db.query(spec.table).filter(
+            *[getattr(spec.table, m) == 0 for m in _measure_columns(spec.table)]
+        ).delete(synchronize_session=False)
+        report[spec.model.__tablename__] = {"folded_months": folded, "repaired_buckets": repaired}
+    return report
@@ -1,21 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models import User, Account
 from ..auth import get_current_user
-from ..qr_utils import generate_account_qr_code, generate_account_qr_hash
-from typing import List
+from ..qr_utils import account_qr_content_for, generate_account_qr_hash, qr_image_links, qr_json_response
+from typing import List, Optional
 
 router = APIRouter(prefix="/account-qr", tags=["Account QR Codes"])
 
 @router.get("/my-accounts")
 def get_all_account_qr_codes(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Generate QR codes for all approved accounts belonging to the current user.
     Similar to UPI, each bank account gets its own unique QR code.
+    Each entry links to its PNG/SVG under /qr/images; a matching
+    If-None-Match gets an empty 304.
     """
     # Get all approved accounts for the user
     accounts = db.query(Account).filter(
@@ -32,21 +35,6 @@ def get_all_account_qr_codes(
     # Generate QR code for each account
     account_qr_list = []
     for account in accounts:
-        # Prepare account data for QR code
-        account_data = {
-            "account_number": account.account_number,
-            "account_type": account.account_type,
-            "user_name": current_user.full_name or current_user.username,
-            "user_email": current_user.email,
-            "balance": account.balance
-        }
-        
-        # Generate QR code with payment URL
-        qr_code_base64 = generate_account_qr_code(
-            account.id, 
-            account_data, 
-            "http://localhost:3000"
-        )
         qr_hash = generate_account_qr_hash(account.id)
         
         account_qr_list.append({
@@ -54,30 +42,33 @@ def get_all_account_qr_codes(
             "account_number": account.account_number,
             "account_type": account.account_type,
             "balance": account.balance,
-            "qr_code": qr_code_base64,
+            **qr_image_links("account", account.id, account_qr_content_for(account, current_user)),
             "qr_hash": qr_hash,
             "created_at": account.created_at,
             "status": account.status
         })
     
-    return {
+    return qr_json_response({
         "user_id": current_user.id,
         "username": current_user.username,
         "full_name": current_user.full_name,
         "total_accounts": len(account_qr_list),
         "accounts": account_qr_list,
         "message": f"Generated QR codes for {len(account_qr_list)} account(s)"
-    }
+    }, if_none_match)
 
 @router.get("/account/{account_id}")
 def get_single_account_qr_code(
     account_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Generate QR code for a specific account.
     Users can only generate QR codes for their own accounts.
+    The image itself is linked (PNG/SVG under /qr/images); a matching
+    If-None-Match gets an empty 304.
     """
     # Get the account and verify ownership
     account = db.query(Account).filter(
@@ -92,29 +83,14 @@ def get_single_account_qr_code(
             detail="Account not found or not approved"
         )
     
-    # Prepare account data for QR code
-    account_data = {
-        "account_number": account.account_number,
-        "account_type": account.account_type,
-        "user_name": current_user.full_name or current_user.username,
-        "user_email": current_user.email,
-        "balance": account.balance
-    }
-    
-    # Generate QR code with payment URL
-    qr_code_base64 = generate_account_qr_code(
-        account.id, 
-        account_data, 
-        "http://localhost:3000"
-    )
     qr_hash = generate_account_qr_hash(account.id)
     
-    return {
+    return qr_json_response({
         "account_id": account.id,
         "account_number": account.account_number,
         "account_type": account.account_type,
         "balance": account.balance,
-        "qr_code": qr_code_base64,
+        **qr_image_links("account", account.id, account_qr_content_for(account, current_user)),
         "qr_hash": qr_hash,
         "user_id": current_user.id,
         "username": current_user.username,
@@ -122,7 +98,7 @@ def get_single_account_qr_code(
         "created_at": account.created_at,
         "status": account.status,
         "message": "QR code generated successfully"
-    }
+    }, if_none_match)
 
 @router.post("/decode-account-qr")
 def decode_account_qr_data(
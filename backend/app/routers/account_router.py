@@ -3,9 +3,11 @@ from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 from fastapi import Header
 from ..database import get_db
-from .. import models, schemas, auth
+from .. import models, schemas, auth, audit, balance_snapshots
+from ..cache import publish_change_event
 from ..utils import get_current_user
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import Optional
 import os
 import random
 
@@ -53,12 +55,15 @@ def create_account(
     db.refresh(new_acc)
     
     # Log the account creation request
-    audit_log = models.AuditLog(
-        event_type="ACCOUNT_REQUEST",
-        message=f"User {current_user.username} requested new {account.account_type} account"
+    audit.record(
+        "ACCOUNT_REQUEST",
+        f"User {current_user.username} requested new {account.account_type} account",
+        actor_id=current_user.id,
+        subject_user_id=current_user.id,
+        account_id=new_acc.id,
+        entity_type="account",
+        entity_id=new_acc.id
     )
-    db.add(audit_log)
-    db.commit()
 
     return new_acc
 
@@ -83,10 +88,8 @@ def approve_account(
         message = f"Account {account.account_number} approved successfully"
         
         # Log approval
-        audit_log = models.AuditLog(
-            event_type="ACCOUNT_APPROVED",
-            message=f"Admin {admin_user.username} approved account {account.account_number} for user {account.owner.username}"
-        )
+        audit_event = "ACCOUNT_APPROVED"
+        audit_message = f"Admin {admin_user.username} approved account {account.account_number} for user {account.owner.username}"
     elif approval_request.action.lower() == "reject":
         account.status = "rejected"
         account.approved_by = admin_user.id
@@ -94,16 +97,24 @@ def approve_account(
         message = f"Account {account.account_number} rejected"
         
         # Log rejection
-        audit_log = models.AuditLog(
-            event_type="ACCOUNT_REJECTED",
-            message=f"Admin {admin_user.username} rejected account {account.account_number} for user {account.owner.username}. Reason: {approval_request.reason or 'No reason provided'}"
-        )
+        audit_event = "ACCOUNT_REJECTED"
+        audit_message = f"Admin {admin_user.username} rejected account {account.account_number} for user {account.owner.username}. Reason: {approval_request.reason or 'No reason provided'}"
     else:
         raise HTTPException(status_code=400, detail="Action must be 'approve' or 'reject'")
     
-    db.add(audit_log)
+    audit.record(
+        audit_event,
+        audit_message,
+        db=db,
+        actor_id=admin_user.id,
+        subject_user_id=account.user_id,
+        account_id=account.id,
+        entity_type="account",
+        entity_id=account.id
+    )
     db.commit()
     db.refresh(account)
+    publish_change_event({"type": "account.status_changed", "account_id": account.id, "user_id": account.user_id, "status": account.status})
     
     return {
         "message": message,
@@ -196,12 +207,21 @@ def transfer_between_accounts(
 
     db.add(txn)
 
-    # Log the transfer
-    audit_log = models.AuditLog(
-        event_type="INTER_ACCOUNT_TRANSFER",
-        message=f"User {current_user.username} transferred ${amount} from {from_account.account_number} to {to_account.account_number}"
+    db.flush()
+
+    # Log the transfer inside the same DB transaction as the balance change
+    audit.record(
+        "INTER_ACCOUNT_TRANSFER",
+        f"User {current_user.username} transferred ${amount} from {from_account.account_number} to {to_account.account_number}",
+        db=db,
+        money_movement=True,
+        actor_id=current_user.id,
+        subject_user_id=current_user.id,
+        account_id=from_account.id,
+        entity_type="transaction",
+        entity_id=txn.id,
+        amount=amount
     )
-    db.add(audit_log)
 
     db.commit()
 
@@ -249,13 +269,65 @@ def get_account_balance(
         "balance": account.balance
     }
 
+@router.get("/{account_id}/balance-as-of")
+def get_account_balance_as_of(
+    account_id: int,
+    as_of: date,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """End-of-day balance of an account on a past date (live balance for today), from the daily snapshots"""
+    account = db.query(models.Account).filter(
+        models.Account.id == account_id,
+        models.Account.user_id == current_user.id
+    ).first()
+
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    balance = balance_snapshots.balance_as_of(db, account, as_of)
+    if balance is None:
+        raise HTTPException(status_code=404, detail="No balance snapshot on or before this date")
+
+    return {
+        "account_id": account.id,
+        "account_number": account.account_number,
+        "as_of": as_of.isoformat(),
+        "balance": balance
+    }
+
+@router.get("/{account_id}/balance-history")
+def get_account_balance_history(
+    account_id: int,
+    days: int = 30,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Daily end-of-day balances of an account for the last `days` days, ending with today's live balance"""
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+
+    account = db.query(models.Account).filter(
+        models.Account.id == account_id,
+        models.Account.user_id == current_user.id
+    ).first()
+
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    today = datetime.utcnow().date()
+    history = balance_snapshots.balance_history(db, [account.id], today - timedelta(days=days), today - timedelta(days=1))
+    history.append({"date": today.isoformat(), "balance": account.balance or 0.0})
+    return {"account_id": account.id, "history": history}
+
 @router.get("/qr-codes/all")
 def get_all_account_qr_codes(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """Get QR codes for all approved accounts (like UPI - one QR per account)"""
-    from ..qr_utils import generate_account_qr_code
+    """Get QR codes for all approved accounts (like UPI - one QR per account) as image links, with an ETag"""
+    from ..qr_utils import account_qr_content_for, qr_image_links, qr_json_response
     
     # Get all approved accounts for the user
     accounts = db.query(models.Account).filter(
@@ -266,32 +338,20 @@ def get_all_account_qr_codes(
     if not accounts:
         raise HTTPException(status_code=404, detail="No approved accounts found")
     
-    # Generate QR code for each account
+    # Link the QR code of each account (served by /qr/images)
     qr_codes = []
     for account in accounts:
-        account_data = {
-            "account_number": account.account_number,
-            "user_name": current_user.full_name or current_user.username,
-            "account_type": account.account_type
-        }
-        
-        qr_code = generate_account_qr_code(
-            account_id=account.id,
-            account_data=account_data,
-            base_url="http://localhost:3000"
-        )
-        
         qr_codes.append({
             "account_id": account.id,
             "account_number": account.account_number,
             "account_type": account.account_type,
             "balance": account.balance,
-            "qr_code": qr_code
+            **qr_image_links("account", account.id, account_qr_content_for(account, current_user))
         })
     
-    return {
+    return qr_json_response({
         "user_id": current_user.id,
         "username": current_user.username,
         "full_name": current_user.full_name,
         "accounts": qr_codes
-    }
\ No newline at end of file
+    }, if_none_match)
\ No newline at end of file
@@ -1,15 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from .. import models, schemas, auth
-from ..database import get_db
+from sqlalchemy import or_
+from typing import List, Optional
+from datetime import datetime
+from .. import models, schemas, auth, partitions, audit, admin_stats, bulk_approvals
+from ..cache import admin_cache, publish_change_event
+from ..database import get_db, SessionLocal
+from ..pagination import paginate
 from .notification_router import create_notification_service
 import random
 import asyncio
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+# Sort keys accepted by the list endpoints; each is indexed together with id
+USER_SORT_KEYS = {"created_at": models.User.created_at, "username": models.User.username, "id": models.User.id}
+TRANSACTION_SORT_KEYS = {"timestamp": models.Transaction.timestamp, "amount": models.Transaction.amount, "id": models.Transaction.id}
+ACCOUNT_SORT_KEYS = {"created_at": models.Account.created_at, "balance": models.Account.balance, "id": models.Account.id}
+PENDING_SORT_KEYS = {
+    "User": {"created_at": models.User.created_at, "id": models.User.id},
+    "Card": {"created_at": models.Card.created_at, "id": models.Card.id},
+    "Loan": {"created_at": models.Loan.created_at, "principal": models.Loan.principal, "id": models.Loan.id},
+    "FixedDeposit": {"start_date": models.FixedDeposit.start_date, "id": models.FixedDeposit.id},
+}
+
+
+def _with_session(compute):
+    """Run a stats query in its own session; cache refreshes outlive the request."""
+    def run():
+        db = SessionLocal()
+        try:
+            return compute(db)
+        finally:
+            db.close()
+    return run
+
 
 @router.post("/setup-admin")
 async def setup_admin_account(db: Session = Depends(get_db)):
@@ -35,61 +60,45 @@ async def setup_admin_account(db: Session = Depends(get_db)):
 
 @router.get("/stats", response_model=schemas.AdminStats)
 async def get_admin_stats(
-    admin_user: models.User = Depends(auth.get_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: models.User = Depends(auth.get_admin_user)
 ):
     """Get system statistics for admin dashboard"""
-    total_users = db.query(models.User).filter(models.User.role == "customer").count()
-    total_accounts = db.query(models.Account).count()
-    total_balance = db.query(func.sum(models.Account.balance)).scalar() or 0
-    total_transactions = db.query(models.Transaction).count()
-    total_loans = db.query(models.Loan).count()
-    total_fixed_deposits = db.query(models.FixedDeposit).count()
-    total_cards = db.query(models.Card).count()
-    
-    # Count pending approvals
-    pending_kyc = db.query(models.User).filter(
-        models.User.role == "customer",
-        models.User.status == "pending"
-    ).count()
-    
-    pending_cards = db.query(models.Card).filter(
-        models.Card.approval_status == "pending"
-    ).count()
-    
-    pending_loans = db.query(models.Loan).filter(
-        models.Loan.approval_status == "pending"
-    ).count()
-    
-    pending_fds = db.query(models.FixedDeposit).filter(
-        models.FixedDeposit.approval_status == "pending"
-    ).count()
-    
-    return schemas.AdminStats(
-        total_users=total_users,
-        total_accounts=total_accounts,
-        total_balance=float(total_balance),
-        total_transactions=total_transactions,
-        total_loans=total_loans,
-        total_fixed_deposits=total_fixed_deposits,
-        total_cards=total_cards,
-        pending_kyc=pending_kyc,
-        pending_cards=pending_cards,
-        pending_loans=pending_loans,
-        pending_fds=pending_fds
+    stats = await admin_cache.get_or_compute(
+        "admin:stats", _with_session(admin_stats.compute_admin_stats), tags=("admin:stats",)
     )
+    return schemas.AdminStats(**stats)
 
 
 @router.get("/users", response_model=List[schemas.UserOut])
 async def get_all_users(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    skip: int = 0,
+    status: Optional[str] = None,
+    role: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    exact_total: bool = False,
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all users (admin only)"""
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    """Get users, filtered and cursor paginated (admin only). See app/pagination.py for the headers."""
+    query = db.query(models.User)
+    if status:
+        query = query.filter(models.User.status == status)
+    if role:
+        query = query.filter(models.User.role == role)
+    if created_from:
+        query = query.filter(models.User.created_at >= created_from)
+    if created_to:
+        query = query.filter(models.User.created_at < created_to)
+    return paginate(
+        query, models.User, response, USER_SORT_KEYS, sort, order,
+        cursor=cursor, limit=limit, skip=skip, exact_total=exact_total
+    )
 
 
 @router.get("/users/{user_id}", response_model=schemas.UserOut)
@@ -124,6 +133,7 @@ async def update_user_by_admin(
     
     db.commit()
     db.refresh(user)
+    publish_change_event({"type": "user.updated", "user_id": user.id})
     return {"message": "User updated successfully", "user": user}
 
 
@@ -193,6 +203,8 @@ async def delete_user(
     db.query(models.FixedDeposit).filter(models.FixedDeposit.user_id == user_id).delete()
     db.query(models.Loan).filter(models.Loan.user_id == user_id).delete()
     db.query(models.Card).filter(models.Card.user_id == user_id).delete()
+    db.query(models.AccountBalanceSnapshot).filter(models.AccountBalanceSnapshot.user_id == user_id).delete()
+    db.query(models.UserFinancialSummary).filter(models.UserFinancialSummary.user_id == user_id).delete()
     db.delete(user)
     db.commit()
     
@@ -201,26 +213,82 @@ async def delete_user(
 
 @router.get("/transactions")
 async def get_all_transactions(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    skip: int = 0,
+    status: Optional[str] = None,
+    account_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: str = "timestamp",
+    order: str = "desc",
+    exact_total: bool = False,
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all transactions (admin only)"""
-    transactions = db.query(models.Transaction).offset(skip).limit(limit).all()
-    return transactions
+    """Get transactions, filtered and cursor paginated (admin only). See app/pagination.py for the headers."""
+    query = db.query(models.Transaction)
+    if status:
+        query = query.filter(models.Transaction.status == status.upper())
+    if account_id is not None:
+        query = query.filter(or_(models.Transaction.src_account == account_id, models.Transaction.dest_account == account_id))
+    # Timestamp bounds also prune monthly partitions
+    if start:
+        query = query.filter(models.Transaction.timestamp >= start)
+    if end:
+        query = query.filter(models.Transaction.timestamp < end)
+    if min_amount is not None:
+        query = query.filter(models.Transaction.amount >= min_amount)
+    if max_amount is not None:
+        query = query.filter(models.Transaction.amount <= max_amount)
+    return paginate(
+        query, models.Transaction, response, TRANSACTION_SORT_KEYS, sort, order,
+        cursor=cursor, limit=limit, skip=skip, exact_total=exact_total
+    )
 
 
 @router.get("/accounts")
 async def get_all_accounts(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    skip: int = 0,
+    status: Optional[str] = None,
+    account_type: Optional[str] = None,
+    user_id: Optional[int] = None,
+    min_balance: Optional[float] = None,
+    max_balance: Optional[float] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    exact_total: bool = False,
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all accounts (admin only)"""
-    accounts = db.query(models.Account).offset(skip).limit(limit).all()
-    return accounts
+    """Get accounts, filtered and cursor paginated (admin only). See app/pagination.py for the headers."""
+    query = db.query(models.Account)
+    if status:
+        query = query.filter(models.Account.status == status)
+    if account_type:
+        query = query.filter(models.Account.account_type == account_type)
+    if user_id is not None:
+        query = query.filter(models.Account.user_id == user_id)
+    if min_balance is not None:
+        query = query.filter(models.Account.balance >= min_balance)
+    if max_balance is not None:
+        query = query.filter(models.Account.balance <= max_balance)
+    if created_from:
+        query = query.filter(models.Account.created_at >= created_from)
+    if created_to:
+        query = query.filter(models.Account.created_at < created_to)
+    return paginate(
+        query, models.Account, response, ACCOUNT_SORT_KEYS, sort, order,
+        cursor=cursor, limit=limit, skip=skip, exact_total=exact_total
+    )
 
 
 @router.post("/accounts/{account_id}/adjust-balance")
@@ -240,12 +308,20 @@ async def adjust_account_balance(
     account.balance += amount
     
     # Log the adjustment
-    audit_log = models.AuditLog(
-        event_type="BALANCE_ADJUSTMENT",
-        message=f"Admin {admin_user.username} adjusted account {account.account_number} balance from {old_balance} to {account.balance}. Reason: {reason}"
+    audit.record(
+        "BALANCE_ADJUSTMENT",
+        f"Admin {admin_user.username} adjusted account {account.account_number} balance from {old_balance} to {account.balance}. Reason: {reason}",
+        db=db,
+        money_movement=True,
+        actor_id=admin_user.id,
+        subject_user_id=account.user_id,
+        account_id=account.id,
+        entity_type="account",
+        entity_id=account.id,
+        amount=amount
     )
-    db.add(audit_log)
     db.commit()
+    publish_change_event({"type": "account.balance_adjusted", "account_id": account.id, "user_id": account.user_id})
     
     return {
         "message": "Balance adjusted successfully",
@@ -256,19 +332,56 @@ async def adjust_account_balance(
     }
 
 
+@router.get("/audit/stats")
+async def get_audit_writer_stats(
+    flush: bool = False,
+    admin_user: models.User = Depends(auth.get_admin_user)
+):
+    """
+    Audit writer counters for this process (admin only): how many records were
+    written inline vs buffered and batched, i.e. how many INSERTs were removed
+    from request transactions. Pass flush=true to drain the buffer first.
+    """
+    if flush:
+        audit.audit_writer.flush()
+    return audit.audit_writer.stats()
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    admin_user: models.User = Depends(auth.get_admin_user)
+):
+    """Hit/miss/coalescing counters of the admin statistics cache for this process (admin only)"""
+    return admin_cache.stats()
+
+
 @router.get("/pending-users", response_model=List[schemas.UserOut])
 async def get_pending_kyc_users(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    skip: int = 0,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "created_at",
+    order: str = "asc",
+    exact_total: bool = False,
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all users with pending KYC approval (admin only)"""
-    pending_users = db.query(models.User).filter(
+    """Get users with pending KYC approval, oldest first, cursor paginated (admin only)"""
+    query = db.query(models.User).filter(
         models.User.role == "customer",
         models.User.status == "pending"
-    ).offset(skip).limit(limit).all()
-    return pending_users
+    )
+    if created_from:
+        query = query.filter(models.User.created_at >= created_from)
+    if created_to:
+        query = query.filter(models.User.created_at < created_to)
+    return paginate(
+        query, models.User, response, PENDING_SORT_KEYS["User"], sort, order,
+        cursor=cursor, limit=limit, skip=skip, exact_total=exact_total
+    )
 
 
 @router.post("/approve-kyc")
@@ -310,14 +423,19 @@ async def approve_kyc(
         raise HTTPException(status_code=400, detail="Action must be 'approve' or 'reject'")
     
     # Log the action
-    audit_log = models.AuditLog(
-        event_type="KYC_APPROVAL",
-        message=f"Admin {admin_user.username} {approval_request.action}d KYC for user {user.username}. Reason: {approval_request.reason or 'No reason provided'}"
+    audit.record(
+        "KYC_APPROVAL",
+        f"Admin {admin_user.username} {approval_request.action}d KYC for user {user.username}. Reason: {approval_request.reason or 'No reason provided'}",
+        db=db,
+        actor_id=admin_user.id,
+        subject_user_id=user.id,
+        entity_type="user",
+        entity_id=user.id
     )
-    db.add(audit_log)
     
     db.commit()
     db.refresh(user)
+    publish_change_event({"type": "approval.kyc", "user_id": user.id, "status": user.status})
     
     # KYC approval/rejection completed
     
@@ -333,16 +451,30 @@ async def approve_kyc(
 
 @router.get("/pending-cards", response_model=List[schemas.CardOut])
 async def get_pending_cards(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    skip: int = 0,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "created_at",
+    order: str = "asc",
+    exact_total: bool = False,
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all cards with pending approval (admin only)"""
-    pending_cards = db.query(models.Card).filter(
+    """Get cards with pending approval, oldest first, cursor paginated (admin only)"""
+    query = db.query(models.Card).filter(
         models.Card.approval_status == "pending"
-    ).offset(skip).limit(limit).all()
-    return pending_cards
+    )
+    if created_from:
+        query = query.filter(models.Card.created_at >= created_from)
+    if created_to:
+        query = query.filter(models.Card.created_at < created_to)
+    return paginate(
+        query, models.Card, response, PENDING_SORT_KEYS["Card"], sort, order,
+        cursor=cursor, limit=limit, skip=skip, exact_total=exact_total
+    )
 
 
 @router.post("/approve-card")
@@ -368,14 +500,19 @@ async def approve_card(
         raise HTTPException(status_code=400, detail="Action must be 'approve' or 'reject'")
     
     # Log the action
-    audit_log = models.AuditLog(
-        event_type="CARD_APPROVAL",
-        message=f"Admin {admin_user.username} {approval_request.action}d card application for user {card.owner.username}. Reason: {approval_request.reason or 'No reason provided'}"
+    audit.record(
+        "CARD_APPROVAL",
+        f"Admin {admin_user.username} {approval_request.action}d card application for user {card.owner.username}. Reason: {approval_request.reason or 'No reason provided'}",
+        db=db,
+        actor_id=admin_user.id,
+        subject_user_id=card.user_id,
+        entity_type="card",
+        entity_id=card.id
     )
-    db.add(audit_log)
     
     db.commit()
     db.refresh(card)
+    publish_change_event({"type": "approval.card", "card_id": card.id, "user_id": card.user_id, "status": card.approval_status})
     
     # Create notification for user
     if approval_request.action.lower() == "approve":
@@ -411,16 +548,30 @@ async def approve_card(
 
 @router.get("/pending-loans", response_model=List[schemas.LoanOut])
 async def get_pending_loans(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    skip: int = 0,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "created_at",
+    order: str = "asc",
+    exact_total: bool = False,
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all loans with pending approval (admin only)"""
-    pending_loans = db.query(models.Loan).filter(
+    """Get loans with pending approval, oldest first, cursor paginated (admin only)"""
+    query = db.query(models.Loan).filter(
         models.Loan.approval_status == "pending"
-    ).offset(skip).limit(limit).all()
-    return pending_loans
+    )
+    if created_from:
+        query = query.filter(models.Loan.created_at >= created_from)
+    if created_to:
+        query = query.filter(models.Loan.created_at < created_to)
+    return paginate(
+        query, models.Loan, response, PENDING_SORT_KEYS["Loan"], sort, order,
+        cursor=cursor, limit=limit, skip=skip, exact_total=exact_total
+    )
 
 
 @router.post("/approve-loan")
@@ -451,11 +602,18 @@ async def approve_loan(
             db.add(transaction)
             
             # Also log in audit log for better tracking
-            audit_log_disburse = models.AuditLog(
-                event_type="LOAN_DISBURSAL",
-                message=f"Loan amount ${loan.principal} disbursed to account {account.account_number}. Balance: ${old_balance} -> ${account.balance}"
+            audit.record(
+                "LOAN_DISBURSAL",
+                f"Loan amount ${loan.principal} disbursed to account {account.account_number}. Balance: ${old_balance} -> ${account.balance}",
+                db=db,
+                money_movement=True,
+                actor_id=admin_user.id,
+                subject_user_id=loan.user_id,
+                account_id=account.id,
+                entity_type="loan",
+                entity_id=loan.id,
+                amount=loan.principal
             )
-            db.add(audit_log_disburse)
         message = f"Loan approved and ${loan.principal} disbursed to user {loan.owner.username}'s account"
     elif approval_request.action.lower() == "reject":
         loan.approval_status = "rejected"
@@ -465,14 +623,19 @@ async def approve_loan(
         raise HTTPException(status_code=400, detail="Action must be 'approve' or 'reject'")
     
     # Log the action
-    audit_log = models.AuditLog(
-        event_type="LOAN_APPROVAL",
-        message=f"Admin {admin_user.username} {approval_request.action}d loan application for user {loan.owner.username}. Reason: {approval_request.reason or 'No reason provided'}"
+    audit.record(
+        "LOAN_APPROVAL",
+        f"Admin {admin_user.username} {approval_request.action}d loan application for user {loan.owner.username}. Reason: {approval_request.reason or 'No reason provided'}",
+        db=db,
+        actor_id=admin_user.id,
+        subject_user_id=loan.user_id,
+        entity_type="loan",
+        entity_id=loan.id
     )
-    db.add(audit_log)
     
     db.commit()
     db.refresh(loan)
+    publish_change_event({"type": "approval.loan", "loan_id": loan.id, "user_id": loan.user_id, "status": loan.approval_status})
     
     # Create notification for user
     if approval_request.action.lower() == "approve":
@@ -509,16 +672,30 @@ async def approve_loan(
 
 @router.get("/pending-fixed-deposits", response_model=List[schemas.FixedDepositOut])
 async def get_pending_fixed_deposits(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    skip: int = 0,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "start_date",
+    order: str = "asc",
+    exact_total: bool = False,
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all fixed deposits with pending approval (admin only)"""
-    pending_fds = db.query(models.FixedDeposit).filter(
+    """Get fixed deposits with pending approval, oldest first, cursor paginated (admin only)"""
+    query = db.query(models.FixedDeposit).filter(
         models.FixedDeposit.approval_status == "pending"
-    ).offset(skip).limit(limit).all()
-    return pending_fds
+    )
+    if created_from:
+        query = query.filter(models.FixedDeposit.start_date >= created_from)
+    if created_to:
+        query = query.filter(models.FixedDeposit.start_date < created_to)
+    return paginate(
+        query, models.FixedDeposit, response, PENDING_SORT_KEYS["FixedDeposit"], sort, order,
+        cursor=cursor, limit=limit, skip=skip, exact_total=exact_total
+    )
 
 
 @router.post("/approve-fixed-deposit")
@@ -545,14 +722,19 @@ async def approve_fixed_deposit(
             raise HTTPException(status_code=400, detail="Action must be 'approve' or 'reject'")
         
         # Log the action
-        audit_log = models.AuditLog(
-            event_type="FD_APPROVAL",
-            message=f"Admin {admin_user.username} {approval_request.action}d fixed deposit application for user {fd.owner.username}. Reason: {approval_request.reason or 'No reason provided'}"
+        audit.record(
+            "FD_APPROVAL",
+            f"Admin {admin_user.username} {approval_request.action}d fixed deposit application for user {fd.owner.username}. Reason: {approval_request.reason or 'No reason provided'}",
+            db=db,
+            actor_id=admin_user.id,
+            subject_user_id=fd.user_id,
+            entity_type="fixed_deposit",
+            entity_id=fd.id
         )
-        db.add(audit_log)
         
         db.commit()
         db.refresh(fd)
+        publish_change_event({"type": "approval.fixed_deposit", "fd_id": fd.id, "user_id": fd.user_id, "status": fd.approval_status})
         
         return {
             "message": message,
@@ -568,237 +750,133 @@ async def approve_fixed_deposit(
         raise HTTPException(status_code=500, detail=f"Error processing approval: {str(e)}")
 
 
-@router.get("/statistics/detailed")
-async def get_detailed_statistics(
+@router.post("/approve-kyc/bulk", response_model=schemas.BulkApprovalResult)
+async def bulk_approve_kyc(
+    request: schemas.BulkApprovalRequest,
+    admin_user: models.User = Depends(auth.get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Approve or reject many pending KYC requests in one transaction (admin only)"""
+    return await bulk_approvals.bulk_kyc(db, admin_user, request)
+
+
+@router.post("/approve-card/bulk", response_model=schemas.BulkApprovalResult)
+async def bulk_approve_cards(
+    request: schemas.BulkApprovalRequest,
+    admin_user: models.User = Depends(auth.get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Approve or reject many pending card applications in one transaction (admin only)"""
+    return await bulk_approvals.bulk_cards(db, admin_user, request)
+
+
+@router.post("/approve-loan/bulk", response_model=schemas.BulkApprovalResult)
+async def bulk_approve_loans(
+    request: schemas.BulkApprovalRequest,
+    admin_user: models.User = Depends(auth.get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Approve (and disburse) or reject many pending loans in one transaction (admin only)"""
+    return await bulk_approvals.bulk_loans(db, admin_user, request)
+
+
+@router.post("/approve-fixed-deposit/bulk", response_model=schemas.BulkApprovalResult)
+async def bulk_approve_fixed_deposits(
+    request: schemas.BulkApprovalRequest,
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
+):
+    """Approve or reject many pending fixed deposits in one transaction (admin only)"""
+    return await bulk_approvals.bulk_fixed_deposits(db, admin_user, request)
+
+
+@router.get("/statistics/detailed")
+async def get_detailed_statistics(
+    admin_user: models.User = Depends(auth.get_admin_user)
 ):
     """Get detailed statistics for charts and analytics"""
-    from datetime import datetime, timedelta
-    from sqlalchemy import extract, case
-    
-    # Get current date
-    today = datetime.now()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-    
-    # Weekly stats
-    accounts_this_week = db.query(models.Account).filter(
-        models.Account.created_at >= week_ago
-    ).count()
-    
-    loans_this_week = db.query(models.Loan).filter(
-        models.Loan.created_at >= week_ago,
-        models.Loan.approval_status == "approved"
-    ).count()
-    
-    cards_this_week = db.query(models.Card).filter(
-        models.Card.created_at >= week_ago,
-        models.Card.approval_status == "approved"
-    ).count()
-    
-    # Monthly stats
-    accounts_this_month = db.query(models.Account).filter(
-        models.Account.created_at >= month_ago
-    ).count()
-    
-    loans_this_month = db.query(models.Loan).filter(
-        models.Loan.created_at >= month_ago,
-        models.Loan.approval_status == "approved"
-    ).count()
-    
-    cards_this_month = db.query(models.Card).filter(
-        models.Card.created_at >= month_ago,
-        models.Card.approval_status == "approved"
-    ).count()
-    
-    # Account types distribution
-    account_types = db.query(
-        models.Account.account_type,
-        func.count(models.Account.id).label('count')
-    ).group_by(models.Account.account_type).all()
-    
-    # Loan types distribution (approximation based on amount)
-    total_loans = db.query(models.Loan).filter(models.Loan.approval_status == "approved").count()
-    personal_loans = db.query(models.Loan).filter(
-        models.Loan.approval_status == "approved",
-        models.Loan.principal <= 50000
-    ).count()
-    auto_loans = db.query(models.Loan).filter(
-        models.Loan.approval_status == "approved",
-        models.Loan.principal > 50000,
-        models.Loan.principal <= 200000
-    ).count()
-    home_loans = db.query(models.Loan).filter(
-        models.Loan.approval_status == "approved",
-        models.Loan.principal > 200000
-    ).count()
-    
-    # Card types distribution
-    card_types = db.query(
-        models.Card.card_type,
-        func.count(models.Card.id).label('count')
-    ).group_by(models.Card.card_type).all()
-    
-    # Approval rates
-    total_accounts_req = db.query(models.Account).count()
-    approved_accounts = db.query(models.Account).filter(models.Account.status == "active").count()
-    
-    total_loans_req = db.query(models.Loan).count()
-    approved_loans = db.query(models.Loan).filter(models.Loan.approval_status == "approved").count()
-    
-    total_cards_req = db.query(models.Card).count()
-    approved_cards = db.query(models.Card).filter(models.Card.approval_status == "approved").count()
-    
-    # User growth (monthly for last 12 months)
-    user_growth = []
-    for i in range(11, -1, -1):
-        month_start = today.replace(day=1) - timedelta(days=30*i)
-        month_end = month_start + timedelta(days=30)
-        users = db.query(models.User).filter(
-            models.User.role == "customer",
-            models.User.created_at <= month_end
-        ).count()
-        active_users = db.query(models.User).filter(
-            models.User.role == "customer",
-            models.User.status == "approved",
-            models.User.created_at <= month_end
-        ).count()
-        user_growth.append({
-            "month": month_start.strftime("%b"),
-            "users": users,
-            "active": active_users
-        })
-    
-    # Daily accounts (last 7 days)
-    daily_accounts = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day.replace(hour=23, minute=59, second=59, microsecond=999999)
-        count = db.query(models.Account).filter(
-            models.Account.created_at >= day_start,
-            models.Account.created_at <= day_end
-        ).count()
-        daily_accounts.append({
-            "day": day.strftime("%a"),
-            "accounts": count
-        })
-    
-    # Monthly data (last 12 months)
-    monthly_data = []
-    for i in range(11, -1, -1):
-        month_start = today.replace(day=1) - timedelta(days=30*i)
-        month_end = month_start + timedelta(days=30)
-        
-        accounts = db.query(models.Account).filter(
-            models.Account.created_at >= month_start,
-            models.Account.created_at < month_end
-        ).count()
-        
-        loans = db.query(models.Loan).filter(
-            models.Loan.approval_status == "approved",
-            models.Loan.created_at >= month_start,
-            models.Loan.created_at < month_end
-        ).count()
-        
-        cards = db.query(models.Card).filter(
-            models.Card.approval_status == "approved",
-            models.Card.created_at >= month_start,
-            models.Card.created_at < month_end
-        ).count()
-        
-        monthly_data.append({
-            "month": month_start.strftime("%b"),
-            "accounts": accounts,
-            "loans": loans,
-            "cards": cards
-        })
-    
-    return {
-        "weeklyStats": {
-            "accounts": accounts_this_week,
-            "loans": loans_this_week,
-            "cards": cards_this_week
-        },
-        "monthlyStats": {
-            "accounts": accounts_this_month,
-            "loans": loans_this_month,
-            "cards": cards_this_month
-        },
-        "accountTypes": [{"name": acc_type, "value": count} for acc_type, count in account_types],
-        "loanTypes": [
-            {"name": "Personal", "value": personal_loans},
-            {"name": "Auto", "value": auto_loans},
-            {"name": "Home", "value": home_loans}
-        ],
-        "cardTypes": [{"name": card_type, "value": count} for card_type, count in card_types],
-        "approvalRates": {
-            "accounts": {
-                "approved": round((approved_accounts / total_accounts_req * 100) if total_accounts_req > 0 else 0, 1),
-                "rejected": round(((total_accounts_req - approved_accounts) / total_accounts_req * 100) if total_accounts_req > 0 else 0, 1)
-            },
-            "loans": {
-                "approved": round((approved_loans / total_loans_req * 100) if total_loans_req > 0 else 0, 1),
-                "rejected": round(((total_loans_req - approved_loans) / total_loans_req * 100) if total_loans_req > 0 else 0, 1)
-            },
-            "cards": {
-                "approved": round((approved_cards / total_cards_req * 100) if total_cards_req > 0 else 0, 1),
-                "rejected": round(((total_cards_req - approved_cards) / total_cards_req * 100) if total_cards_req > 0 else 0, 1)
-            }
-        },
-        "userGrowth": user_growth,
-        "dailyAccounts": daily_accounts,
-        "monthlyData": monthly_data
-    }
+    return await admin_cache.get_or_compute(
+        "admin:detailed",
+        _with_session(admin_stats.compute_detailed_statistics_from_rollups),
+        tags=("admin:detailed",)
+    )
 
 
 @router.get("/statistics/transactions")
 async def get_transaction_statistics(
+    days: int = 30,
+    granularity: str = "day",
+    status: Optional[str] = None,
+    admin_user: models.User = Depends(auth.get_admin_user)
+):
+    """
+    Transaction count and amount per hour/day/week over the last `days` days,
+    optionally filtered by status (PENDING, SUCCESS, FAILED)
+    """
+    try:
+        # Validated before it becomes part of the cache key, so arbitrary values can't grow the cache
+        status = admin_stats.transaction_status(status)
+        key = f"admin:transactions:{days}:{granularity}:{status or ''}"
+        return await admin_cache.get_or_compute(
+            key,
+            _with_session(lambda db: admin_stats.compute_transaction_statistics(
+                db, days=days, granularity=granularity, status=status
+            )),
+            tags=("admin:transactions",)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/history/{table}")
+async def get_historical_records(
+    table: str,
+    start: datetime,
+    end: datetime,
+    account_id: Optional[int] = None,
+    event_type: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000, description="Number of records to return"),
     admin_user: models.User = Depends(auth.get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get daily transaction statistics for the last 30 days"""
-    from datetime import datetime, timedelta
-    
-    today = datetime.now()
-    daily_transactions = []
-    
-    for i in range(29, -1, -1):
-        day = today - timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Count transactions
-        count = db.query(models.Transaction).filter(
-            models.Transaction.timestamp >= day_start,
-            models.Transaction.timestamp <= day_end
-        ).count()
-        
-        # Sum amounts
-        total_amount = db.query(func.sum(models.Transaction.amount)).filter(
-            models.Transaction.timestamp >= day_start,
-            models.Transaction.timestamp <= day_end
-        ).scalar() or 0
-        
-        daily_transactions.append({
-            "date": day.strftime("%b %d"),
-            "count": count,
-            "amount": float(total_amount)
-        })
-    
-    # Weekly summary
-    week_ago = today - timedelta(days=7)
-    weekly_volume = db.query(models.Transaction).filter(
-        models.Transaction.timestamp >= week_ago
-    ).count()
-    
-    weekly_amount = db.query(func.sum(models.Transaction.amount)).filter(
-        models.Transaction.timestamp >= week_ago
-    ).scalar() or 0
-    
+    """
+    Look up transactions or audit logs in a time range, including partitions
+    that have already been archived (admin only).
+    """
+    if table not in partitions.PARTITIONED_TABLES:
+        raise HTTPException(status_code=400, detail="Table must be 'transactions' or 'auditlogs'")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    _, model = partitions.PARTITIONED_TABLES[table]
+    filters = {}
+
+    # Live partitions: the timestamp predicates let Postgres prune to the months in range
+    query = db.query(model).filter(model.timestamp >= start, model.timestamp < end)
+    if table == "transactions" and account_id is not None:
+        query = query.filter(or_(model.src_account == account_id, model.dest_account == account_id))
+        filters[("src_account", "dest_account")] = account_id
+    if table == "auditlogs" and event_type is not None:
+        query = query.filter(model.event_type == event_type)
+        filters["event_type"] = event_type
+
+    # Archived partitions hold the oldest months, so read them first
+    archived = []
+    for row in partitions.read_archived_rows(table, start, end, filters):
+        if len(archived) >= limit:
+            break
+        archived.append(row)
+    archived.sort(key=lambda r: r["timestamp"])
+
+    columns = [c.name for c in model.__table__.columns]
+    records = [
+        {name: getattr(row, name) for name in columns}
+        for row in query.order_by(model.timestamp).limit(limit - len(archived)).all()
+    ] if len(archived) < limit else []
+
     return {
-        "dailyTransactions": daily_transactions,
-        "weeklyVolume": weekly_volume,
-        "weeklyAmount": float(weekly_amount)
-    }
\ No newline at end of file
+        "table": table,
+        "records": archived + records,
+        "archived_count": len(archived),
+        "live_count": len(records)
+    }
@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
 from datetime import datetime
 
 from ..database import get_db
-from ..models import Notification, User
-from ..schemas import NotificationCreate, NotificationOut, NotificationUpdate, NotificationStats
+from ..models import Notification, User, BroadcastJob, NotificationHistorySummary
+from ..schemas import (
+    NotificationCreate, NotificationOut, NotificationUpdate, NotificationStats, BroadcastJobOut, TransactionOut,
+    NotificationHistorySummaryOut
+)
 from ..auth import get_current_user
 from ..websocket_manager import manager
+from .. import notification_counters, notification_digests
+from ..tasks import broadcast_notification as broadcast_notification_task
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
@@ -26,45 +31,111 @@ async def send_real_time_notification(user_id: int, notification_data: dict):
         print(f"Failed to send real-time notification: {e}")
 
 
+def notification_payload(notification: Notification, from_user_name: Optional[str]) -> dict:
+    """JSON form of a notification as sent over the WebSocket"""
+    return {
+        "id": notification.id,
+        "user_id": notification.user_id,
+        "title": notification.title,
+        "message": notification.message,
+        "type": notification.type,
+        "related_id": notification.related_id,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat(),
+        "read_at": notification.read_at.isoformat() if notification.read_at else None,
+        "from_user_id": notification.from_user_id,
+        "from_user_name": from_user_name,
+        "group_key": notification.group_key,
+        "group_count": notification.group_count,
+        "group_amount": notification.group_amount,
+        "updated_at": notification.updated_at.isoformat() if notification.updated_at else None
+    }
+
+
+FromUser = aliased(User)
+
+
+def notification_rows(db: Session):
+    """
+    Notification columns plus the sender's username in one query (outer join),
+    instead of a users lookup per notification.
+    """
+    return db.query(
+        Notification.id,
+        Notification.user_id,
+        Notification.title,
+        Notification.message,
+        Notification.type,
+        Notification.related_id,
+        Notification.is_read,
+        Notification.created_at,
+        Notification.read_at,
+        Notification.from_user_id,
+        FromUser.username.label("from_user_name"),
+        Notification.group_key,
+        Notification.group_count,
+        Notification.group_amount,
+        Notification.updated_at,
+    ).outerjoin(FromUser, FromUser.id == Notification.from_user_id)
+
+
+def serialize_rows(rows) -> List[dict]:
+    """Plain dicts for response bodies; skips building a NotificationOut per row"""
+    return [row._asdict() for row in rows]
+
+
+def _as_payload(row: dict) -> dict:
+    payload = dict(row)
+    payload["created_at"] = row["created_at"].isoformat() if row["created_at"] else None
+    payload["read_at"] = row["read_at"].isoformat() if row["read_at"] else None
+    payload["updated_at"] = row["updated_at"].isoformat() if row.get("updated_at") else None
+    return payload
+
+
+def add_notifications(db: Session, notifications_data: List[NotificationCreate]) -> List[dict]:
+    """
+    Add many notifications to the caller's transaction in one flush; the caller
+    commits. Returns their real-time payloads for send_real_time_notifications().
+    """
+    notifications = [Notification(**data.dict()) for data in notifications_data]
+    db.add_all(notifications)
+    db.flush()
+
+    from_user_ids = {n.from_user_id for n in notifications if n.from_user_id}
+    names = dict(
+        db.query(User.id, User.username).filter(User.id.in_(from_user_ids)).all()
+    ) if from_user_ids else {}
+    return [notification_payload(n, names.get(n.from_user_id)) for n in notifications]
+
+
+async def send_real_time_notifications(payloads: List[dict]):
+    """Send payloads from add_notifications() once the transaction has committed"""
+    for payload in payloads:
+        await send_real_time_notification(payload["user_id"], payload)
+
+
 async def create_notification_service(
     db: Session, 
     notification_data: NotificationCreate,
     send_realtime: bool = True
-):
-    """Service function to create notifications that can be used by other routers"""
+) -> dict:
+    """
+    Service function to create notifications that can be used by other routers.
+    Returns the stored notification (with from_user_name) as a dict.
+    """
     # Create notification
     db_notification = Notification(**notification_data.dict())
     db.add(db_notification)
     db.commit()
-    db.refresh(db_notification)
     
-    # Get from_user name if exists
-    from_user_name = None
-    if db_notification.from_user_id:
-        from_user = db.query(User).filter(User.id == db_notification.from_user_id).first()
-        if from_user:
-            from_user_name = from_user.username
-    
-    # Prepare notification data for real-time sending
-    notification_out = {
-        "id": db_notification.id,
-        "user_id": db_notification.user_id,
-        "title": db_notification.title,
-        "message": db_notification.message,
-        "type": db_notification.type,
-        "related_id": db_notification.related_id,
-        "is_read": db_notification.is_read,
-        "created_at": db_notification.created_at.isoformat(),
-        "read_at": db_notification.read_at.isoformat() if db_notification.read_at else None,
-        "from_user_id": db_notification.from_user_id,
-        "from_user_name": from_user_name
-    }
+    # Reload with the sender's name in one query
+    notification_out = notification_rows(db).filter(Notification.id == db_notification.id).one()._asdict()
     
     # Send real-time notification
     if send_realtime:
-        await send_real_time_notification(db_notification.user_id, notification_out)
+        await send_real_time_notification(notification_out["user_id"], _as_payload(notification_out))
     
-    return db_notification
+    return notification_out
 
 
 @router.post("/", response_model=NotificationOut)
@@ -78,20 +149,7 @@ async def create_notification(
     if current_user.role != "admin" and notification.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to create notifications for other users")
     
-    db_notification = await create_notification_service(db, notification)
-    
-    # Get from_user name for response
-    from_user_name = None
-    if db_notification.from_user_id:
-        from_user = db.query(User).filter(User.id == db_notification.from_user_id).first()
-        if from_user:
-            from_user_name = from_user.username
-    
-    # Create response
-    notification_out = NotificationOut.from_orm(db_notification)
-    notification_out.from_user_name = from_user_name
-    
-    return notification_out
+    return await create_notification_service(db, notification)
 
 
 @router.get("/", response_model=List[NotificationOut])
@@ -103,24 +161,12 @@ async def get_notifications(
     db: Session = Depends(get_db)
 ):
     """Get notifications for current user"""
-    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    query = notification_rows(db).filter(Notification.user_id == current_user.id)
     
     if unread_only:
         query = query.filter(Notification.is_read == False)
     
-    notifications = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Add from_user names
-    result = []
-    for notification in notifications:
-        notification_out = NotificationOut.from_orm(notification)
-        if notification.from_user_id:
-            from_user = db.query(User).filter(User.id == notification.from_user_id).first()
-            if from_user:
-                notification_out.from_user_name = from_user.username
-        result.append(notification_out)
-    
-    return result
+    return serialize_rows(query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all())
 
 
 @router.get("/stats", response_model=NotificationStats)
@@ -128,16 +174,23 @@ async def get_notification_stats(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get notification statistics for current user"""
-    total_count = db.query(Notification).filter(Notification.user_id == current_user.id).count()
-    unread_count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).count()
+    """Get notification statistics for current user (from the maintained counters)"""
+    total_count, unread_count = notification_counters.get_counts(db, current_user.id)
     
     return NotificationStats(total_count=total_count, unread_count=unread_count)
 
 
+@router.get("/history", response_model=List[NotificationHistorySummaryOut])
+async def get_notification_history(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Monthly summary of notifications removed by the retention job"""
+    return db.query(NotificationHistorySummary).filter(
+        NotificationHistorySummary.user_id == current_user.id
+    ).order_by(NotificationHistorySummary.month.desc(), NotificationHistorySummary.type).all()
+
+
 @router.put("/mark-all-read")
 async def mark_all_notifications_read(
     current_user: User = Depends(get_current_user),
@@ -151,7 +204,9 @@ async def mark_all_notifications_read(
         ).update({
             "is_read": True,
             "read_at": datetime.utcnow()
-        })
+        }, synchronize_session=False)
+        # Bulk UPDATE bypasses the flush hook; zero the counter in the same transaction
+        notification_counters.mark_all_read(db, current_user.id)
         
         db.commit()
         return {"message": f"Marked {updated_count} notifications as read"}
@@ -183,16 +238,28 @@ async def update_notification(
     
     db_notification.is_read = notification_update.is_read
     db.commit()
-    db.refresh(db_notification)
     
-    # Add from_user name
-    notification_out = NotificationOut.from_orm(db_notification)
-    if db_notification.from_user_id:
-        from_user = db.query(User).filter(User.id == db_notification.from_user_id).first()
-        if from_user:
-            notification_out.from_user_name = from_user.username
-    
-    return notification_out
+    return notification_rows(db).filter(Notification.id == notification_id).one()._asdict()
+
+
+@router.get("/{notification_id}/transactions", response_model=List[TransactionOut])
+async def get_notification_transactions(
+    notification_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The individual payments behind a coalesced "Payments Received" notification"""
+    db_notification = db.query(Notification).filter(
+        Notification.id == notification_id,
+        Notification.user_id == current_user.id
+    ).first()
+
+    if not db_notification:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    if db_notification.group_key != notification_digests.PAYMENTS_RECEIVED:
+        raise HTTPException(status_code=400, detail="Notification is not a payment digest")
+
+    return notification_digests.transactions_for_digest(db, db_notification)
 
 
 @router.delete("/{notification_id}")
@@ -227,19 +294,9 @@ async def get_all_notifications(
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    notifications = db.query(Notification).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Add from_user names
-    result = []
-    for notification in notifications:
-        notification_out = NotificationOut.from_orm(notification)
-        if notification.from_user_id:
-            from_user = db.query(User).filter(User.id == notification.from_user_id).first()
-            if from_user:
-                notification_out.from_user_name = from_user.username
-        result.append(notification_out)
-    
-    return result
+    return serialize_rows(
+        notification_rows(db).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    )
 
 
 @router.post("/admin/broadcast", response_model=dict)
@@ -250,22 +307,41 @@ async def broadcast_notification(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Broadcast notification to all users (admin only)"""
+    """
+    Broadcast notification to all users (admin only).
+
+    Returns immediately with a job id; the rows are inserted by a Celery task
+    and progress is available from /admin/broadcasts/{job_id}.
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
-    
-    users = db.query(User).filter(User.role == "customer").all()
-    
-    notifications_created = 0
-    for user in users:
-        notification_data = NotificationCreate(
-            user_id=user.id,
-            title=title,
-            message=message,
-            type=notification_type,
-            from_user_id=current_user.id
-        )
-        await create_notification_service(db, notification_data)
-        notifications_created += 1
-    
-    return {"message": f"Broadcast sent to {notifications_created} users"}
\ No newline at end of file
+
+    job = BroadcastJob(
+        title=title,
+        message=message,
+        type=notification_type,
+        from_user_id=current_user.id
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    broadcast_notification_task.delay(job.id)
+
+    return {"message": "Broadcast queued", "job_id": job.id, "status": job.status}
+
+
+@router.get("/admin/broadcasts/{job_id}", response_model=BroadcastJobOut)
+async def get_broadcast_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Progress of a broadcast job (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    job = db.query(BroadcastJob).filter(BroadcastJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return job
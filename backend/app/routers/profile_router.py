@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models import User
 from ..schemas import UserOut, UserUpdate, PasswordChange
 from ..utils import get_current_user, hash_password, verify_password
-from ..qr_utils import generate_user_qr_code, generate_user_qr_hash
+from ..qr_utils import generate_user_qr_hash, qr_image_links, qr_json_response, user_qr_content_for
+from typing import Optional
 
 router = APIRouter(prefix="/profile", tags=["Profile"]) 
 
@@ -90,34 +91,27 @@ def change_password(
 @router.get("/qr-code")
 def get_user_qr_code(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Generate a unique QR code for the current user.
-    The QR code will always be the same for the same user.
+    The QR code will always be the same for the same user. The image is
+    linked (PNG/SVG under /qr/images); a matching If-None-Match gets a 304.
     """
     # Re-fetch user to ensure we have complete data
     user = db.query(User).filter(User.id == current_user.id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
-    # Prepare user data for QR code
-    user_data = {
-        "full_name": user.full_name,
-        "email": user.email,
-        "username": user.username
-    }
-    
-    # Generate QR code
-    qr_code_base64 = generate_user_qr_code(user.id, user_data)
     qr_hash = generate_user_qr_hash(user.id)
     
-    return {
+    return qr_json_response({
         "user_id": user.id,
-        "qr_code": qr_code_base64,
+        **qr_image_links("user", user.id, user_qr_content_for(user)),
         "qr_hash": qr_hash,
         "message": "QR code generated successfully"
-    }
+    }, if_none_match)
 
 @router.get("/qr-info")
 def get_qr_info(
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
 from ..database import get_db
-from ..models import User
+from ..models import User, PushSubscription
 from ..utils import get_current_user
-import json
+from ..push_delivery import build_payload
+from ..tasks import deliver_push as deliver_push_task
 import logging
 
 # Configure logging
@@ -12,8 +16,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/notifications/push", tags=["push_notifications"])
 
-# In-memory storage for push subscriptions (in production, use database)
-push_subscriptions = {}
 
 @router.post("/subscribe")
 async def subscribe_to_push(
@@ -22,20 +24,38 @@ async def subscribe_to_push(
     db: Session = Depends(get_db)
 ):
     """Subscribe user to push notifications"""
+    endpoint = subscription_data.get("endpoint")
+    if not endpoint:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Subscription endpoint is required")
+
+    keys = subscription_data.get("keys") or {}
+    expiration = subscription_data.get("expirationTime")
+    values = {
+        "user_id": current_user.id,
+        "endpoint": endpoint,
+        "p256dh": keys.get("p256dh"),
+        "auth": keys.get("auth"),
+        # PushSubscription.expirationTime is epoch milliseconds
+        "expiration_time": datetime.utcfromtimestamp(expiration / 1000) if expiration else None,
+        "failure_count": 0,
+    }
+
     try:
-        user_id = current_user.id
-        
-        # Store subscription data
-        push_subscriptions[user_id] = subscription_data
-        
-        logger.info(f"User {user_id} subscribed to push notifications")
-        
+        # One row per browser endpoint; re-subscribing (or a new login on the same browser) takes it over
+        stmt = insert(PushSubscription.__table__).values(created_at=datetime.utcnow(), **values)
+        stmt = stmt.on_conflict_do_update(index_elements=["endpoint"], set_=values)
+        db.execute(stmt)
+        db.commit()
+
+        logger.info(f"User {current_user.id} subscribed to push notifications")
+
         return {
             "success": True,
             "message": "Successfully subscribed to push notifications"
         }
-        
+
     except Exception as e:
+        db.rollback()
         logger.error(f"Error subscribing to push notifications: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -44,25 +64,28 @@ async def subscribe_to_push(
 
 @router.post("/unsubscribe")
 async def unsubscribe_from_push(
+    subscription_data: Optional[dict] = Body(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Unsubscribe user from push notifications"""
+    """Unsubscribe one browser (when its endpoint is given) or all of the user's browsers"""
     try:
-        user_id = current_user.id
-        
-        # Remove subscription
-        if user_id in push_subscriptions:
-            del push_subscriptions[user_id]
-        
-        logger.info(f"User {user_id} unsubscribed from push notifications")
-        
+        query = db.query(PushSubscription).filter(PushSubscription.user_id == current_user.id)
+        endpoint = (subscription_data or {}).get("endpoint")
+        if endpoint:
+            query = query.filter(PushSubscription.endpoint == endpoint)
+        removed = query.delete(synchronize_session=False)
+        db.commit()
+
+        logger.info(f"User {current_user.id} unsubscribed from push notifications ({removed} subscriptions)")
+
         return {
             "success": True,
             "message": "Successfully unsubscribed from push notifications"
         }
-        
+
     except Exception as e:
+        db.rollback()
         logger.error(f"Error unsubscribing from push notifications: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -71,42 +94,41 @@ async def unsubscribe_from_push(
 
 @router.get("/status")
 async def get_push_status(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """Get current push notification subscription status"""
-    user_id = current_user.id
-    is_subscribed = user_id in push_subscriptions
-    
+    subscriptions = db.query(PushSubscription).filter(PushSubscription.user_id == current_user.id).count()
+
     return {
-        "subscribed": is_subscribed,
-        "user_id": user_id
+        "subscribed": subscriptions > 0,
+        "subscriptions": subscriptions,
+        "user_id": current_user.id
     }
 
 @router.post("/test")
 async def test_push_notification(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """Send a test push notification to the user"""
     try:
         user_id = current_user.id
-        
-        if user_id not in push_subscriptions:
+
+        if not db.query(PushSubscription.id).filter(PushSubscription.user_id == user_id).first():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User not subscribed to push notifications"
             )
-        
-        # For testing purposes, we'll just return success
-        # In a real implementation, you would send the push notification here
-        # using web-push library with VAPID keys
-        
+
+        await send_push_notification(user_id, "Test Notification", "Push notifications are working.", "general")
         logger.info(f"Test push notification requested for user {user_id}")
-        
+
         return {
             "success": True,
-            "message": "Test notification sent (simulated)"
+            "message": "Test notification queued"
         }
-        
+
     except HTTPException:
         raise
     except Exception as e:
@@ -118,33 +140,12 @@ async def test_push_notification(
 
 # Helper function to send push notification (would be used by other parts of the app)
 async def send_push_notification(user_id: int, title: str, body: str, category: str = "general", data: dict = None):
-    """Send a push notification to a specific user"""
+    """Queue a push notification to every browser the user subscribed; delivery runs on the Celery worker"""
     try:
-        if user_id not in push_subscriptions:
-            logger.warning(f"User {user_id} not subscribed to push notifications")
-            return False
-        
-        notification_data = {
-            "title": title,
-            "body": body,
-            "icon": "/favicon.ico",
-            "badge": "/favicon.ico",
-            "tag": f"nyord-{category}-{user_id}",
-            "data": {
-                "category": category,
-                "user_id": user_id,
-                **(data or {})
-            },
-            "requireInteraction": category in ["loan", "kyc"],
-            "actions": []
-        }
-        
-        # In a real implementation, you would use web-push library here
-        # For now, we'll just log the notification
-        logger.info(f"Sending push notification to user {user_id}: {title}")
-        
+        deliver_push_task.delay([user_id], build_payload(user_id, title, body, category, data))
+        logger.info(f"Queued push notification to user {user_id}: {title}")
         return True
-        
+
     except Exception as e:
-        logger.error(f"Error sending push notification to user {user_id}: {str(e)}")
-        return False
\ No newline at end of file
+        logger.error(f"Error queueing push notification to user {user_id}: {str(e)}")
+        return False
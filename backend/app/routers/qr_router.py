@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from ..database import get_db
 from ..models import User, Account
 from ..utils import get_current_user
-from ..qr_utils import generate_user_qr_code, generate_user_qr_hash, verify_qr_code, generate_account_qr_hash
+from ..qr_utils import (
+    account_qr_content_for, generate_account_qr_hash, generate_user_qr_hash, qr_image_links, qr_image_response,
+    qr_json_response, user_qr_content_for, verify_qr_code
+)
+from ..models import QRBatchJob
+from ..schemas import QRBatchCreate, QRBatchJobOut
+from ..tasks import render_qr_batch as render_qr_batch_task
+from .. import config, qr_batch
+from fastapi.responses import FileResponse
 from typing import Optional
 import json
+import os
 from urllib.parse import urlparse, parse_qs
 
 class QRDecodeRequest(BaseModel):
@@ -18,11 +27,14 @@ router = APIRouter(prefix="/qr", tags=["QR Codes"])
 def generate_qr_for_user(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Generate QR code for a specific user. 
     Users can only generate their own QR code, admins can generate for any user.
+    The image is linked (PNG/SVG under /qr/images); a matching If-None-Match
+    gets an empty 304.
     """
     # Check if user is requesting their own QR or if they're admin
     if current_user.id != user_id and current_user.role != "admin":
@@ -36,26 +48,67 @@ def generate_qr_for_user(
     if not target_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
-    # Prepare user data for QR code
-    user_data = {
-        "full_name": target_user.full_name,
-        "email": target_user.email,
-        "username": target_user.username
-    }
-    
-    # Generate QR code with payment URL
-    qr_code_base64 = generate_user_qr_code(target_user.id, user_data, "http://localhost:3000")
     qr_hash = generate_user_qr_hash(target_user.id)
     
-    return {
+    return qr_json_response({
         "user_id": target_user.id,
         "username": target_user.username,
         "full_name": target_user.full_name,
-        "qr_code": qr_code_base64,
+        **qr_image_links("user", target_user.id, user_qr_content_for(target_user)),
         "qr_hash": qr_hash,
         "generated_by": current_user.id,
         "message": "QR code generated successfully"
-    }
+    }, if_none_match)
+
+@router.get("/images/user/{user_id}.{fmt}")
+def get_user_qr_image(
+    user_id: int,
+    fmt: str,
+    v: Optional[str] = Query(None, description="Image hash from qr_code_url; makes the response cacheable"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    A user's QR code as raw PNG or SVG (fmt "png" or "svg").
+    Users can only fetch their own QR code, admins can fetch any user's.
+    """
+    if current_user.id != user_id and current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only generate QR code for your own account"
+        )
+    
+    target_user = db.query(User).filter(User.id == user_id).first()
+    if not target_user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    
+    return qr_image_response(user_qr_content_for(target_user), fmt, v, if_none_match)
+
+@router.get("/images/account/{account_id}.{fmt}")
+def get_account_qr_image(
+    account_id: int,
+    fmt: str,
+    v: Optional[str] = Query(None, description="Image hash from qr_code_url; makes the response cacheable"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    An approved account's QR code as raw PNG or SVG (fmt "png" or "svg").
+    Users can only fetch QR codes of their own accounts, admins any account's.
+    """
+    account = db.query(Account).filter(
+        Account.id == account_id,
+        Account.status == "approved"
+    ).first()
+    if not account or (account.user_id != current_user.id and current_user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found or not approved"
+        )
+    
+    return qr_image_response(account_qr_content_for(account, account.owner), fmt, v, if_none_match)
 
 @router.get("/verify/{user_id}")
 def verify_user_qr(
@@ -291,6 +344,89 @@ def get_all_user_qr_info(
         "limit": limit
     }
 
+@router.post("/admin/batches")
+def create_qr_batch(
+    request: QRBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a printable QR export (admin only): every approved account or every
+    customer, or just the given ids, as a ZIP of PNGs or a PDF of A4 sheets.
+    Progress is available from /qr/admin/batches/{job_id} and the file from
+    /qr/admin/batches/{job_id}/download once completed.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    if request.kind not in qr_batch.KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(qr_batch.KINDS)}")
+    if request.output_format not in qr_batch.FORMATS:
+        raise HTTPException(status_code=400, detail=f"output_format must be one of: {', '.join(qr_batch.FORMATS)}")
+    if request.ids is not None and not 1 <= len(request.ids) <= config.QR_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"ids must hold between 1 and {config.QR_BATCH_MAX_ITEMS} ids")
+
+    job = QRBatchJob(
+        kind=request.kind,
+        output_format=request.output_format,
+        ids=json.dumps(sorted(set(request.ids))) if request.ids is not None else None,
+        requested_by=current_user.id
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    render_qr_batch_task.delay(job.id)
+
+    return {"message": "QR batch queued", "job_id": job.id, "status": job.status}
+
+@router.get("/admin/batches/{job_id}", response_model=QRBatchJobOut)
+def get_qr_batch(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Progress and throughput of a QR batch (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    job = db.query(QRBatchJob).filter(QRBatchJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="QR batch not found")
+    out = QRBatchJobOut.model_validate(job)
+    out.eta_seconds = qr_batch.eta_seconds(job)
+    return out
+
+@router.get("/admin/batches/{job_id}/download")
+def download_qr_batch(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The ZIP or PDF of a completed QR batch, streamed from disk (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    job = db.query(QRBatchJob).filter(QRBatchJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="QR batch not found")
+    if job.status != "completed" or not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=409, detail=f"QR batch is {job.status}, no file to download")
+
+    return FileResponse(
+        job.file_path,
+        media_type=qr_batch.FORMATS[job.output_format],
+        filename=f"nyord-qr-{job.kind}-{job.id}.{job.output_format}"
+    )
+
 @router.get("/user/{user_id}/info")
 def get_user_qr_info_by_id(
     user_id: int,
@@ -1,46 +1,101 @@
-from fastapi import APIRouter, Response
-from fastapi.responses import StreamingResponse
-import io
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from datetime import date
+from ..database import SessionLocal, get_db
+from ..models import User
+from ..auth import get_current_user, get_admin_user
+from .. import charts, spending_analytics
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
+@router.get('/analytics')
+async def get_spending_analytics(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    top: int = 10,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Spending breakdowns of the current user by category, counterparty,
+    weekday and month over [start, end] (whole history by default).
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if not 1 <= top <= 100:
+        raise HTTPException(status_code=400, detail="top must be between 1 and 100")
+    user_id = current_user.id
 
-@router.get('/matplotlib.png')
-def matplotlib_plot():
-    """Generate a simple matplotlib plot and return it as PNG.
+    def load():
+        db = SessionLocal()
+        try:
+            return spending_analytics.load_history(db, user_id)
+        finally:
+            db.close()
 
-    This endpoint is intended as an example of server-side chart generation
-    using matplotlib. It produces a sample pie + bar combined figure.
-    """
+    history = await spending_analytics.analytics_cache.get_or_compute(spending_analytics.cache_key(user_id), load)
+    return await run_in_threadpool(spending_analytics.breakdowns, history, start, end, top)
+
+
+# Chart endpoints render server-side (app/charts.py) and answer with an ETag;
+# {fmt} is "png" or "svg".
+
+
+@router.get('/charts/spending.{fmt}')
+async def spending_chart(
+    fmt: str,
+    days: int = 90,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The current user's spending by recipient over the last `days` days (pie + bar)"""
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    spec = await run_in_threadpool(charts.spending_breakdown, db, current_user.id, days)
+    return await charts.chart_response(spec, fmt, if_none_match)
+
+
+@router.get('/charts/cashflow.{fmt}')
+async def cashflow_chart(
+    fmt: str,
+    months: int = 12,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The current user's income and expenses per month"""
+    if not 1 <= months <= 36:
+        raise HTTPException(status_code=400, detail="months must be between 1 and 36")
+    spec = await run_in_threadpool(charts.monthly_cashflow, db, current_user.id, months)
+    return await charts.chart_response(spec, fmt, if_none_match)
+
+
+@router.get('/charts/admin/transactions.{fmt}')
+async def admin_transactions_chart(
+    fmt: str,
+    days: int = 30,
+    granularity: str = "day",
+    status: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    admin_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Bank-wide transaction count and amount per hour / day / week (admin only)"""
     try:
-        import matplotlib
-        matplotlib.use('Agg')
-        import matplotlib.pyplot as plt
-        import numpy as np
-    except Exception as e:
-        return Response(content=f"matplotlib not available: {e}", status_code=500)
-
-    # Sample data
-    categories = ['Food', 'Rent', 'Transport', 'Shopping', 'Savings']
-    values = [320, 800, 120, 200, 560]
-
-    fig, axs = plt.subplots(1, 2, figsize=(8, 3))
-    # Pie chart
-    axs[0].pie(values, labels=categories, autopct='%1.1f%%', startangle=140)
-    axs[0].set_title('Spending by Category')
-
-    # Bar chart
-    x = np.arange(len(categories))
-    axs[1].bar(x, values, color=['#4c9f70', '#d95f02', '#7570b3', '#1b9e77', '#e7298a'])
-    axs[1].set_xticks(x)
-    axs[1].set_xticklabels(categories, rotation=45, ha='right')
-    axs[1].set_title('Spending (USD)')
-
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', dpi=100)
-    plt.close(fig)
-    buf.seek(0)
-
-    return StreamingResponse(content=buf, media_type='image/png')
+        spec = await run_in_threadpool(charts.admin_transactions, db, days, granularity, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await charts.chart_response(spec, fmt, if_none_match)
+
+
+@router.get('/matplotlib.png')
+async def matplotlib_plot(
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Kept for older clients: the spending chart of the last 90 days as PNG."""
+    spec = await run_in_threadpool(charts.spending_breakdown, db, current_user.id, 90)
+    return await charts.chart_response(spec, "png", if_none_match)
@@ -2,21 +2,21 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models import User
-from ..schemas import UserOut
+from ..schemas import UserSearchOut
 from ..utils import get_current_user
+from .. import user_search
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-@router.get("/search", response_model=list[UserOut])
+@router.get("/search", response_model=list[UserSearchOut])
 def search_users(
-    q: str = Query(..., min_length=1, description="Search query for username"),
+    q: str = Query(..., min_length=1, description="Search query for username or full name"),
+    limit: int = Query(10, ge=1, le=50),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Search for users by username (case-insensitive partial match). Excludes current user."""
-    users = db.query(User).filter(
-        User.username.ilike(f"%{q}%"),
-        User.id != current_user.id
-    ).limit(10).all()
-    
-    return users
+    """
+    Search for users by username or full name, best matches first (exact
+    username, then prefixes, then substrings). Excludes current user.
+    """
+    return user_search.search_users(db, q, limit=limit, exclude_id=current_user.id)
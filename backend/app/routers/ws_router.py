@@ -14,6 +14,7 @@ async def websocket_endpoint(
     token: str = Query(None)
 ):
     user_id = None
+    role = None
     
     # Try to authenticate user if token provided
     if token:
@@ -24,6 +25,7 @@ async def websocket_endpoint(
             try:
                 user = get_current_user_from_token(token, db)
                 user_id = user.id
+                role = user.role
             except:
                 pass  # Continue without authentication
             finally:
@@ -31,7 +33,7 @@ async def websocket_endpoint(
         except:
             pass
     
-    await manager.connect(websocket, user_id)
+    await manager.connect(websocket, user_id, role)
 
     try:
         while True:
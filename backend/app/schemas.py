@@ -1,6 +1,6 @@
 from pydantic import BaseModel, validator
 from datetime import datetime, date
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 # ------------------ USER -------------------
 class UserCreate(BaseModel):
@@ -78,6 +78,15 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+class UserSearchOut(BaseModel):
+    """Recipient search result; only what the transfer page shows"""
+    id: int
+    username: str
+    full_name: Optional[str] = None
+    email: str
+
+
 class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     email: Optional[str] = None
@@ -322,6 +331,27 @@ class ApprovalRequest(BaseModel):
     reason: Optional[str] = None
 
 
+class BulkApprovalRequest(BaseModel):
+    item_ids: List[int]
+    action: str  # 'approve' or 'reject'
+    reason: Optional[str] = None
+
+
+class BulkApprovalItemResult(BaseModel):
+    item_id: int
+    success: bool
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkApprovalResult(BaseModel):
+    action: str
+    processed: int
+    succeeded: int
+    failed: int
+    results: List[BulkApprovalItemResult]
+
+
 class ApprovalNotificationOut(BaseModel):
     id: int
     user_id: int
@@ -363,6 +393,66 @@ class NotificationOut(BaseModel):
     read_at: Optional[datetime] = None
     from_user_id: Optional[int] = None
     from_user_name: Optional[str] = None  # We'll populate this manually
+    group_key: Optional[str] = None
+    group_count: Optional[int] = None
+    group_amount: Optional[float] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class NotificationHistorySummaryOut(BaseModel):
+    user_id: int
+    month: date
+    type: str
+    notification_count: int
+    event_count: int
+    amount_total: float
+    first_at: Optional[datetime] = None
+    last_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BroadcastJobOut(BaseModel):
+    id: int
+    title: str
+    message: str
+    type: str
+    status: str
+    total_recipients: int
+    delivered: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class QRBatchCreate(BaseModel):
+    kind: str = "accounts"  # 'accounts' (approved accounts) or 'users' (customers)
+    output_format: str = "zip"  # 'zip' (PNGs + manifest.csv) or 'pdf' (printable sheets)
+    ids: Optional[List[int]] = None  # only these accounts / users
+
+
+class QRBatchJobOut(BaseModel):
+    id: int
+    kind: str
+    output_format: str
+    status: str
+    total: int
+    rendered: int
+    codes_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    file_size: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
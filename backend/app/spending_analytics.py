@@ -0,0 +1,200 @@
+"""
+Per-user spending analytics behind /stats/analytics.
+
+A user's whole SUCCESS transaction history is read once into columnar NumPy
+arrays (`History`): timestamps, amounts, debit / credit flags, a category
+code and a counterparty code. Every breakdown is then a mask plus
+`np.bincount` over those arrays, so any date range of a multi-year history
+is answered without going back to the database.
+
+Transactions have no category column; the category is derived from the
+counterparty:
+- "people": the other account belongs to another user;
+- "own_accounts": both accounts are the user's (counted as spent and as
+  received, and left out of the counterparty, weekday and month breakdowns
+  since the money does not leave the user);
+- "bank": no account on the other side (loan disbursals, card transfers).
+
+Histories are cached per user in `analytics_cache` until the next commit
+touching that user's accounts or transactions: the dashboard invalidation
+hook (app/dashboard.py) and its `dashboard.invalidate` event drop them too.
+"""
+from datetime import date
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import config
+from .cache import TTLCache
+
+CATEGORIES = ("people", "own_accounts", "bank")
+PEOPLE, OWN_ACCOUNTS, BANK = range(len(CATEGORIES))
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+analytics_cache = TTLCache(
+    ttl=config.SPENDING_ANALYTICS_CACHE_TTL_SECONDS,
+    stale=0,
+    max_entries=config.SPENDING_ANALYTICS_CACHE_MAX_ENTRIES,
+)
+
+HISTORY_SQL = text("""
+    WITH acc AS (
+        SELECT id FROM accounts WHERE user_id = :user_id
+    ), txns AS (
+        SELECT id, src_account, dest_account, amount, timestamp
+        FROM transactions WHERE src_account IN (SELECT id FROM acc) AND status = 'SUCCESS'
+        UNION
+        SELECT id, src_account, dest_account, amount, timestamp
+        FROM transactions WHERE dest_account IN (SELECT id FROM acc) AND status = 'SUCCESS'
+    )
+    SELECT t.timestamp, t.amount,
+           t.src_account IN (SELECT id FROM acc) AS is_debit,
+           t.dest_account IN (SELECT id FROM acc) AS is_credit,
+           cp.user_id AS counterparty_id,
+           COALESCE(NULLIF(u.full_name, ''), u.username) AS counterparty_name
+    FROM txns t
+    LEFT JOIN accounts cp
+        ON cp.id = CASE WHEN t.src_account IN (SELECT id FROM acc) THEN t.dest_account ELSE t.src_account END
+    LEFT JOIN users u ON u.id = cp.user_id
+    WHERE t.timestamp IS NOT NULL
+    ORDER BY t.timestamp, t.id
+""")
+
+
+class History:
+    """One user's transactions as parallel arrays, oldest first."""
+
+    def __init__(self, timestamps, amounts, debit, credit, category, counterparty, counterparty_names):
+        self.timestamps = timestamps  # datetime64[s]
+        self.amounts = amounts  # float64
+        self.debit = debit  # bool: money left one of the user's accounts
+        self.credit = credit  # bool: money reached one of the user's accounts
+        self.category = category  # int8 index into CATEGORIES
+        self.counterparty = counterparty  # int32 index into counterparty_names
+        self.counterparty_names = counterparty_names
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @classmethod
+    def from_rows(cls, user_id: int, rows) -> "History":
+        count = len(rows)
+        timestamps = np.array([row.timestamp for row in rows], dtype="datetime64[s]") if count else np.array([], dtype="datetime64[s]")
+        amounts = np.fromiter((row.amount or 0.0 for row in rows), dtype=np.float64, count=count)
+        debit = np.fromiter((bool(row.is_debit) for row in rows), dtype=bool, count=count)
+        credit = np.fromiter((bool(row.is_credit) for row in rows), dtype=bool, count=count)
+        counterparty_ids = np.fromiter(
+            (row.counterparty_id if row.counterparty_id is not None else -1 for row in rows), dtype=np.int64, count=count
+        )
+        category = np.full(count, PEOPLE, dtype=np.int8)
+        category[counterparty_ids == user_id] = OWN_ACCOUNTS
+        category[counterparty_ids == -1] = BANK
+
+        # Dense codes for the counterparties, with their display names
+        ids, counterparty = np.unique(counterparty_ids, return_inverse=True)
+        names = {}
+        for row in rows:
+            if row.counterparty_id is not None and row.counterparty_id not in names:
+                names[row.counterparty_id] = row.counterparty_name or f"User {row.counterparty_id}"
+        counterparty_names = ["Bank" if i == -1 else names[i] for i in ids.tolist()]
+        return cls(timestamps, amounts, debit, credit, category, counterparty.astype(np.int32), counterparty_names)
+
+
+def load_history(db: Session, user_id: int) -> History:
+    return History.from_rows(user_id, db.execute(HISTORY_SQL, {"user_id": user_id}).all())
+
+
+def cache_key(user_id: int) -> str:
+    return f"analytics:{user_id}"
+
+
+def invalidate(user_ids) -> int:
+    return analytics_cache.discard(*(cache_key(user_id) for user_id in user_ids))
+
+
+def _money(values) -> list:
+    return np.round(values, 2).tolist()
+
+
+def breakdowns(history: History, start: date = None, end: date = None, top: int = 10) -> dict:
+    """
+    Spending breakdowns over [start, end] (whole days, either end open).
+
+    Returns totals, per-category spent / received, the top counterparties by
+    amount spent, spending per weekday, and spent / received per calendar
+    month (gap filled between the first and last month with transactions).
+    """
+    ts = history.timestamps
+    lo = int(np.searchsorted(ts, np.datetime64(start, "s"), side="left")) if start else 0
+    hi = int(np.searchsorted(ts, np.datetime64(end, "D") + 1, side="left")) if end else len(ts)
+    ts = ts[lo:hi]
+    amounts = history.amounts[lo:hi]
+    debit = history.debit[lo:hi]
+    credit = history.credit[lo:hi]
+    category = history.category[lo:hi]
+    counterparty = history.counterparty[lo:hi]
+
+    external = category != OWN_ACCOUNTS
+    spent_mask = debit & external
+    received_mask = credit & external
+    spent = np.where(spent_mask, amounts, 0.0)
+    received = np.where(received_mask, amounts, 0.0)
+
+    # Categories (own-account transfers on both sides)
+    category_spent = np.bincount(category, weights=np.where(debit, amounts, 0.0), minlength=len(CATEGORIES))
+    category_received = np.bincount(category, weights=np.where(credit, amounts, 0.0), minlength=len(CATEGORIES))
+    category_count = np.bincount(category, minlength=len(CATEGORIES))
+
+    # Counterparties by amount spent
+    n_counterparties = len(history.counterparty_names)
+    by_counterparty_spent = np.bincount(counterparty, weights=spent, minlength=n_counterparties)
+    by_counterparty_count = np.bincount(counterparty[spent_mask], minlength=n_counterparties)
+    ranked = np.argsort(-by_counterparty_spent, kind="stable")[:top]
+    ranked = ranked[by_counterparty_spent[ranked] > 0]
+
+    # Weekdays: 1970-01-01 was a Thursday (index 3 with Monday first)
+    days = ts.astype("datetime64[D]").astype(np.int64)
+    weekday = (days + 3) % 7
+    weekday_spent = np.bincount(weekday, weights=spent, minlength=7)
+    weekday_count = np.bincount(weekday[spent_mask], minlength=7)
+
+    # Calendar months, gap filled
+    months = []
+    if len(ts):
+        month_index = ts.astype("datetime64[M]").astype(np.int64)
+        first = int(month_index.min())
+        offset = month_index - first
+        span = int(offset.max()) + 1
+        month_spent = np.bincount(offset, weights=spent, minlength=span)
+        month_received = np.bincount(offset, weights=received, minlength=span)
+        labels = np.arange(first, first + span).astype("datetime64[M]").astype(str).tolist()
+        months = [
+            {"month": label, "spent": s, "received": r}
+            for label, s, r in zip(labels, _money(month_spent), _money(month_received))
+        ]
+
+    return {
+        "start": start.isoformat() if start else (str(ts[0].astype("datetime64[D]")) if len(ts) else None),
+        "end": end.isoformat() if end else (str(ts[-1].astype("datetime64[D]")) if len(ts) else None),
+        "transactions": int(len(ts)),
+        "total_spent": round(float(spent.sum()), 2),
+        "total_received": round(float(received.sum()), 2),
+        "by_category": [
+            {"category": name, "spent": s, "received": r, "count": int(c)}
+            for name, s, r, c in zip(CATEGORIES, _money(category_spent), _money(category_received), category_count)
+        ],
+        "by_counterparty": [
+            {
+                "name": history.counterparty_names[i],
+                "spent": round(float(by_counterparty_spent[i]), 2),
+                "count": int(by_counterparty_count[i]),
+            }
+            for i in ranked.tolist()
+        ],
+        "by_weekday": [
+            {"weekday": name, "spent": s, "count": int(c)}
+            for name, s, c in zip(WEEKDAYS, _money(weekday_spent), weekday_count)
+        ],
+        "by_month": months,
+    }
@@ -9,7 +9,13 @@ from sqlalchemy.orm import sessionmaker
 
 # App imports
 from .celery_app import celery_app
-from .models import Transaction, Account, AuditLog, User, Notification
+from .models import Transaction, Account, User, Notification
+from . import audit
+from . import rollups  # registers the rollup maintenance hook on Session flushes
+from . import notification_counters  # registers the notification counter hooks
+from . import notification_digests
+from . import dashboard  # registers the dashboard cache invalidation hooks
+from . import financial_summary  # registers the user_financial_summary maintenance hook
 from app.websocket_manager import manager
 
 import pika
@@ -70,10 +76,16 @@ def process_transaction(event_payload: dict):
         # 3. Logic Check (Insufficient Funds)
         if src_acc.balance < amount:
             txn.status = "FAILED"
-            db.add(AuditLog(
-                event_type="TRANSACTION_FAILED",
-                message=f"Insufficient balance for txn {txn_id}"
-            ))
+            audit.record(
+                "TRANSACTION_FAILED",
+                f"Insufficient balance for txn {txn_id}",
+                db=db,
+                subject_user_id=src_acc.user_id,
+                account_id=src_id,
+                entity_type="transaction",
+                entity_id=txn_id,
+                amount=amount
+            )
             db.commit()
             
             # Optional: Notify user of failure via WebSocket here
@@ -86,10 +98,18 @@ def process_transaction(event_payload: dict):
         txn.status = "SUCCESS"
         txn.timestamp = datetime.utcnow()
 
-        db.add(AuditLog(
-            event_type="TRANSACTION_SUCCESS",
-            message=f"Txn {txn_id}: {amount} transferred from {src_id} to {dest_id}"
-        ))
+        audit.record(
+            "TRANSACTION_SUCCESS",
+            f"Txn {txn_id}: {amount} transferred from {src_id} to {dest_id}",
+            db=db,
+            money_movement=True,
+            actor_id=src_acc.user_id,
+            subject_user_id=dest_acc.user_id,
+            account_id=src_id,
+            entity_type="transaction",
+            entity_id=txn_id,
+            amount=amount
+        )
 
         # Create notifications for both sender and receiver
         # Get user information
@@ -111,18 +131,21 @@ def process_transaction(event_payload: dict):
             db.add(sender_notification)
             print(f"Created sender notification for user {src_user.id}")
 
+        push_receiver = False
         if dest_user and (not src_user or dest_user.id != src_user.id):
-            # Notification for receiver (only if different from sender)
-            receiver_notification = Notification(
+            # Notification for receiver (only if different from sender); bursts of
+            # incoming payments are folded into one digest notification
+            receiver_notification, push_receiver = notification_digests.record_payment_received(
+                db,
                 user_id=dest_user.id,
-                title="Transaction Received",
-                message=f"You received ${amount:,.2f} from {src_user.username if src_user else 'Account ' + str(src_id)}. Your new balance is ${dest_acc.balance:,.2f}.",
-                type="transaction",
-                related_id=txn_id,
-                from_user_id=src_user.id if src_user else None
+                amount=amount,
+                balance=dest_acc.balance,
+                txn_id=txn_id,
+                from_user_id=src_user.id if src_user else None,
+                from_name=src_user.username if src_user else 'Account ' + str(src_id),
+                now=txn.timestamp
             )
-            db.add(receiver_notification)
-            print(f"Created receiver notification for user {dest_user.id}")
+            print(f"Recorded receiver notification {receiver_notification.id or '(new)'} for user {dest_user.id}")
 
         db.commit()
         print(f"Notifications committed to database for transaction {txn_id}")
@@ -154,26 +177,14 @@ def process_transaction(event_payload: dict):
             except Exception as e:
                 print(f"Failed to send real-time notification to sender: {e}")
 
-        if receiver_notification and dest_user and (not src_user or dest_user.id != src_user.id):
+        if receiver_notification and push_receiver:
             try:
                 print(f"Sending WebSocket notification to receiver user {dest_user.id}")
+                # The first payment of a digest is a new notification; later ones replace it in place
                 asyncio.run(manager.send_personal_message(
-                    message={
-                        "type": "notification",
-                        "data": {
-                            "id": receiver_notification.id,
-                            "user_id": receiver_notification.user_id,
-                            "title": receiver_notification.title,
-                            "message": receiver_notification.message,
-                            "type": receiver_notification.type,
-                            "related_id": receiver_notification.related_id,
-                            "is_read": False,
-                            "created_at": receiver_notification.created_at.isoformat(),
-                            "read_at": None,
-                            "from_user_id": receiver_notification.from_user_id,
-                            "from_user_name": src_user.username if src_user else None
-                        }
-                    },
+                    message=notification_digests.push_message(
+                        receiver_notification, src_user.username if src_user else None
+                    ),
                     user_id=dest_user.id
                 ))
                 print(f"WebSocket notification sent to receiver user {dest_user.id}")
@@ -225,6 +236,25 @@ def publish_ws_event(event: dict):
 
     connection.close()
 
+@celery_app.task(name="flush_payment_digest")
+def flush_payment_digest(notification_id: int):
+    """Trailing WebSocket push for a payment digest whose last updates were throttled"""
+    db = SessionLocal()
+    try:
+        digest = notification_digests.take_trailing_push(db, notification_id)
+        db.commit()
+        if digest is not None:
+            asyncio.run(manager.send_personal_message(
+                message=notification_digests.push_message(digest),
+                user_id=digest.user_id
+            ))
+    except Exception as e:
+        print(f"Error flushing payment digest {notification_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 @celery_app.task(name="auto_debit_loan_emi")
 def auto_debit_loan_emi():
     """Scheduled task to auto-debit EMI from linked accounts on due dates"""
@@ -307,11 +337,17 @@ def auto_debit_loan_emi():
                     loan.next_due_date = None
                 
                 # Log the auto-debit
-                audit_log = AuditLog(
-                    event_type="LOAN_EMI_AUTO_DEBIT",
-                    message=f"Auto-debited EMI of ${loan.emi} from account {account.account_number} for loan {loan.id}"
+                audit.record(
+                    "LOAN_EMI_AUTO_DEBIT",
+                    f"Auto-debited EMI of ${loan.emi} from account {account.account_number} for loan {loan.id}",
+                    db=db,
+                    money_movement=True,
+                    subject_user_id=loan.user_id,
+                    account_id=account.id,
+                    entity_type="loan",
+                    entity_id=loan.id,
+                    amount=loan.emi
                 )
-                db.add(audit_log)
                 
                 # Create success notification
                 notification = Notification(
@@ -366,4 +402,272 @@ def auto_debit_loan_emi():
         print(f"Error in auto_debit_loan_emi task: {e}")
         db.rollback()
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@celery_app.task(name="maintain_partitions")
+def maintain_partitions():
+    """Scheduled task to pre-create monthly partitions and archive expired ones"""
+    from .partitions import PARTITIONED_TABLES, ensure_partitions, archive_expired_partitions
+    from datetime import date
+
+    for table in PARTITIONED_TABLES:
+        try:
+            with engine.connect() as conn:
+                ensure_partitions(conn, table, date.today())
+                conn.commit()
+
+            archived = archive_expired_partitions(engine, table)
+            for path in archived:
+                print(f"Archived partition of {table} to {path}")
+        except Exception as e:
+            print(f"Error maintaining partitions for {table}: {e}")
+
+
+@celery_app.task(name="compact_rollups")
+def compact_rollups(full: bool = False):
+    """Scheduled task to fold old daily rollup rows into months and repair drift"""
+    db = SessionLocal()
+    try:
+        report = rollups.compact(db, full=full)
+        db.commit()
+        for table, result in report.items():
+            print(f"Rollups for {table}: {result}")
+        return report
+    except Exception as e:
+        print(f"Error compacting rollups: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+@celery_app.task(name="broadcast_notification", bind=True)
+def broadcast_notification(self, job_id: int):
+    """
+    Insert a broadcast notification for every customer with set-based
+    INSERT ... SELECT statements, one chunk of recipients per transaction so
+    progress is visible on the BroadcastJob. Online users are then reached
+    with a single ws_events publish.
+
+    A failed run is retried up to BROADCAST_MAX_RETRIES times and resumes after
+    job.last_user_id. Each chunk claims its range by moving last_user_id
+    forward in the same statement (compare-and-set), so a second delivery of
+    the task running concurrently inserts nothing twice.
+    """
+    from sqlalchemy import text
+    from . import config
+    from .models import BroadcastJob
+
+    db = SessionLocal()
+    try:
+        job = db.query(BroadcastJob).filter(BroadcastJob.id == job_id).with_for_update().first()
+        if not job or job.status == "completed":
+            return
+
+        job.status = "running"
+        job.started_at = job.started_at or datetime.utcnow()
+        job.total_recipients = db.query(User).filter(User.role == "customer").count()
+        after = job.last_user_id or 0
+        title, message, notification_type, from_user_id = job.title, job.message, job.type, job.from_user_id
+        created_at = job.started_at
+        db.commit()
+
+        while True:
+            # Recipients are taken in id order so last_user_id marks the progress
+            recipients, claimed, last_user_id = db.execute(text("""
+                WITH recipients AS (
+                    SELECT id FROM users
+                    WHERE role = 'customer' AND id > :after
+                    ORDER BY id
+                    LIMIT :batch
+                ), claimed AS (
+                    -- Only the run that still sees last_user_id = :after gets the chunk
+                    UPDATE broadcast_jobs
+                    SET last_user_id = (SELECT MAX(id) FROM recipients),
+                        delivered = COALESCE(delivered, 0) + (SELECT COUNT(*) FROM recipients)
+                    WHERE id = :job_id
+                      AND COALESCE(last_user_id, 0) = :after
+                      AND EXISTS (SELECT 1 FROM recipients)
+                    RETURNING id
+                ), inserted AS (
+                    INSERT INTO notifications (user_id, title, message, type, is_read, created_at, from_user_id)
+                    SELECT id, :title, :message, :type, false, :created_at, :from_user_id FROM recipients
+                    WHERE EXISTS (SELECT 1 FROM claimed)
+                    RETURNING user_id
+                ), counted AS (
+                    -- Set-based insert bypasses the ORM hook; bump the badge counters here
+                    INSERT INTO notification_counters (user_id, total_count, unread_count, updated_at)
+                    SELECT user_id, 1, 1, now() FROM inserted
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET total_count = notification_counters.total_count + 1,
+                        unread_count = notification_counters.unread_count + 1,
+                        updated_at = now()
+                )
+                SELECT (SELECT COUNT(*) FROM recipients), (SELECT COUNT(*) FROM claimed), MAX(user_id) FROM inserted
+            """), {
+                "job_id": job_id,
+                "after": after,
+                "batch": config.BROADCAST_BATCH_SIZE,
+                "title": title,
+                "message": message,
+                "type": notification_type,
+                "created_at": created_at,
+                "from_user_id": from_user_id,
+            }).one()
+            db.commit()
+
+            if not recipients:
+                break
+            if not claimed:
+                print(f"Broadcast {job_id} is being delivered by another run; stopping")
+                return
+            after = last_user_id
+
+        # Only one run completes the job and publishes it
+        completed = db.query(BroadcastJob).filter(
+            BroadcastJob.id == job_id, BroadcastJob.status == "running"
+        ).update({"status": "completed", "finished_at": datetime.utcnow(), "error": None}, synchronize_session=False)
+        db.commit()
+        if not completed:
+            return
+
+        # One message for every online customer instead of a send per recipient
+        publish_ws_event({
+            "type": "notification.broadcast",
+            "audience": "customer",
+            "broadcast_id": job_id,
+            "title": title,
+            "message": message,
+            "notification_type": notification_type,
+            "from_user_id": from_user_id,
+            "created_at": created_at.isoformat(),
+        })
+        print(f"Broadcast {job_id} delivered to {job.delivered} users")
+
+    except Exception as e:
+        print(f"Error in broadcast_notification task: {e}")
+        db.rollback()
+        retrying = self.request.retries < config.BROADCAST_MAX_RETRIES
+        job = db.query(BroadcastJob).filter(BroadcastJob.id == job_id).first()
+        if job:
+            job.error = str(e)
+            if not retrying:
+                job.status = "failed"
+            db.commit()
+        if retrying:
+            raise self.retry(exc=e, countdown=config.BROADCAST_RETRY_DELAY_SECONDS, max_retries=config.BROADCAST_MAX_RETRIES)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="reconcile_notification_counters")
+def reconcile_notification_counters():
+    """Scheduled task to recompute notification badge counters and fix drift"""
+    try:
+        with engine.begin() as conn:
+            fixed = notification_counters.reconcile(conn)
+        print(f"Reconciled notification counters: {fixed} rows fixed")
+        if fixed:
+            # API processes re-read counters from the DB
+            publish_ws_event({"type": "notification.counts.reset"})
+        return fixed
+    except Exception as e:
+        print(f"Error reconciling notification counters: {e}")
+
+
+@celery_app.task(name="purge_notifications")
+def purge_notifications():
+    """Scheduled task to compact and delete read notifications past the retention window"""
+    from . import notification_retention
+
+    try:
+        report = notification_retention.purge(engine)
+        print(f"Notification retention: {report}")
+        if report["deleted"]:
+            # Totals dropped for many users; API processes re-read counters from the DB
+            publish_ws_event({"type": "notification.counts.reset"})
+        return report
+    except Exception as e:
+        print(f"Error purging notifications: {e}")
+
+
+@celery_app.task(name="deliver_push")
+def deliver_push(user_ids: list, payload: dict):
+    """Send a Web Push payload to every subscription of the given users"""
+    from . import push_delivery
+
+    db = SessionLocal()
+    try:
+        summary = asyncio.run(push_delivery.send_to_users(db, user_ids, payload))
+        print(f"Push delivery to {len(user_ids)} users: {summary}")
+        return summary
+    except Exception as e:
+        print(f"Error delivering push notifications: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+@celery_app.task(name="snapshot_balances")
+def snapshot_balances():
+    """Scheduled task to write end-of-day balance snapshots for every account"""
+    from . import balance_snapshots
+
+    try:
+        with engine.begin() as conn:
+            report = balance_snapshots.snapshot_missing_days(conn)
+        print(f"Balance snapshots: {report}")
+        return report
+    except Exception as e:
+        print(f"Error writing balance snapshots: {e}")
+
+
+@celery_app.task(name="roll_financial_summaries")
+def roll_financial_summaries():
+    """Scheduled task to recompute every user_financial_summary row for the new 30-day window"""
+    from . import config
+
+    try:
+        report = financial_summary.roll(engine, config.FINANCIAL_SUMMARY_ROLL_BATCH_SIZE)
+        print(f"Financial summaries rolled: {report}")
+        return report
+    except Exception as e:
+        print(f"Error rolling financial summaries: {e}")
+
+
+@celery_app.task(name="render_qr_batch")
+def render_qr_batch(job_id: int):
+    """
+    Render an admin QR batch (app/qr_batch.py) into a ZIP or PDF, with
+    progress and throughput kept on the QRBatchJob. Routed to the "qr_batch"
+    queue, whose worker runs with --pool=solo so it can start render processes.
+    """
+    from . import qr_batch
+    from .models import QRBatchJob
+
+    db = SessionLocal()
+    try:
+        job = db.query(QRBatchJob).filter(QRBatchJob.id == job_id).with_for_update().first()
+        if not job or job.status == "completed":
+            return
+
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        job.error = None
+        db.commit()
+
+        report = qr_batch.run_job(db, job)
+        print(f"QR batch {job_id}: {report}")
+        return report
+
+    except Exception as e:
+        print(f"Error in render_qr_batch task: {e}")
+        db.rollback()
+        job = db.query(QRBatchJob).filter(QRBatchJob.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,245 @@
+"""
+User search for the transfer recipient box (/users/search).
+
+Two backends, selected by USER_SEARCH_BACKEND:
+
+- "memory" (default): a per-process prefix index over usernames, full names
+  and the words of full names. Each field is a sorted list of (term, user_id)
+  pairs, so a prefix lookup is two bisects and reading the first `limit`
+  entries; no query reaches the database for prefix matches. Results are
+  ranked: exact username, username prefix, full name prefix, name-word prefix.
+  When a query of 3+ characters has fewer prefix matches than requested, the
+  rest are filled with substring matches from the trigram query below.
+
+- "trigram": one SQL query using the pg_trgm GIN indexes on username and
+  full_name (see migrate_add_user_search_indexes.py), ranked the same way and
+  then by trigram similarity.
+
+The memory index is built from the users table on first use and kept in sync
+by Session hooks: User inserts, deletes and changes to username / full_name /
+email are applied once the transaction commits, and are published on
+ws_events as `search_index.users` so the other API processes apply them too.
+The index is rebuilt from scratch every USER_SEARCH_INDEX_REFRESH_SECONDS as
+a safety net.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from . import config
+from .models import User
+
+_CHANGES_KEY = "user_search_changes"
+_WATCHED = ("username", "full_name", "email")
+_END = "\uffff"
+
+# Fields in rank order: a match on an earlier field ranks higher
+FIELDS = ("username", "full_name", "name_word")
+
+
+def _terms(username: str, full_name: str) -> dict:
+    full_name = (full_name or "").strip().lower()
+    words = set(full_name.split()) if full_name else set()
+    return {
+        "username": {username.lower()} if username else set(),
+        "full_name": {full_name} if full_name else set(),
+        # The first word is already covered by the full name prefix
+        "name_word": words - {full_name.split()[0]} if words else set(),
+    }
+
+
+class PrefixIndex:
+    """Sorted (term, user_id) lists per field, plus the user rows they point to."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}
+        self._fields = {field: [] for field in FIELDS}
+        self.built_at = None
+
+    def build(self, rows):
+        users = {}
+        fields = {field: [] for field in FIELDS}
+        for user_id, username, full_name, email in rows:
+            users[user_id] = {"id": user_id, "username": username, "full_name": full_name, "email": email}
+            for field, terms in _terms(username, full_name).items():
+                fields[field].extend((term, user_id) for term in terms)
+        for entries in fields.values():
+            entries.sort()
+        with self._lock:
+            self._users = users
+            self._fields = fields
+            self.built_at = time.monotonic()
+
+    def remove(self, user_id: int):
+        with self._lock:
+            user = self._users.pop(user_id, None)
+            if not user:
+                return
+            for field, terms in _terms(user["username"], user["full_name"]).items():
+                entries = self._fields[field]
+                for term in terms:
+                    i = bisect_left(entries, (term, user_id))
+                    if i < len(entries) and entries[i] == (term, user_id):
+                        del entries[i]
+
+    def upsert(self, user_id: int, username: str, full_name: str, email: str):
+        with self._lock:
+            self.remove(user_id)
+            self._users[user_id] = {"id": user_id, "username": username, "full_name": full_name, "email": email}
+            for field, terms in _terms(username, full_name).items():
+                for term in terms:
+                    insort(self._fields[field], (term, user_id))
+
+    def search(self, query: str, limit: int = 10, exclude_id: int = None) -> list[dict]:
+        query = query.strip().lower()
+        if not query:
+            return []
+        found = []
+        seen = {exclude_id}
+        with self._lock:
+            for field in FIELDS:
+                entries = self._fields[field]
+                i = bisect_left(entries, (query,))
+                end = bisect_left(entries, (query + _END,))
+                while i < end and len(found) < limit:
+                    user_id = entries[i][1]
+                    if user_id not in seen:
+                        seen.add(user_id)
+                        found.append(self._users[user_id])
+                    i += 1
+                if len(found) >= limit:
+                    break
+        return found
+
+    def __len__(self):
+        return len(self._users)
+
+
+search_index = PrefixIndex()
+_build_lock = threading.Lock()
+
+
+def ensure_index(db: Session):
+    """Build the memory index on first use, and rebuild it once it is older than the refresh interval."""
+    built_at = search_index.built_at
+    if built_at is not None and time.monotonic() - built_at < config.USER_SEARCH_INDEX_REFRESH_SECONDS:
+        return
+    with _build_lock:
+        if search_index.built_at != built_at:
+            return  # another request rebuilt it meanwhile
+        search_index.build(db.query(User.id, User.username, User.full_name, User.email).all())
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+TRIGRAM_SEARCH_SQL = """
+    SELECT id, username, full_name, email
+    FROM users
+    WHERE id <> :exclude_id AND ({condition})
+    ORDER BY lower(username) = :q DESC,
+             lower(username) LIKE :prefix DESC,
+             lower(coalesce(full_name, '')) LIKE :prefix DESC,
+             greatest(similarity(username, :q), similarity(coalesce(full_name, ''), :q)) DESC,
+             username
+    LIMIT :limit
+"""
+
+
+def trigram_search(db: Session, query: str, limit: int = 10, exclude_id: int = None, exclude_ids=()) -> list[dict]:
+    """
+    Substring search served by the pg_trgm indexes. Trigrams need 3+
+    characters; shorter queries match prefixes on the lower(username) index.
+    """
+    q = query.strip().lower()
+    if not q:
+        return []
+    escaped = _like_escape(q)
+    if len(q) >= 3:
+        condition = "username ILIKE :pattern OR full_name ILIKE :pattern"
+    else:
+        condition = "lower(username) LIKE :prefix"
+    params = {
+        "q": q,
+        "pattern": f"%{escaped}%",
+        "prefix": f"{escaped}%",
+        "exclude_id": exclude_id if exclude_id is not None else -1,
+        "limit": limit + len(exclude_ids),
+    }
+    rows = db.execute(text(TRIGRAM_SEARCH_SQL.format(condition=condition)), params).mappings().all()
+    return [dict(row) for row in rows if row["id"] not in exclude_ids][:limit]
+
+
+def search_users(db: Session, query: str, limit: int = 10, exclude_id: int = None) -> list[dict]:
+    if config.USER_SEARCH_BACKEND == "trigram":
+        return trigram_search(db, query, limit, exclude_id)
+
+    ensure_index(db)
+    results = search_index.search(query, limit, exclude_id)
+    if len(results) < limit and len(query.strip()) >= 3:
+        # Few prefix matches: add substring matches ("%query%") after them
+        results += trigram_search(db, query, limit - len(results), exclude_id, {r["id"] for r in results})
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Keeping the memory index in sync
+# ---------------------------------------------------------------------------
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changes = None
+    for obj in session.new:
+        if isinstance(obj, User):
+            changes = changes if changes is not None else session.info.setdefault(_CHANGES_KEY, {})
+            changes[obj.id] = (obj.username, obj.full_name, obj.email)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in _WATCHED):
+                changes = changes if changes is not None else session.info.setdefault(_CHANGES_KEY, {})
+                changes[obj.id] = (obj.username, obj.full_name, obj.email)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changes = changes if changes is not None else session.info.setdefault(_CHANGES_KEY, {})
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes:
+        return
+    event_payload = {
+        "type": "search_index.users",
+        "users": [
+            {"id": user_id, "username": values[0], "full_name": values[1], "email": values[2]}
+            for user_id, values in changes.items() if values is not None
+        ],
+        "deleted": [user_id for user_id, values in changes.items() if values is None],
+    }
+    apply_event(event_payload)
+
+    # Queued for the publisher thread: registration and profile updates never wait on RabbitMQ
+    from .rabbitmq import ws_event_publisher
+    ws_event_publisher.publish(event_payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_CHANGES_KEY, None)
+
+
+def apply_event(event_payload: dict):
+    """Apply a `search_index.users` event; a no-op until the index is first built."""
+    if search_index.built_at is None:
+        return
+    for user_id in event_payload.get("deleted", []):
+        search_index.remove(user_id)
+    for user in event_payload.get("users", []):
+        search_index.upsert(user["id"], user["username"], user["full_name"], user["email"])
@@ -6,8 +6,9 @@ class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
         self.user_connections: Dict[int, List[WebSocket]] = {}
+        self.user_roles: Dict[int, str] = {}
 
-    async def connect(self, websocket: WebSocket, user_id: int = None):
+    async def connect(self, websocket: WebSocket, user_id: int = None, role: str = None):
         await websocket.accept()
         self.active_connections.append(websocket)
         
@@ -15,6 +16,8 @@ class ConnectionManager:
             if user_id not in self.user_connections:
                 self.user_connections[user_id] = []
             self.user_connections[user_id].append(websocket)
+            if role:
+                self.user_roles[user_id] = role
 
     def disconnect(self, websocket: WebSocket, user_id: int = None):
         if websocket in self.active_connections:
@@ -25,6 +28,7 @@ class ConnectionManager:
                 self.user_connections[user_id].remove(websocket)
             if not self.user_connections[user_id]:
                 del self.user_connections[user_id]
+                self.user_roles.pop(user_id, None)
 
     async def send_personal_message(self, message: dict, user_id: int):
         """Send message to specific user"""
@@ -53,6 +57,12 @@ class ConnectionManager:
         for connection in disconnected_connections:
             self.disconnect(connection)
 
+    async def broadcast_to_role(self, message: dict, role: str):
+        """Send message to every connected, authenticated user with the given role"""
+        user_ids = [user_id for user_id, user_role in list(self.user_roles.items()) if user_role == role]
+        for user_id in user_ids:
+            await self.send_personal_message(message, user_id)
+
     async def broadcast_to_admins(self, message: dict):
         """Broadcast message to all admin users (if we track admin connections)"""
         # For now, broadcast to all - can be enhanced to track admin user IDs
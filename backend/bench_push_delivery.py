@@ -0,0 +1,107 @@
+"""
+Benchmark for Web Push delivery (app/push_delivery.py) against a local
+stand-in push service, so no browser or real push service is involved.
+
+The stand-in is a threaded HTTP server that accepts JSON POSTs after a fixed
+latency. A share of endpoints answer 410 Gone (expired subscriptions). A
+share answer 503 on their first attempt only (transient errors that must be
+retried). The benchmark delivers one payload to N subscriptions at several
+concurrency levels, where concurrency 1 is the old one-at-a-time
+behaviour. For each level it reports throughput, latency percentiles,
+retries, and whether every outcome was classified correctly.
+
+Run from the backend directory (no database needed):
+    python bench_push_delivery.py [subscriptions] [latency_ms]
+"""
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import push_delivery
+
+GONE_EVERY = 20        # every 20th endpoint is an expired subscription
+TRANSIENT_EVERY = 10   # every 10th endpoint fails once with 503
+
+
+class StandInPushService(BaseHTTPRequestHandler):
+    latency = 0.05
+    seen = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.latency)
+        index = int(self.path.rsplit("/", 1)[-1])
+
+        status = 201
+        if index % GONE_EVERY == 0:
+            status = 410
+        elif index % TRANSIENT_EVERY == 0:
+            with self.lock:
+                first = index not in self.seen
+                self.seen.add(index)
+            if first:
+                status = 503
+
+        self.send_response(status)
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def expected_outcome(index: int) -> str:
+    return "dead" if index % GONE_EVERY == 0 else "delivered"
+
+
+def run(base_url: str, count: int, concurrency: int) -> dict:
+    StandInPushService.seen = set()
+    subscriptions = [{"id": i, "endpoint": f"{base_url}/push/{i}", "p256dh": None, "auth": None} for i in range(1, count + 1)]
+    payload = push_delivery.build_payload(1, "Bench", "Benchmark push", "transaction")
+    transport = push_delivery.JsonTransport(timeout=10, pool_size=concurrency)
+
+    started = time.perf_counter()
+    results = asyncio.run(push_delivery.deliver(
+        subscriptions, payload, transport=transport, concurrency=concurrency, max_retries=3, backoff=0.01
+    ))
+    elapsed = time.perf_counter() - started
+
+    summary = push_delivery.summarize(results)
+    summary["elapsed_s"] = round(elapsed, 2)
+    summary["per_second"] = round(count / elapsed, 1)
+    summary["correct"] = all(r.outcome == expected_outcome(r.subscription_id) for r in results)
+    return summary
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    StandInPushService.latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInPushService)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Stand-in push service at {base_url}, {StandInPushService.latency * 1000:.0f} ms per request, {count} subscriptions\n")
+
+    print(f"{'concurrency':>11} {'elapsed s':>10} {'push/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'retries':>8} {'dead':>6} {'failed':>7} {'correct':>8}")
+    levels = [1, 10, 50, 100]
+    for concurrency in levels:
+        # The sequential baseline is slow; measure it on a slice and scale the count down
+        n = min(count, 100) if concurrency == 1 else count
+        s = run(base_url, n, concurrency)
+        label = f"{concurrency}" + ("*" if n != count else "")
+        print(f"{label:>11} {s['elapsed_s']:>10} {s['per_second']:>8} {s.get('p50_ms', 0):>8} {s.get('p95_ms', 0):>8} "
+              f"{s['retries']:>8} {s['dead']:>6} {s['failed']:>7} {str(s['correct']):>8}")
+    if count > 100:
+        print("\n* measured on the first 100 subscriptions")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Size comparison for the QR endpoints (app/qr_utils.py): the previous JSON
+bodies with inline base64 PNG data URLs vs the JSON bodies with image links
+plus the images themselves as raw PNG or SVG, over the wire uncompressed and
+gzipped, for a user with a few accounts.
+
+No database needed; the accounts are made up, and the logo is generated if
+frontend/public/logo.png is missing. Run from the backend directory:
+    python bench_qr_payloads.py [accounts]
+"""
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from app import qr_utils
+from app.qr_cache import qr_image_cache
+from bench_qr_render import synthetic_logo
+
+
+def sizes(data: bytes) -> tuple[int, int]:
+    return len(data), len(gzip.compress(data))
+
+
+def report(name, data_or_sizes):
+    raw, gzipped = data_or_sizes if isinstance(data_or_sizes, tuple) else sizes(data_or_sizes)
+    print(f"{name:<36} {raw:>9,} B   gzip {gzipped:>9,} B")
+    return raw, gzipped
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        logo_path = qr_utils.LOGO_PATH
+        if not os.path.exists(logo_path):
+            logo_path = os.path.join(tmp_dir, "logo.png")
+            synthetic_logo(logo_path)
+        qr_utils.load_logo(logo_path)
+    qr_image_cache.directory = None
+    owner = SimpleNamespace(id=42, username="jdoe", full_name="Jane Doe")
+    accounts = [
+        SimpleNamespace(id=1000 + i, account_number=f"ACC{7000000000 + i}", account_type="savings", balance=1234.5)
+        for i in range(count)
+    ]
+    contents = {account.id: qr_utils.account_qr_content_for(account, owner) for account in accounts}
+
+    def body(qr_fields):
+        return json.dumps({
+            "user_id": owner.id, "username": owner.username, "full_name": owner.full_name,
+            "accounts": [
+                {"account_id": a.id, "account_number": a.account_number, "account_type": a.account_type,
+                 "balance": a.balance, **qr_fields(a)}
+                for a in accounts
+            ],
+        }).encode()
+
+    started = time.perf_counter()
+    old_body = body(lambda a: {"qr_code": qr_utils.png_data_url(qr_utils.qr_image(contents[a.id], "png")[1])})
+    new_body = body(lambda a: qr_utils.qr_image_links("account", a.id, contents[a.id]))
+    pngs = [qr_utils.qr_image(contents[a.id], "png")[1] for a in accounts]
+    svgs = [qr_utils.qr_image(contents[a.id], "svg")[1] for a in accounts]
+    print(f"Rendered {count} account QR codes in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+    png_sizes = tuple(map(sum, zip(*(sizes(png) for png in pngs))))
+    svg_sizes = tuple(map(sum, zip(*(sizes(svg) for svg in svgs))))
+    old = report("JSON with data URLs (before)", old_body)
+    new = report("JSON with image links", new_body)
+    png = report(f"{count} x image/png", png_sizes)
+    svg = report(f"{count} x image/svg+xml", svg_sizes)
+
+    print()
+    for name, total in (("links + PNG", (new[0] + png[0], new[1] + png[1])),
+                        ("links + SVG", (new[0] + svg[0], new[1] + svg[1]))):
+        print(f"{name:<36} {total[0]:>9,} B ({total[0] / old[0] - 1:+.0%} vs before)   "
+              f"gzip {total[1]:>9,} B ({total[1] / old[1] - 1:+.0%})")
+    print(f"{'revalidation (304 for every image)':<36} {new[0]:>9,} B ({new[0] / old[0] - 1:+.0%} vs before)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark for QR generation (app/qr_utils.py): time per QR code with
+the logo read, resized and padded on every call (the previous
+add_logo_to_qr) vs the logo loaded once and its padded tile reused, plus a
+hit in the rendered-image cache.
+
+Uses frontend/public/logo.png if present, else a generated RGBA logo. No
+database needed. Run from the backend directory:
+    python bench_qr_render.py [iterations]
+"""
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import qrcode
+from PIL import Image, ImageDraw
+
+from app import qr_utils
+from app.qr_cache import qr_image_cache
+
+CONTENT = qr_utils.account_qr_content(
+    12345, {"account_number": "ACC123456789", "user_name": "Test User", "account_type": "savings"}
+)
+
+
+def legacy_add_logo(qr_image: Image.Image, logo_path: str) -> Image.Image:
+    """add_logo_to_qr as it was: filesystem check, open, LANCZOS thumbnail and padding per call."""
+    if not os.path.exists(logo_path):
+        return qr_image
+    logo = Image.open(logo_path)
+    qr_width, qr_height = qr_image.size
+    logo_max_size = int(qr_width * 0.15)
+    logo.thumbnail((logo_max_size, logo_max_size), Image.Resampling.LANCZOS)
+    logo_width, logo_height = logo.size
+    padding = int(logo_max_size * 0.20)
+    background_size = logo_width + (padding * 2)
+    background = Image.new('RGB', (background_size, background_size), 'white')
+    if logo.mode == 'RGBA':
+        background.paste(logo, (padding, padding), logo)
+    else:
+        background.paste(logo, (padding, padding))
+    qr_image.paste(background, ((qr_width - background_size) // 2, (qr_height - background_size) // 2))
+    return qr_image
+
+
+def qr_matrix_image(content: str) -> Image.Image:
+    qr = qrcode.QRCode(**qr_utils.QR_OPTIONS)
+    qr.add_data(content)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white").convert('RGB')
+
+
+def legacy_render(content: str, logo_path: str) -> bytes:
+    image = legacy_add_logo(qr_matrix_image(content), logo_path)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def synthetic_logo(path: str):
+    logo = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(logo)
+    draw.ellipse((16, 16, 496, 496), fill=(30, 90, 160, 255))
+    draw.rectangle((176, 136, 336, 376), fill=(255, 255, 255, 255))
+    logo.save(path)
+
+
+def measure(name, fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    median = statistics.median(timings)
+    print(f"{name:<28} median={median:8.3f} ms  p95={timings[int(len(timings) * 0.95) - 1]:8.3f} ms")
+    return median
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    logo_path = qr_utils.LOGO_PATH
+    tmp_dir = None
+    if not os.path.exists(logo_path):
+        tmp_dir = tempfile.TemporaryDirectory()
+        logo_path = os.path.join(tmp_dir.name, "logo.png")
+        synthetic_logo(logo_path)
+        print(f"{qr_utils.LOGO_PATH} not found, using a generated 512x512 RGBA logo")
+    qr_utils.load_logo(logo_path)
+    # Keep the disk tier out of the measurements
+    qr_image_cache.directory = None
+
+    if legacy_render(CONTENT, logo_path) != qr_utils.render_qr_png(CONTENT):
+        print("❌ Precomputed tile renders a different image")
+        sys.exit(1)
+    print("✅ Identical PNG output\n")
+
+    print(f"Logo step only ({iterations} runs)")
+    base = qr_matrix_image(CONTENT)
+    legacy_logo = measure("per-call logo", lambda: legacy_add_logo(base.copy(), logo_path), iterations)
+    tiled_logo = measure("precomputed tile", lambda: qr_utils.add_logo_to_qr(base.copy()), iterations)
+    print(f"{'':<28} {legacy_logo / tiled_logo:.1f}x faster\n")
+
+    print(f"Whole QR code: matrix, logo, PNG ({iterations} runs)")
+    legacy = measure("per-call logo", lambda: legacy_render(CONTENT, logo_path), iterations)
+    tiled = measure("precomputed tile", lambda: qr_utils.render_qr_png(CONTENT), iterations)
+    qr_utils.qr_png(CONTENT)
+    cached = measure("image cache hit", lambda: qr_utils.qr_png(CONTENT), iterations)
+    print(f"{'':<28} {legacy / tiled:.1f}x faster rendering, {legacy / cached:.0f}x with the cache")
+
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark for /stats/analytics (app/spending_analytics.py): the vectorized
+breakdowns over a cached History vs the same breakdowns computed row by row
+in Python, on a synthetic multi-year history of one user.
+
+No database needed; the history is generated in memory. Run from the
+backend directory:
+    python bench_spending_analytics.py [transactions]
+"""
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+
+from app.spending_analytics import BANK, CATEGORIES, OWN_ACCOUNTS, PEOPLE, WEEKDAYS, History, breakdowns
+
+RUNS = 20
+YEARS = 5
+COUNTERPARTIES = 500
+
+
+def synthetic_history(n: int) -> History:
+    rng = np.random.default_rng(42)
+    start = np.datetime64("2021-01-01T00:00:00")
+    timestamps = np.sort(start + rng.integers(0, YEARS * 365 * 86400, n).astype("timedelta64[s]"))
+    amounts = np.round(rng.gamma(2.0, 40.0, n), 2)
+    category = rng.choice([PEOPLE, OWN_ACCOUNTS, BANK], n, p=[0.85, 0.1, 0.05]).astype(np.int8)
+    debit = (rng.random(n) < 0.6) | (category == OWN_ACCOUNTS)
+    credit = ~debit | (category == OWN_ACCOUNTS)
+    counterparty = rng.integers(0, COUNTERPARTIES, n).astype(np.int32)
+    counterparty[category == BANK] = COUNTERPARTIES
+    names = [f"User {i}" for i in range(COUNTERPARTIES)] + ["Bank"]
+    return History(timestamps, amounts, debit, credit, category, counterparty, names)
+
+
+def python_breakdowns(rows, start: date, end: date, top: int = 10) -> dict:
+    """The same numbers from a list of row tuples, one Python loop."""
+    spent = received = 0.0
+    by_category = defaultdict(lambda: [0.0, 0.0, 0])
+    by_counterparty = defaultdict(lambda: [0.0, 0])
+    by_weekday = [[0.0, 0] for _ in WEEKDAYS]
+    by_month = defaultdict(lambda: [0.0, 0.0])
+    for ts, amount, debit, credit, category, counterparty in rows:
+        day = ts.date()
+        if day < start or day > end:
+            continue
+        entry = by_category[category]
+        entry[0] += amount if debit else 0.0
+        entry[1] += amount if credit else 0.0
+        entry[2] += 1
+        if category == OWN_ACCOUNTS:
+            continue
+        month = by_month[(ts.year, ts.month)]
+        if debit:
+            spent += amount
+            by_counterparty[counterparty][0] += amount
+            by_counterparty[counterparty][1] += 1
+            by_weekday[ts.weekday()][0] += amount
+            by_weekday[ts.weekday()][1] += 1
+            month[0] += amount
+        if credit:
+            received += amount
+            month[1] += amount
+    ranked = sorted(by_counterparty.items(), key=lambda item: -item[1][0])[:top]
+    return {"total_spent": round(spent, 2), "total_received": round(received, 2),
+            "categories": {CATEGORIES[c]: v for c, v in by_category.items()},
+            "top": ranked, "weekday": by_weekday, "months": by_month}
+
+
+def measure(name, fn):
+    timings = []
+    result = None
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"{name:<10} median={statistics.median(timings):9.2f} ms  p95={timings[int(len(timings) * 0.95) - 1]:9.2f} ms")
+    return result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Generating {n} transactions over {YEARS} years...")
+    history = synthetic_history(n)
+    rows = list(zip(
+        history.timestamps.astype("datetime64[us]").tolist(), history.amounts.tolist(), history.debit.tolist(),
+        history.credit.tolist(), history.category.tolist(), history.counterparty.tolist(),
+    ))
+
+    for label, start, end in (("all", date(2021, 1, 1), date(2025, 12, 31)), ("last year", date(2025, 1, 1), date(2025, 12, 31))):
+        print(f"\nRange: {label}")
+        python = measure("python", lambda: python_breakdowns(rows, start, end))
+        numpy = measure("numpy", lambda: breakdowns(history, start, end))
+        if abs(python["total_spent"] - numpy["total_spent"]) < 0.01 and abs(python["total_received"] - numpy["total_received"]) < 0.01:
+            print("✅ Totals match")
+        else:
+            print(f"❌ Totals differ: {python['total_spent']} vs {numpy['total_spent']}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Migration script to add the indexes behind the admin list endpoints' filters
+and keyset pagination (app/pagination.py). Every sort key is indexed together
+with id, the tie breaker of the keyset condition.
+
+Keyset comparisons skip NULLs, so NULL sort values are backfilled first.
+Indexes on regular tables are built CONCURRENTLY so the API can keep running;
+the partitioned transactions table does not support that and is indexed
+normally.
+"""
+
+from app.database import engine
+from sqlalchemy import text
+
+BACKFILLS = [
+    "UPDATE users SET created_at = '1970-01-01' WHERE created_at IS NULL",
+    "UPDATE accounts SET created_at = '1970-01-01' WHERE created_at IS NULL",
+    "UPDATE accounts SET balance = 0 WHERE balance IS NULL",
+    "UPDATE loans SET created_at = '1970-01-01' WHERE created_at IS NULL",
+    "UPDATE cards SET created_at = '1970-01-01' WHERE created_at IS NULL",
+]
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_at_id ON users (created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_role_status_created ON users (role, status, created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accounts_created_at_id ON accounts (created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accounts_status_created ON accounts (status, created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accounts_balance_id ON accounts (balance, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accounts_user_id ON accounts (user_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_loans_approval_created ON loans (approval_status, created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cards_approval_created ON cards (approval_status, created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_fixed_deposits_approval_start ON fixed_deposits (approval_status, start_date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_timestamp_id ON transactions (timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_status_timestamp ON transactions (status, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_amount_id ON transactions (amount, id)",
+]
+
+
+def migrate():
+    with engine.connect() as conn:
+        for statement in BACKFILLS:
+            conn.execute(text(statement))
+        conn.commit()
+        print("✓ Backfilled NULL sort values")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in INDEXES:
+            print(f"Running: {statement}")
+            try:
+                conn.execute(text(statement))
+            except Exception as e:
+                print(f"Note: {e}")
+        print("✓ Added admin list indexes")
+
+    print("\n✅ Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,39 @@
+"""
+Migration script to add the structured audit columns to the auditlogs table.
+Run this script to update the database schema (works on the partitioned table too).
+"""
+
+from app.database import engine
+from sqlalchemy import text
+
+COLUMNS = [
+    ("actor_id", "INTEGER"),
+    ("subject_user_id", "INTEGER"),
+    ("account_id", "INTEGER"),
+    ("entity_type", "VARCHAR"),
+    ("entity_id", "INTEGER"),
+    ("amount", "DOUBLE PRECISION"),
+]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_auditlogs_actor_id ON auditlogs (actor_id)",
+    "CREATE INDEX IF NOT EXISTS ix_auditlogs_subject_user_id ON auditlogs (subject_user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_auditlogs_account_id ON auditlogs (account_id)",
+    "CREATE INDEX IF NOT EXISTS ix_auditlogs_entity ON auditlogs (entity_type, entity_id)",
+]
+
+
+def migrate():
+    with engine.connect() as conn:
+        for name, sql_type in COLUMNS:
+            print(f"Adding {name} column to auditlogs table...")
+            conn.execute(text(f"ALTER TABLE auditlogs ADD COLUMN IF NOT EXISTS {name} {sql_type}"))
+        for statement in INDEXES:
+            conn.execute(text(statement))
+        conn.commit()
+        print("✓ Added structured audit columns and indexes")
+
+    print("\n✅ Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,36 @@
+"""
+Migration script to add the digest columns to the notifications table
+(group_key, group_count, group_amount, updated_at, pushed_at).
+"""
+from sqlalchemy import text
+from app.database import engine
+
+
+def migrate():
+    with engine.begin() as conn:
+        conn.execute(text("""
+            ALTER TABLE notifications
+                ADD COLUMN IF NOT EXISTS group_key VARCHAR,
+                ADD COLUMN IF NOT EXISTS group_count INTEGER DEFAULT 1,
+                ADD COLUMN IF NOT EXISTS group_amount DOUBLE PRECISION,
+                ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS pushed_at TIMESTAMP
+        """))
+        print("✓ Digest columns added to notifications")
+
+        # Open-digest lookup: (user, group) among unread rows, newest first
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_notifications_open_digest
+            ON notifications (user_id, group_key, created_at DESC)
+            WHERE group_key IS NOT NULL AND is_read IS NOT TRUE
+        """))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_notifications_group_key ON notifications (group_key)"
+        ))
+        print("✓ Digest indexes created")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,30 @@
+"""
+Migration script to create the account_balance_snapshots table and backfill
+end-of-day balances for the last BACKFILL_DAYS days, so the dashboard's
+30-day balance change and the balance-history charts work straight away.
+The backfill is derived from the live balances and the transactions table
+(see app/balance_snapshots.py).
+"""
+import sys
+from datetime import datetime, timedelta
+
+from app.database import Base, engine
+from app import balance_snapshots, models
+
+BACKFILL_DAYS = 90
+
+
+def migrate(days: int = BACKFILL_DAYS):
+    Base.metadata.create_all(bind=engine, tables=[models.AccountBalanceSnapshot.__table__])
+    print("✓ account_balance_snapshots table created")
+
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    with engine.begin() as conn:
+        rows = balance_snapshots.snapshot_range(conn, yesterday - timedelta(days=days - 1), yesterday)
+    print(f"✓ Backfilled {rows} snapshots over the last {days} days")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate(int(sys.argv[1]) if len(sys.argv) > 1 else BACKFILL_DAYS)
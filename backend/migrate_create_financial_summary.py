@@ -0,0 +1,22 @@
+"""
+Migration script to create the user_financial_summary table and compute
+every user's row. Safe to re-run: it is the same recompute the nightly
+roll_financial_summaries task performs. Run it after
+migrate_create_balance_snapshots.py so the baseline balances are filled in.
+"""
+from app.database import Base, engine
+from app import config, financial_summary, models
+
+
+def migrate():
+    Base.metadata.create_all(bind=engine, tables=[models.UserFinancialSummary.__table__])
+    print("✓ user_financial_summary table created")
+
+    report = financial_summary.roll(engine, config.FINANCIAL_SUMMARY_ROLL_BATCH_SIZE)
+    print(f"✓ Computed {report['users']} summary rows in {report['batches']} batches")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate()
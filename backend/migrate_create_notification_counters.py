@@ -0,0 +1,22 @@
+"""
+Migration script to create the notification_counters table and backfill it
+from the notifications table. Safe to re-run: it is the same reconciliation
+the nightly reconcile_notification_counters task performs.
+"""
+from app.database import Base, engine
+from app import models, notification_counters
+
+
+def migrate():
+    Base.metadata.create_all(bind=engine, tables=[models.NotificationCounter.__table__])
+    print("✓ notification_counters table created")
+
+    with engine.begin() as conn:
+        fixed = notification_counters.reconcile(conn)
+    print(f"✓ Backfilled {fixed} counter rows")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,29 @@
+"""
+Migration script to create the notification_history_summaries table used by
+the notification retention job, and the partial index its batches scan
+(read notifications by age). The index is built CONCURRENTLY so the API can
+keep running.
+"""
+from sqlalchemy import text
+
+from app.database import Base, engine
+from app import models
+
+
+def migrate():
+    Base.metadata.create_all(bind=engine, tables=[models.NotificationHistorySummary.__table__])
+    print("✓ notification_history_summaries table created")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notifications_read_created_at "
+            "ON notifications (created_at) WHERE is_read IS TRUE"
+        ))
+    print("✓ Retention index created")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,19 @@
+"""
+Migration script to create the push_subscriptions table (previously push
+subscriptions only lived in a per-process dict and were lost on restart).
+Browsers re-send their subscription on the next visit, so nothing is
+backfilled.
+"""
+from app.database import Base, engine
+from app import models
+
+
+def migrate():
+    Base.metadata.create_all(bind=engine, tables=[models.PushSubscription.__table__])
+    print("✓ push_subscriptions table created")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,17 @@
+"""
+Migration script to create the qr_batch_jobs table behind the admin QR batch
+exports (/qr/admin/batches).
+"""
+from app.database import Base, engine
+from app import models
+
+
+def migrate():
+    Base.metadata.create_all(bind=engine, tables=[models.QRBatchJob.__table__])
+    print("✓ qr_batch_jobs table created")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate()
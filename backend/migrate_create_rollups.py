@@ -0,0 +1,38 @@
+"""
+Migration script to create the admin analytics rollup tables
+(stats_daily_transactions, stats_daily_accounts, stats_daily_approvals) and
+backfill them from the source tables.
+
+Safe to re-run: the backfill is the same verification the nightly
+compact_rollups task performs, over the full history.
+"""
+from app.database import Base, SessionLocal, engine
+from app import models, rollups
+
+
+def migrate():
+    Base.metadata.create_all(bind=engine, tables=[
+        models.StatsDailyTransactions.__table__,
+        models.StatsDailyAccounts.__table__,
+        models.StatsDailyApprovals.__table__,
+    ])
+    print("✓ Rollup tables created")
+
+    db = SessionLocal()
+    try:
+        report = rollups.compact(db, full=True)
+        db.commit()
+        for table, result in report.items():
+            print(f"✓ {table}: {result['repaired_buckets']} buckets backfilled, {result['folded_months']} months folded")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Backfill failed: {e}")
+        raise
+    finally:
+        db.close()
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate()
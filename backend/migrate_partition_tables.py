@@ -0,0 +1,92 @@
+"""
+Migration script to convert the transactions and auditlogs tables into
+monthly range-partitioned tables (PostgreSQL 11+).
+
+Each table is renamed to <table>_legacy, a partitioned parent with the same
+columns is created, monthly partitions are created from the oldest row up to a
+few months ahead (plus a DEFAULT partition for NULL/out-of-range timestamps),
+the rows are copied over and the legacy table is dropped.
+
+Run this once with the API and Celery workers stopped.
+"""
+from datetime import date
+from sqlalchemy import text
+from app.database import engine
+from app.partitions import ensure_partitions
+
+# table -> extra indexes to create on the partitioned parent
+TABLES = {
+    "transactions": [
+        "CREATE INDEX IF NOT EXISTS ix_transactions_timestamp ON transactions (timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_id ON transactions (id)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_src_account ON transactions (src_account, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_dest_account ON transactions (dest_account, timestamp)",
+        "ALTER TABLE transactions ADD FOREIGN KEY (src_account) REFERENCES accounts (id)",
+        "ALTER TABLE transactions ADD FOREIGN KEY (dest_account) REFERENCES accounts (id)",
+    ],
+    "auditlogs": [
+        "CREATE INDEX IF NOT EXISTS ix_auditlogs_timestamp ON auditlogs (timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_auditlogs_id ON auditlogs (id)",
+        "CREATE INDEX IF NOT EXISTS ix_auditlogs_event_type ON auditlogs (event_type)",
+    ],
+}
+
+
+def is_partitioned(conn, table):
+    result = conn.execute(text(
+        "SELECT COUNT(*) FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table"
+    ), {"table": table})
+    return result.scalar() > 0
+
+
+def migrate_table(conn, table, indexes):
+    legacy = f"{table}_legacy"
+    print(f"Partitioning {table}...")
+
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    # Index names are global; free them up for the partitioned parent
+    conn.execute(text(f"ALTER INDEX IF EXISTS {table}_pkey RENAME TO {legacy}_pkey"))
+    for suffix in ("id", "timestamp", "event_type"):
+        conn.execute(text(f"ALTER INDEX IF EXISTS ix_{table}_{suffix} RENAME TO ix_{legacy}_{suffix}"))
+
+    # The primary key of a partitioned table must include the partition key
+    conn.execute(text(
+        f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS, "
+        f"PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)"
+    ))
+    # Rows with NULL timestamps cannot be part of the primary key
+    conn.execute(text(f"UPDATE {legacy} SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL"))
+
+    oldest = conn.execute(text(f"SELECT MIN(timestamp) FROM {legacy}")).scalar()
+    ensure_partitions(conn, table, oldest.date() if oldest else date.today())
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+    for statement in indexes:
+        conn.execute(text(statement))
+
+    conn.execute(text(f"INSERT INTO {table} SELECT * FROM {legacy}"))
+
+    # Keep the id sequence alive when the legacy table is dropped
+    conn.execute(text(f"ALTER SEQUENCE IF EXISTS {table}_id_seq OWNED BY {table}.id"))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+    print(f"✓ {table} is now partitioned by month")
+
+
+def migrate():
+    for table, indexes in TABLES.items():
+        try:
+            with engine.connect() as conn:
+                if is_partitioned(conn, table):
+                    print(f"✓ {table} already partitioned, skipping.")
+                    continue
+                migrate_table(conn, table, indexes)
+                conn.commit()
+        except Exception as e:
+            print(f"Note: {table} - {e}")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useAuth } from '../contexts/AuthContext';
-import { getToken } from '../services/api';
+import { getToken, qrAPI } from '../services/api';
 
 const BASE_URL = 'http://localhost:8000';
 
@@ -9,6 +9,7 @@ const AccountQRCodes = ({ className = '' }) => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [selectedAccount, setSelectedAccount] = useState(null);
+  const [qrImageUrl, setQrImageUrl] = useState(null);
   const { user } = useAuth();
 
   const fetchAccountQRCodes = async () => {
@@ -55,11 +56,33 @@ const AccountQRCodes = ({ className = '' }) => {
     }
   }, [user?.id]);
 
+  // The JSON only links the images; fetch the selected account's (HTTP-cached by its versioned URL)
+  useEffect(() => {
+    setQrImageUrl(null);
+    if (!selectedAccount?.qr_code_url) return;
+    let objectUrl = null;
+    let cancelled = false;
+    qrAPI.getImageUrl(selectedAccount.qr_code_url)
+      .then((url) => {
+        if (cancelled) {
+          URL.revokeObjectURL(url);
+        } else {
+          objectUrl = url;
+          setQrImageUrl(url);
+        }
+      })
+      .catch((err) => console.error('QR image fetch error:', err));
+    return () => {
+      cancelled = true;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [selectedAccount?.qr_code_url]);
+
   const downloadQRCode = (account) => {
-    if (!account?.qr_code) return;
+    if (!qrImageUrl) return;
     
     const link = document.createElement('a');
-    link.href = account.qr_code;
+    link.href = qrImageUrl;
     link.download = `nyord-qr-${account.account_number}.png`;
     document.body.appendChild(link);
     link.click();
@@ -67,11 +90,9 @@ const AccountQRCodes = ({ className = '' }) => {
   };
 
   const shareQRCode = async (account) => {
-    if (!account?.qr_code) return;
+    if (!qrImageUrl) return;
     
-    // Convert base64 to blob
-    const base64Data = account.qr_code.split(',')[1];
-    const blob = await fetch(`data:image/png;base64,${base64Data}`).then(r => r.blob());
+    const blob = await fetch(qrImageUrl).then(r => r.blob());
     const file = new File([blob], `nyord-qr-${account.account_number}.png`, { type: 'image/png' });
     
     if (navigator.share) {
@@ -188,7 +209,7 @@ const AccountQRCodes = ({ className = '' }) => {
             {/* QR Code */}
             <div className="bg-white p-4 rounded-lg shadow-md mb-4">
               <img 
-                src={selectedAccount.qr_code} 
+                src={qrImageUrl || undefined} 
                 alt={`QR Code for ${selectedAccount.account_type} account`}
                 className="w-64 h-64 object-contain"
               />
@@ -1,11 +1,12 @@
 import { useState, useEffect } from 'react';
 import { useAuth } from '../contexts/AuthContext';
-import { getToken } from '../services/api';
+import { getToken, qrAPI } from '../services/api';
 
 const BASE_URL = 'http://localhost:8000';
 
 const QRCodeDisplay = ({ className = '' }) => {
   const [qrData, setQrData] = useState(null);
+  const [qrImageUrl, setQrImageUrl] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const { user } = useAuth();
@@ -56,6 +57,29 @@ const QRCodeDisplay = ({ className = '' }) => {
     }
   }, [user?.id]);
 
+  // The JSON only links the image; fetch it (HTTP-cached by its versioned URL)
+  useEffect(() => {
+    if (!qrData?.qr_code_url) return;
+    let objectUrl = null;
+    let cancelled = false;
+    qrAPI.getImageUrl(qrData.qr_code_url)
+      .then((url) => {
+        if (cancelled) {
+          URL.revokeObjectURL(url);
+        } else {
+          objectUrl = url;
+          setQrImageUrl(url);
+        }
+      })
+      .catch((err) => {
+        if (!cancelled) setError(err.message || 'Failed to load QR code');
+      });
+    return () => {
+      cancelled = true;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [qrData?.qr_code_url]);
+
   const copyQRHash = () => {
     if (qrData?.qr_hash) {
       navigator.clipboard.writeText(qrData.qr_hash);
@@ -65,11 +89,11 @@ const QRCodeDisplay = ({ className = '' }) => {
   };
 
   const downloadQRCode = () => {
-    if (!qrData?.qr_code) return;
+    if (!qrImageUrl) return;
     
     // Create download link
     const link = document.createElement('a');
-    link.href = qrData.qr_code;
+    link.href = qrImageUrl;
     link.download = `nyord-qr-${user.username || 'user'}.png`;
     document.body.appendChild(link);
     link.click();
@@ -130,7 +154,7 @@ const QRCodeDisplay = ({ className = '' }) => {
           {/* QR Code Image */}
           <div className="bg-white p-4 rounded-lg border-2 border-gray-100 shadow-sm">
             <img 
-              src={qrData.qr_code} 
+              src={qrImageUrl || undefined} 
               alt="User QR Code"
               className="w-48 h-48 object-contain"
             />
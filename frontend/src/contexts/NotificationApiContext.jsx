@@ -140,12 +140,22 @@ export function NotificationProvider({ children }) {
           } else {
             notificationService.showAccountNotification(notificationData.message, notificationData.type || 'info');
           }
+        } else if (data.type === 'notification.updated' && data.data) {
+          // A coalesced digest grew ("You received N payments"); replace it in place
+          // and move it to the top. Counters are unchanged, it is the same unread row.
+          setNotifications(prev => [data.data, ...prev.filter(n => n.id !== data.data.id)]);
+        } else if (data.type === 'notification.counts') {
+          // Badge counters are pushed whenever they change; no polling needed
+          setUnreadCount(data.unread_count);
+        } else if (data.type === 'notification.broadcast') {
+          // One message per broadcast for every online user; spread the refetches out
+          notificationService.showAccountNotification(data.message, data.notification_type || 'info');
+          setTimeout(fetchNotifications, Math.random() * 5000);
         } else if (data.type === 'transaction.success') {
           console.log('Transaction completed:', data);
           // Refresh notifications to get any new transaction notifications
           setTimeout(() => {
             fetchNotifications();
-            fetchStats();
           }, 1000); // Wait a bit for backend to process notifications
           
           // Trigger balance refresh for the user
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { Bar, Line, Pie } from 'react-chartjs-2';
-import { dashboardAPI, transactionsAPI } from '../services/api';
+import { dashboardAPI, statsAPI, transactionsAPI } from '../services/api';
 import {
   Chart as ChartJS,
   CategoryScale,
@@ -15,10 +15,8 @@ import {
 
 ChartJS.register(CategoryScale, LinearScale, BarElement, PointElement, LineElement, ArcElement, Tooltip, Legend);
 
-const backendMatplotlibUrl = 'http://localhost:8000/stats/matplotlib.png';
-
 const Statistics = () => {
-  const [matplotlibLoaded, setMatplotlibLoaded] = useState(false);
+  const [serverChartUrl, setServerChartUrl] = useState(null);
 
   const [accounts, setAccounts] = useState([]);
   const [transactions, setTransactions] = useState([]);
@@ -30,10 +28,10 @@ const Statistics = () => {
   const COLORS = ['#4c9f70', '#d95f02', '#7570b3', '#1b9e77', '#e7298a', '#66c2a5', '#fc8d62'];
 
   useEffect(() => {
-    const img = new Image();
-    img.onload = () => setMatplotlibLoaded(true);
-    img.onerror = () => setMatplotlibLoaded(false);
-    img.src = backendMatplotlibUrl + '?_=' + Date.now();
+    let chartUrl = null;
+    statsAPI.getChartUrl('spending', 'png', { days: 90 })
+      .then((url) => { chartUrl = url; setServerChartUrl(url); })
+      .catch((err) => console.error('Failed to load server chart', err));
 
     // Fetch dashboard summary and transactions to populate charts dynamically
     (async () => {
@@ -92,6 +90,10 @@ const Statistics = () => {
         console.error('Failed to load stats data', err);
       }
     })();
+
+    return () => {
+      if (chartUrl) URL.revokeObjectURL(chartUrl);
+    };
   }, []);
 
   return (
@@ -116,12 +118,12 @@ const Statistics = () => {
       </div>
 
       <div className="bg-white dark:bg-gray-800 rounded-2xl p-4 shadow">
-        <h3 className="font-semibold mb-2">Server-generated Matplotlib Snapshot</h3>
-        <p className="text-sm text-gray-500 mb-2">This image is produced by a backend endpoint using matplotlib (PNG).</p>
-        {matplotlibLoaded ? (
-          <img src={backendMatplotlibUrl} alt="matplotlib snapshot" className="w-full rounded" />
+        <h3 className="font-semibold mb-2">Spending, Last 90 Days</h3>
+        <p className="text-sm text-gray-500 mb-2">Rendered on the server from your transactions (PNG).</p>
+        {serverChartUrl ? (
+          <img src={serverChartUrl} alt="Spending by recipient, last 90 days" className="w-full rounded" />
         ) : (
-          <div className="text-sm text-gray-500">Matplotlib image unavailable or loading. Ensure backend has `matplotlib` installed.</div>
+          <div className="text-sm text-gray-500">Chart unavailable or loading.</div>
         )}
       </div>
     </div>
@@ -306,6 +306,36 @@ export const dashboardAPI = {
   },
 };
 
+// Server-rendered charts (PNG/SVG); returns an object URL for an <img>, revoke it when done
+export const statsAPI = {
+  getChartUrl: async (name, format = 'png', params = {}) => {
+    const token = getToken();
+    const query = new URLSearchParams(params).toString();
+    const response = await fetch(`${BASE_URL}/stats/charts/${name}.${format}${query ? `?${query}` : ''}`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+    });
+    if (!response.ok) {
+      throw new Error(`Chart request failed: ${response.status}`);
+    }
+    return URL.createObjectURL(await response.blob());
+  },
+};
+
+// QR code images linked from the QR endpoints (qr_code_url / qr_code_svg_url);
+// returns an object URL for an <img> or a download link, revoke it when done
+export const qrAPI = {
+  getImageUrl: async (path) => {
+    const token = getToken();
+    const response = await fetch(`${BASE_URL}${path}`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+    });
+    if (!response.ok) {
+      throw new Error(`QR image request failed: ${response.status}`);
+    }
+    return URL.createObjectURL(await response.blob());
+  },
+};
+
 // Admin API
 export const adminAPI = {
   setupAdmin: async () => {
@@ -77,11 +77,12 @@ export class PushNotificationManager {
 
   async unsubscribe() {
     if (this.subscription) {
+      const { endpoint } = this.subscription;
       await this.subscription.unsubscribe();
       this.subscription = null;
       
-      // Notify server about unsubscription
-      await this.removeSubscriptionFromServer();
+      // Notify server about unsubscription (only this browser's subscription)
+      await this.removeSubscriptionFromServer(endpoint);
     }
   }
 
@@ -104,14 +105,15 @@ export class PushNotificationManager {
     }
   }
 
-  async removeSubscriptionFromServer() {
+  async removeSubscriptionFromServer(endpoint) {
     try {
       const response = await fetch(`${VAPID_CONFIG.endpoint}/unsubscribe`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${localStorage.getItem('token')}`
-        }
+        },
+        body: JSON.stringify({ endpoint })
       });
 
       if (!response.ok) {